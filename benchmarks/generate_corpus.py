@@ -0,0 +1,151 @@
+import os
+import json
+import random
+import argparse
+
+# Default share of each language in a generated corpus
+DEFAULT_MIX = {"python": 50, "javascript": 30, "java": 20}
+EXTENSIONS = {"python": ".py", "javascript": ".js", "java": ".java"}
+PACKAGE_NAMES = ["core", "api", "utils", "models", "services", "handlers", "storage", "jobs"]
+
+
+def parse_mix(text):
+    """Parse "python=50,javascript=30,java=20" into a dict of weights."""
+    mix = {}
+    for part in text.split(","):
+        if not part.strip():
+            continue
+        lang, _, weight = part.partition("=")
+        lang = lang.strip()
+        if lang not in EXTENSIONS:
+            raise ValueError(f"Unknown language in mix: {lang}")
+        mix[lang] = int(weight or 1)
+    return mix
+
+
+def _python_file(rng, name, functions):
+    lines = ["import os", "import subprocess", ""]
+    for i in range(functions):
+        lines.append(f"def {name}_{i}(value, options=None):")
+        # Seeded violations: missing docstrings, eval, shell=True, long lines, deep branching
+        if rng.random() < 0.3:
+            lines.append(f'    """Handle case {i}."""')
+        lines.append("    result = []")
+        for branch in range(rng.randint(1, 14)):
+            lines.append(f"    if value == {branch}:")
+            lines.append(f"        result.append({branch} * {rng.randint(1, 99)})")
+        if rng.random() < 0.2:
+            lines.append("    result.append(eval(str(value)))")
+        if rng.random() < 0.15:
+            lines.append("    subprocess.call('echo ' + str(value), shell=True)")
+        if rng.random() < 0.3:
+            lines.append(f"    message = '{'x' * rng.randint(90, 140)}'")
+        lines.append("    unused = os.getcwd()")
+        lines.append("    return result")
+        lines.append("")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def _javascript_file(rng, name, functions):
+    lines = ["'use strict';", ""]
+    for i in range(functions):
+        lines.append(f"function {name}_{i}(value) {{")
+        lines.append("  var result = [];")
+        for branch in range(rng.randint(1, 10)):
+            semicolon = "" if rng.random() < 0.2 else ";"
+            lines.append(f"  if (value === {branch}) {{ result.push({branch} * {rng.randint(1, 99)}){semicolon} }}")
+        if rng.random() < 0.2:
+            lines.append("  result.push(eval(String(value)));")
+        if rng.random() < 0.3:
+            lines.append("  let unusedValue = 42")
+        lines.append("  return result;")
+        lines.append("}")
+        lines.append("")
+    lines.append(f"module.exports = {{ {', '.join(f'{name}_{i}' for i in range(functions))} }};")
+    return "\n".join(lines) + "\n"
+
+
+def _java_file(rng, name, functions):
+    class_name = "".join(part.capitalize() for part in name.split("_"))
+    lines = [f"public class {class_name} {{"]
+    for i in range(functions):
+        if rng.random() < 0.3:
+            lines.append(f"    /** Handles case {i}. */")
+        lines.append(f"    public int handle{i}(int value) {{")
+        lines.append("        int result = 0;")
+        for branch in range(rng.randint(1, 10)):
+            lines.append(f"        if (value == {branch}) {{ result += {rng.randint(1, 999)}; }}")
+        if rng.random() < 0.3:
+            lines.append(f"        String padding = \"{'x' * rng.randint(90, 140)}\";")
+        lines.append("        return result;")
+        lines.append("    }")
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+GENERATORS = {"python": _python_file, "javascript": _javascript_file, "java": _java_file}
+
+
+def generate(dest, files=1000, mix=None, seed=0, functions=8, noise_files=200):
+    """Write a synthetic repository under ``dest`` and return a summary of what was generated.
+
+    ``files`` source files are split across languages by ``mix`` weights and spread
+    over nested packages. ``noise_files`` vendored JavaScript files go under nested
+    ``node_modules`` directories, which a review should never descend into.
+    """
+    rng = random.Random(seed)
+    mix = mix or DEFAULT_MIX
+    languages = list(mix)
+    weights = [mix[lang] for lang in languages]
+    counts = {lang: 0 for lang in languages}
+    total_bytes = 0
+
+    for index in range(files):
+        lang = rng.choices(languages, weights)[0]
+        depth = rng.randint(0, 3)
+        package = os.path.join(dest, "src", *rng.sample(PACKAGE_NAMES, depth))
+        os.makedirs(package, exist_ok=True)
+        name = f"module_{index}"
+        source = GENERATORS[lang](rng, name, rng.randint(1, functions))
+        path = os.path.join(package, name + EXTENSIONS[lang])
+        with open(path, "w") as f:
+            f.write(source)
+        counts[lang] += 1
+        total_bytes += len(source)
+
+    for index in range(noise_files):
+        package = os.path.join(dest, "node_modules", f"dep_{index % 20}", "node_modules", f"inner_{index % 7}", "lib")
+        os.makedirs(package, exist_ok=True)
+        with open(os.path.join(package, f"vendored_{index}.js"), "w") as f:
+            f.write(_javascript_file(rng, f"vendored_{index}", 2))
+
+    with open(os.path.join(dest, "requirements.txt"), "w") as f:
+        f.write("requests==2.31.0\n")
+    with open(os.path.join(dest, "package.json"), "w") as f:
+        json.dump({"name": "benchmark-corpus", "dependencies": {"left-pad": "1.3.0"}}, f, indent=2)
+
+    return {
+        "files": files,
+        "languages": counts,
+        "noise_files": noise_files,
+        "source_bytes": total_bytes,
+        "seed": seed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic codebase for benchmarking")
+    parser.add_argument("dest", help="Directory to create")
+    parser.add_argument("--files", type=int, default=1000, help="Number of source files")
+    parser.add_argument("--mix", default="python=50,javascript=30,java=20", help="Language weights")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (same seed, same corpus)")
+    parser.add_argument("--functions", type=int, default=8, help="Maximum functions per file")
+    parser.add_argument("--noise-files", type=int, default=200, help="Vendored files under node_modules")
+    args = parser.parse_args()
+    summary = generate(args.dest, args.files, parse_mix(args.mix), args.seed, args.functions, args.noise_files)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
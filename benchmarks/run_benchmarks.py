@@ -0,0 +1,225 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import datetime
+import tempfile
+import statistics
+import subprocess
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCHMARK_DIR)
+STUBS_DIR = os.path.join(BENCHMARK_DIR, "stubs")
+
+# Import the agent the same way main.py does
+sys.path.append(os.path.join(PROJECT_ROOT, "src"))
+
+from generate_corpus import generate, parse_mix
+from config import Config
+from discovery import FileDiscovery
+from analyzer import CodeAnalyzer
+from improver import CodeImprover
+from output_generator import OutputGenerator
+from pipeline import ReviewPipeline
+
+# Bump when the layout of the results file changes
+RESULTS_FORMAT_VERSION = 1
+
+
+def setup_arguments():
+    parser = argparse.ArgumentParser(description="Time each stage of the review pipeline on a synthetic corpus")
+    parser.add_argument("--corpus", help="Existing codebase to benchmark (default: generate one)")
+    parser.add_argument("--files", type=int, default=500, help="Source files to generate")
+    parser.add_argument("--mix", default="python=50,javascript=30,java=20", help="Language weights")
+    parser.add_argument("--seed", type=int, default=0, help="Corpus seed")
+    parser.add_argument("--noise-files", type=int, default=200, help="Vendored files under node_modules")
+    parser.add_argument("--jobs", type=int, default=0, help="Pipeline workers (0 = one per CPU)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage; the fastest is reported")
+    parser.add_argument("--sample", type=int, default=20,
+                        help="Files analyzed one at a time to measure per-call linter overhead")
+    parser.add_argument("--real-tools", action="store_true",
+                        help="Use the installed linters/formatters instead of the offline stubs")
+    parser.add_argument("--output", help="Write results JSON here (default: stdout)")
+    parser.add_argument("--baseline", help="Earlier results JSON to compare against")
+    return parser.parse_args()
+
+
+class StageTimer:
+    """Wall time, CPU time of this process and CPU time of finished child processes."""
+
+    def __enter__(self):
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+        self.children = _children_cpu()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.wall = time.perf_counter() - self.wall
+        self.cpu = time.process_time() - self.cpu
+        self.children = _children_cpu() - self.children
+
+
+def _children_cpu():
+    times = os.times()
+    return times.children_user + times.children_system
+
+
+def run_stage(name, repeat, files, func):
+    """Run ``func()`` ``repeat`` times; returns (stage result dict, last return value).
+
+    ``files`` is the number of files one run handles, or None to count what ``func`` returns.
+    """
+    runs = []
+    value = None
+    for _ in range(repeat):
+        with StageTimer() as timer:
+            value = func()
+        runs.append(timer)
+    if files is None:
+        files = len(value)
+    if not files:
+        # Every stage is compared per file; a stage over no files has nothing to compare
+        raise Exception(f"Benchmark stage {name} processed no files")
+    best = min(runs, key=lambda timer: timer.wall)
+    result = {
+        "files": files,
+        "wall_seconds": round(best.wall, 4),
+        "cpu_seconds": round(best.cpu, 4),
+        "child_cpu_seconds": round(best.children, 4),
+        "ms_per_file": round(best.wall * 1000 / files, 3),
+        "runs": [round(timer.wall, 4) for timer in runs],
+        "median_wall_seconds": round(statistics.median(timer.wall for timer in runs), 4),
+    }
+    print(f"{name:<20} {best.wall:9.3f}s  ({result['ms_per_file']} ms/file)", file=sys.stderr)
+    return result, value
+
+
+def git_commit():
+    try:
+        result = subprocess.run(["git", "rev-parse", "HEAD"], cwd=PROJECT_ROOT, capture_output=True, text=True)
+    except OSError:
+        return None
+    return result.stdout.strip() or None
+
+
+def benchmark(args, corpus, scratch):
+    config = Config.from_dict({
+        "jobs": args.jobs,
+        "cache": {"enabled": False},
+        "daemons": {"enabled": False},
+    })
+    stages = {}
+
+    stages["discovery"], code_files = run_stage(
+        "discovery", args.repeat, None, lambda: list(FileDiscovery.from_config(corpus, config))
+    )
+
+    analyzer = CodeAnalyzer(config)
+    sample = code_files[:args.sample]
+    stages["analyze_file"], _ = run_stage(
+        "analyze_file", args.repeat, len(sample),
+        lambda: [analyzer.analyze_file(path, lang) for path, lang in sample]
+    )
+    stages["analyze_batched"], analysis = run_stage(
+        "analyze_batched", args.repeat, len(code_files), lambda: analyzer.analyze_all(code_files)
+    )
+
+    improver = CodeImprover(config)
+    stages["improve_code"], improved = run_stage(
+        "improve_code", args.repeat, len(code_files),
+        lambda: {path: improver.improve_code(path, analysis[path], lang) for path, lang in code_files}
+    )
+
+    def write_output():
+        output_dir = os.path.join(scratch, "output")
+        shutil.rmtree(output_dir, ignore_errors=True)
+        output_gen = OutputGenerator(config, output_dir, os.path.join(scratch, "reports"))
+        output_gen.start_report()
+        for path, _ in code_files:
+            output_gen.save_improved_code(path, improved[path], analysis[path])
+        return output_gen.generate_report([])
+
+    stages["output"], _ = run_stage("output", args.repeat, len(code_files), write_output)
+
+    def run_pipeline():
+        output_dir = os.path.join(scratch, "pipeline_output")
+        shutil.rmtree(output_dir, ignore_errors=True)
+        output_gen = OutputGenerator(config, output_dir, os.path.join(scratch, "reports"))
+        output_gen.start_report()
+        ReviewPipeline(config, analyzer, improver, output_gen).run(FileDiscovery.from_config(corpus, config))
+        return output_gen.generate_report([])
+
+    stages["pipeline"], _ = run_stage("pipeline", args.repeat, len(code_files), run_pipeline)
+    stages["pipeline"]["jobs"] = ReviewPipeline(config, analyzer, improver, None).jobs
+    return stages
+
+
+def missing_numbers(stages):
+    """Names of stages whose timings or per-file figure are missing."""
+    return [
+        name for name, stage in stages.items()
+        if any(stage.get(key) is None for key in ("files", "wall_seconds", "ms_per_file"))
+    ]
+
+
+def compare(results, baseline):
+    print(f"{'stage':<20} {'baseline':>10} {'current':>10} {'change':>8}", file=sys.stderr)
+    for name, stage in results["stages"].items():
+        old = baseline.get("stages", {}).get(name)
+        if not old or not old.get("wall_seconds"):
+            print(f"{name:<20} {'missing':>10} {stage['wall_seconds']:>9.3f}s", file=sys.stderr)
+            continue
+        change = (stage["wall_seconds"] - old["wall_seconds"]) / old["wall_seconds"] * 100
+        print(f"{name:<20} {old['wall_seconds']:>9.3f}s {stage['wall_seconds']:>9.3f}s {change:>+7.1f}%", file=sys.stderr)
+
+
+def main():
+    args = setup_arguments()
+    if not args.real_tools:
+        # Stub linters/formatters so the benchmark runs offline and measures the agent itself
+        os.environ["PATH"] = STUBS_DIR + os.pathsep + os.environ.get("PATH", "")
+
+    scratch = tempfile.mkdtemp(prefix="review_bench_")
+    try:
+        corpus = args.corpus
+        corpus_summary = {"path": corpus}
+        if corpus is None:
+            corpus = os.path.join(scratch, "corpus")
+            corpus_summary = generate(
+                corpus, args.files, parse_mix(args.mix), args.seed, noise_files=args.noise_files
+            )
+        results = {
+            "format": RESULTS_FORMAT_VERSION,
+            "commit": git_commit(),
+            "created": datetime.datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "tools": "installed" if args.real_tools else "stubs",
+            "corpus": corpus_summary,
+            "stages": benchmark(args, corpus, scratch),
+        }
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            compare(results, json.load(f))
+
+    missing = missing_numbers(results["stages"])
+    if missing:
+        print(f"Missing benchmark numbers for: {', '.join(missing)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(os.path.dirname(BENCHMARK_DIR), "src")
+
+# Import time allowed for each entry point, in milliseconds, measured in a fresh interpreter
+STARTUP_BUDGETS_MS = {"app": 300, "main": 150}
+# Heavy dependencies that must only be imported once a file that needs them is processed
+HEAVY_DEPENDENCIES = ("black", "bandit", "radon", "git", "pylint")
+# Modules each entry point must not import at startup; the web app also defers the review stack
+LAZY_MODULES = {
+    "app": HEAVY_DEPENDENCIES + ("analyzer", "improver", "output_generator"),
+    "main": HEAVY_DEPENDENCIES,
+}
+
+# Runs in the child interpreter: time the import, then report what it pulled in
+_PROBE = """
+import sys, time, json
+sys.path.insert(0, {src!r})
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(json.dumps({{"ms": elapsed * 1000, "loaded": [m for m in {lazy!r} if m in sys.modules]}}))
+"""
+
+
+def setup_arguments():
+    parser = argparse.ArgumentParser(description="Check that the CLI and web entry points start within budget")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per entry point; the fastest counts")
+    parser.add_argument("--budget", action="append", default=[], metavar="MODULE=MS",
+                        help="Override a budget, e.g. app=250")
+    parser.add_argument("--output", help="Write results JSON here (default: stdout)")
+    return parser.parse_args()
+
+
+def measure(module, repeat):
+    """Import ``module`` in ``repeat`` fresh interpreters; returns (fastest ms, eagerly loaded heavy modules)."""
+    probe = _PROBE.format(src=SRC_DIR, module=module, lazy=LAZY_MODULES.get(module, HEAVY_DEPENDENCIES))
+    timings = []
+    loaded = []
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, cwd=BENCHMARK_DIR)
+        if result.returncode != 0:
+            raise Exception(f"Importing {module} failed:\n{result.stderr}")
+        sample = json.loads(result.stdout.strip().splitlines()[-1])
+        timings.append(sample["ms"])
+        loaded = sample["loaded"]
+    return min(timings), loaded
+
+
+def check(budgets, repeat):
+    results = {}
+    for module, budget in budgets.items():
+        elapsed, loaded = measure(module, repeat)
+        ok = elapsed <= budget and not loaded
+        results[module] = {
+            "import_ms": round(elapsed, 1),
+            "budget_ms": budget,
+            "eagerly_loaded": loaded,
+            "ok": ok,
+        }
+        status = "ok" if ok else "OVER BUDGET" if elapsed > budget else "EAGER IMPORTS"
+        print(f"{module:<8} {elapsed:8.1f} ms / {budget} ms  {status} {' '.join(loaded)}", file=sys.stderr)
+    return results
+
+
+def main():
+    args = setup_arguments()
+    budgets = dict(STARTUP_BUDGETS_MS)
+    for override in args.budget:
+        module, _, budget = override.partition("=")
+        budgets[module] = float(budget)
+    results = check(budgets, args.repeat)
+
+    text = json.dumps({"python": sys.version.split()[0], "entry_points": results}, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+    sys.exit(0 if all(result["ok"] for result in results.values()) else 1)
+
+
+if __name__ == "__main__":
+    main()
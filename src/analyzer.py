@@ -1,97 +1,64 @@
-import subprocess
-import json
-import xml.etree.ElementTree as ET
-import os
 import logging
+from backends import ANALYZE, get_backend
+from python_analysis import empty_results
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Keep each linter command line well under the smallest common argv limit
+# (32767 characters on Windows); long file lists are split into several runs.
+MAX_ARGV_CHARS = 30000
+MAX_FILES_PER_RUN = 500
+
+
+def chunk_paths(file_paths, max_chars=MAX_ARGV_CHARS, max_files=MAX_FILES_PER_RUN):
+    chunk = []
+    size = 0
+    for path in file_paths:
+        if chunk and (size + len(path) + 1 > max_chars or len(chunk) >= max_files):
+            yield chunk
+            chunk = []
+            size = 0
+        chunk.append(path)
+        size += len(path) + 1
+    if chunk:
+        yield chunk
+
+
 class CodeAnalyzer:
     def __init__(self, config):
         self.config = config
 
     def analyze_file(self, file_path, lang):
-        logger.info(f"Starting analysis for {file_path} with language {lang}")
+        return self.analyze_files([file_path], lang)[file_path]
 
-        if lang == "python":
-            try:
-                logger.info("Running Pylint...")
-                result = subprocess.run(
-                    ["pylint", file_path, "--output-format=json"],
-                    capture_output=True,
-                    text=True
-                )
-                logger.info(f"Pylint command executed with return code: {result.returncode}")
-                logger.info(f"Pylint stdout: {result.stdout}")
-                logger.info(f"Pylint stderr: {result.stderr}")
-                if result.returncode & 32:  # Exit code 32 means fatal error (e.g., file not found)
-                    raise Exception(f"Pylint failed with fatal error: {result.stderr}\n{result.stdout}")
-                return json.loads(result.stdout) if result.stdout else []
-            except FileNotFoundError as e:
-                logger.error(f"Pylint not found: {str(e)}")
-                raise Exception("Pylint not found. Ensure it is installed in the environment.")
-            except json.JSONDecodeError as e:
-                logger.error(f"Pylint output is not valid JSON: {result.stdout}")
-                raise Exception(f"Pylint output is not valid JSON: {result.stdout}")
+    def analyze_files(self, file_paths, lang, sources=None):
+        """Analyze many files of one language, starting one linter process per chunk.
 
-        elif lang == "javascript":
-            try:
-                logger.info("Running ESLint...")
-                result = subprocess.run(
-                    ["npx", "eslint", file_path, "--format", "json"],
-                    capture_output=True,
-                    text=True
-                )
-                logger.info(f"ESLint command executed with return code: {result.returncode}")
-                logger.info(f"ESLint stdout: {result.stdout}")
-                logger.info(f"ESLint stderr: {result.stderr}")
-                if result.returncode not in [0, 1]:  # 1 means issues found, which is fine
-                    raise Exception(f"ESLint failed: {result.stderr}\n{result.stdout}")
-                return json.loads(result.stdout) if result.stdout else []
-            except FileNotFoundError as e:
-                logger.error(f"ESLint not found: {str(e)}")
-                raise Exception("ESLint not found. Ensure it is installed in the environment.")
-            except json.JSONDecodeError as e:
-                logger.error(f"ESLint output is not valid JSON: {result.stdout}")
-                raise Exception(f"ESLint output is not valid JSON: {result.stdout}")
+        Returns a dict mapping each path in ``file_paths`` to the same result
+        shape ``analyze_file`` produces for a single file: ``bugs``, ``code_smells``
+        and ``security_issues`` lists of ``{line, column, severity, message, source}``
+        issues, plus a ``metrics`` dict. ``sources`` optionally maps paths to
+        already-loaded contents.
+        """
+        backend = get_backend(lang, self.config)
+        file_paths = list(file_paths)
+        if ANALYZE not in backend.capabilities:
+            return {path: empty_results() for path in file_paths}
 
-        elif lang == "java":
-            try:
-                # Look for checkstyle.jar and sun_checks.xml in the parent directory (project root)
-                checkstyle_jar = os.path.join(os.path.dirname(os.path.dirname(__file__)), "checkstyle.jar")
-                sun_checks_xml = os.path.join(os.path.dirname(os.path.dirname(__file__)), "sun_checks.xml")
-                logger.info(f"Running Checkstyle with JAR: {checkstyle_jar} and config: {sun_checks_xml}")
-                result = subprocess.run(
-                    ["java", "-jar", checkstyle_jar, "-c", sun_checks_xml, "-f", "xml", file_path],
-                    capture_output=True,
-                    text=True
-                )
-                logger.info(f"Checkstyle command executed with return code: {result.returncode}")
-                logger.info(f"Checkstyle stdout: {result.stdout}")
-                logger.info(f"Checkstyle stderr: {result.stderr}")
-                # Parse Checkstyle XML output regardless of exit status
-                root = ET.fromstring(result.stdout)
-                issues = []
-                for file in root.findall("file"):
-                    for error in file.findall("error"):
-                        issues.append({
-                            "line": error.get("line"),
-                            "column": error.get("column"),
-                            "severity": error.get("severity"),
-                            "message": error.get("message"),
-                            "source": error.get("source")
-                        })
-                return {"issues": issues}
-            except FileNotFoundError as e:
-                logger.error(f"Checkstyle or Java not found: {str(e)}")
-                raise Exception("Checkstyle or Java not found. Ensure they are installed in the environment.")
-            except ET.ParseError as e:
-                logger.error(f"Checkstyle output is not valid XML: {result.stdout}")
-                raise Exception(
-                    f"Checkstyle failed: {result.stderr}\nCheckstyle output is not valid XML: {result.stdout}"
-                )
+        logger.debug("Starting analysis for %d file(s) with language %s", len(file_paths), lang)
+        # Backends without batch support get one linter run per file
+        chunks = chunk_paths(file_paths) if backend.batching else ([path] for path in file_paths)
+        results = {}
+        for chunk in chunks:
+            results.update(backend.analyze(chunk, sources or {}))
+        return results
 
-        else:
-            raise ValueError(f"Unsupported language: {lang}")
+    def analyze_all(self, code_files, sources=None):
+        """Analyze ``(file_path, lang)`` pairs, batching the files of each language."""
+        by_lang = {}
+        for file_path, lang in code_files:
+            by_lang.setdefault(lang, []).append(file_path)
+        results = {}
+        for lang, file_paths in by_lang.items():
+            results.update(self.analyze_files(file_paths, lang, sources))
+        return results
@@ -5,28 +5,152 @@ import logging
 # Add the src directory to sys.path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from flask import Flask, request, render_template, send_file, jsonify
+from flask import Flask, request, render_template, send_file, jsonify, Response
 import zipfile
-import shutil
-import json
 import tempfile
-from src.analyzer import CodeAnalyzer
-from improver import CodeImprover
-from output_generator import OutputGenerator
 from config import Config
+from pipeline import resolve_jobs
+from jobs import JobManager, JobQueueFull
+from workspace import Workspace, DiskQuotaExceeded
+from ingest import ingest_zip, IngestLimits, ArchiveRejected
+from git_source import RemoteCheckout, is_remote_url
+from discovery import FileDiscovery
+from instrumentation import Recorder, prometheus_text
+from log_setup import configure_logging
+from structured_output import OUTPUT_FORMATS, UnknownOutputFormat, output_path, parse_formats
 
 app = Flask(__name__)
 # Use /tmp/ for Vercel serverless environment
 UPLOAD_FOLDER = os.path.join(tempfile.gettempdir(), "uploads")
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+# Each request/job gets its own workspace under UPLOAD_FOLDER, capped at this size
+WORKSPACE_QUOTA_BYTES = int(os.environ.get("WORKSPACE_QUOTA_MB", 1024)) * 1024 * 1024
+# Upload size and ZIP expansion limits (zip-bomb protection)
+app.config["MAX_CONTENT_LENGTH"] = int(os.environ.get("MAX_UPLOAD_MB", 256)) * 1024 * 1024
+UPLOAD_LIMITS = IngestLimits(
+    max_entries=int(os.environ.get("MAX_UPLOAD_ENTRIES", 100000)),
+    max_total_bytes=int(os.environ.get("MAX_EXTRACTED_MB", 512)) * 1024 * 1024,
+    max_file_bytes=int(os.environ.get("MAX_SOURCE_FILE_MB", 5)) * 1024 * 1024
+)
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
+# Keep ESLint/Prettier/Checkstyle/google-java-format running across requests
+USE_TOOL_DAEMONS = os.environ.get("CODE_REVIEW_DAEMONS", "0") == "1"
+
+# Background job limits: concurrent jobs, waiting jobs, and pipeline workers per job
+MAX_CONCURRENT_JOBS = int(os.environ.get("MAX_CONCURRENT_JOBS", 2))
+MAX_QUEUED_JOBS = int(os.environ.get("MAX_QUEUED_JOBS", 16))
+MAX_WORKERS_PER_JOB = int(os.environ.get("MAX_WORKERS_PER_JOB", max(1, (os.cpu_count() or 1) // MAX_CONCURRENT_JOBS)))
+JOB_RETENTION_SECONDS = int(os.environ.get("JOB_RETENTION_SECONDS", 3600))
+
+job_manager = JobManager(MAX_CONCURRENT_JOBS, MAX_QUEUED_JOBS, JOB_RETENTION_SECONDS)
+
+# Content types for the review outputs served by /api/analyze and /api/jobs/<id>/output/<format>
+OUTPUT_MIMETYPES = {"markdown": "text/markdown", "sarif": "application/sarif+json", "jsonl": "application/x-ndjson"}
+
+# This module is the web entry point, so it owns the logging setup; LOG_LEVEL=DEBUG
+# includes raw linter output, TOOL_OUTPUT_LOG sends that output to a file instead
+configure_logging(os.environ.get("LOG_LEVEL", "INFO"), os.environ.get("TOOL_OUTPUT_LOG"))
 logger = logging.getLogger(__name__)
 
+def load_config(config_data):
+    config = Config.from_dict(config_data)
+    # Reject unknown output formats before any work starts
+    config.set("output_formats", parse_formats(config.get("output_formats")))
+    if USE_TOOL_DAEMONS:
+        config.set("daemons", {**(config.get("daemons") or {}), "enabled": True})
+    return config
+
+def config_from_form(form):
+    return {
+        "priorities": {
+            "security": int(form.get("security_priority", 1)),
+            "performance": int(form.get("performance_priority", 1)),
+            "readability": int(form.get("readability_priority", 1))
+        },
+        "style": {
+            "python": {"line_length": int(form.get("line_length_python", 88))},
+            "javascript": {"printWidth": int(form.get("line_length_js", 80))},
+            "java": {"maxLineLength": int(form.get("line_length_java", 100))}
+        },
+        "exclude": form.get("exclude", "").split(","),
+        "aggressiveness": form.get("aggressiveness", "moderate")
+    }
+
+def extract_upload(upload, workspace, config):
+    """Extract the reviewable members of an uploaded ZIP into the workspace."""
+    # The upload stream is already spooled by Werkzeug, so read it in place
+    return ingest_zip(
+        upload.stream, workspace.subdir("extracted"), config.get("exclude"),
+        limits=UPLOAD_LIMITS, reserve=workspace.reserve
+    )
+
+def run_review(config, input_path, workspace, ingested=None, progress=None, cancel_event=None):
+    """Analyze, improve and report on every supported file under input_path; returns the report path."""
+    # Imported per review rather than at startup, so cold starts that only serve
+    # the form, /metrics or job status never load the analysis stack
+    from analyzer import CodeAnalyzer
+    from improver import CodeImprover
+    from output_generator import OutputGenerator
+    from pipeline import ReviewPipeline
+    from project_index import ProjectIndex
+    from scheduler import Scheduler
+    from cache import ResultCache
+
+    # Issue history is kept per named input; uploads and checkouts get a new directory every time
+    project = input_path if ingested is None else None
+    if ingested is None and is_remote_url(input_path):
+        # A worktree inside the workspace, so it is removed along with it
+        input_path = RemoteCheckout.from_config(input_path, config, parent_dir=workspace.path).checkout()
+        workspace.check_quota()
+
+    analyzer = CodeAnalyzer(config)
+    improver = CodeImprover(config)
+    output_gen = OutputGenerator(config, workspace.subdir("output"), workspace.subdir("reports"), reserve=workspace.reserve)
+
+    if ingested is not None:
+        code_files, dependencies, sources = ingested.code_files, ingested.dependencies, ingested.sources
+    else:
+        logger.info("Scanning directory %s", input_path)
+        # Lazy: files are reviewed while the walk continues; manifests are collected as found
+        discovery = FileDiscovery.from_config(input_path, config)
+        dependencies, sources = discovery.dependencies, None
+
+    recorder = Recorder()
+    if ingested is None:
+        code_files = recorder.timed("discovery", discovery)
+    output_gen.start_report()
+    pipeline = ReviewPipeline(
+        config, analyzer, improver, output_gen,
+        cache=ResultCache.from_config(config, input_path), progress=progress, cancel_event=cancel_event,
+        sources=sources, recorder=recorder, scheduler=Scheduler(config, input_path, project),
+        project_index=ProjectIndex.from_config(config)
+    )
+    pipeline.run(code_files)
+
+    logger.info("Generating report")
+    report_path = output_gen.generate_report(dependencies, recorder, pipeline.coverage(), pipeline.project_index)
+    # Reports are streamed while the review runs, so they are only counted at the end
+    workspace.check_quota()
+    return report_path
+
+@app.errorhandler(DiskQuotaExceeded)
+def handle_quota_exceeded(e):
+    logger.error("Workspace quota exceeded: %s", e)
+    return str(e), 413
+
+@app.errorhandler(ArchiveRejected)
+def handle_archive_rejected(e):
+    logger.error("Archive rejected: %s", e)
+    return str(e), 413
+
+@app.errorhandler(UnknownOutputFormat)
+def handle_unknown_output_format(e):
+    logger.error("Bad request: %s", e)
+    return jsonify({"error": str(e)}), 400
+
 @app.errorhandler(Exception)
 def handle_exception(e):
-    logger.error(f"Unhandled exception: {str(e)}", exc_info=True)
+    logger.error("Unhandled exception: %s", e, exc_info=True)
     return f"Internal Server Error: {str(e)}", 500
 
 @app.route("/", methods=["GET", "POST"])
@@ -39,121 +163,49 @@ def index():
             return "No file uploaded or invalid file", 400
 
         logger.info("Creating config data")
-        config_data = {
-            "priorities": {
-                "security": int(request.form.get("security_priority", 1)),
-                "performance": int(request.form.get("performance_priority", 1)),
-                "readability": int(request.form.get("readability_priority", 1))
-            },
-            "style": {
-                "python": {"line_length": int(request.form.get("line_length_python", 88))},
-                "javascript": {"printWidth": int(request.form.get("line_length_js", 80))},
-                "java": {"maxLineLength": int(request.form.get("line_length_java", 100))}
-            },
-            "exclude": request.form.get("exclude", "").split(","),
-            "aggressiveness": request.form.get("aggressiveness", "moderate")
-        }
-        
-        config_path = None
-        input_path = None
-        extract_path = None
-        report_path = None
-        
         try:
-            logger.info(f"Writing config to {UPLOAD_FOLDER}/temp_config.json")
-            config_path = os.path.join(UPLOAD_FOLDER, "temp_config.json")
-            with open(config_path, "w") as f:
-                json.dump(config_data, f)
-            logger.info("Initializing Config class")
-            config = Config(config_path)
+            config = load_config(config_from_form(request.form))
         except Exception as e:
-            logger.error(f"Failed to create config: {str(e)}", exc_info=True)
+            logger.error("Failed to create config: %s", e, exc_info=True)
             return f"Failed to create config: {str(e)}", 500
         
+        workspace = Workspace(UPLOAD_FOLDER, WORKSPACE_QUOTA_BYTES)
+        ingested = None
         try:
-            logger.info(f"Saving uploaded file to {UPLOAD_FOLDER}/{file.filename}")
-            input_path = os.path.join(UPLOAD_FOLDER, file.filename)
-            file.save(input_path)
-            extract_path = os.path.join(UPLOAD_FOLDER, "extracted")
-            if input_path.endswith(".zip"):
-                logger.info(f"Extracting ZIP to {extract_path}")
-                with zipfile.ZipFile(input_path, "r") as zip_ref:
-                    zip_ref.extractall(extract_path)
-                input_path = extract_path
+            logger.info("Saving uploaded file %s to %s", file.filename, workspace.path)
+            if file.filename.endswith(".zip"):
+                ingested = extract_upload(file, workspace, config)
+                input_path = ingested.root
             else:
-                extract_path = None  # No extraction if not a ZIP
+                input_path = workspace.subdir("extracted")
+                file.save(os.path.join(input_path, os.path.basename(file.filename)))
+                workspace.check_quota()
         except zipfile.BadZipFile:
             logger.error("Invalid ZIP file")
+            workspace.cleanup()
             return "Invalid ZIP file", 400
+        except (DiskQuotaExceeded, ArchiveRejected):
+            workspace.cleanup()
+            raise
         except Exception as e:
-            logger.error(f"Failed to extract ZIP file: {str(e)}", exc_info=True)
+            logger.error("Failed to extract ZIP file: %s", e, exc_info=True)
+            workspace.cleanup()
             return f"Failed to extract ZIP file: {str(e)}", 500
         
         try:
-            logger.info(f"Creating output directory at {UPLOAD_FOLDER}/output")
-            output_dir = os.path.join(UPLOAD_FOLDER, "output")
-            os.makedirs(output_dir, exist_ok=True)
-            logger.info("Initializing CodeAnalyzer")
-            analyzer = CodeAnalyzer(config)
-            logger.info("Initializing CodeImprover")
-            improver = CodeImprover(config)
-            logger.info("Initializing OutputGenerator")
-            output_gen = OutputGenerator(config, output_dir)
-        except Exception as e:
-            logger.error(f"Failed to initialize analyzer/improver: {str(e)}", exc_info=True)
-            return f"Failed to initialize analyzer/improver: {str(e)}", 500
-        
-        supported_extensions = {".py": "python", ".js": "javascript", ".java": "java"}
-        code_files = []
-        dependencies = []
-        try:
-            logger.info(f"Scanning directory {input_path}")
-            for root, _, files in os.walk(input_path):
-                if any(exclude in root for exclude in config.get("exclude")):
-                    continue
-                for f in files:
-                    ext = os.path.splitext(f)[1].lower()
-                    if ext in supported_extensions:
-                        code_files.append((os.path.join(root, f), supported_extensions[ext]))
-                    elif f in ('requirements.txt', 'package.json', 'pom.xml'):
-                        dependencies.append(os.path.join(root, f))
+            report_path = run_review(config, input_path, workspace, ingested)
+        except DiskQuotaExceeded:
+            workspace.cleanup()
+            raise
         except Exception as e:
-            logger.error(f"Failed to scan directory: {str(e)}", exc_info=True)
-            return f"Failed to scan directory: {str(e)}", 500
+            logger.error("Failed to process files: %s", e, exc_info=True)
+            workspace.cleanup()
+            return f"Failed to process files: {str(e)}", 500
         
-        logger.info(f"Found {len(code_files)} code files to process")
-        for file_path, lang in code_files:
-            try:
-                logger.info(f"Analyzing file {file_path} ({lang})")
-                analysis_results = analyzer.analyze_file(file_path, lang)
-                logger.info(f"Improving code for {file_path}")
-                improved_code = improver.improve_code(file_path, analysis_results, lang)
-                logger.info(f"Saving improved code for {file_path}")
-                output_gen.save_improved_code(file_path, improved_code, analysis_results)
-            except Exception as e:
-                logger.error(f"Failed to process file {file_path}: {str(e)}", exc_info=True)
-                return f"Failed to process file {file_path}: {str(e)}", 500
-        
-        try:
-            logger.info("Generating report")
-            report_path = output_gen.generate_report(dependencies)
-        except Exception as e:
-            logger.error(f"Failed to generate report: {str(e)}", exc_info=True)
-            return f"Failed to generate report: {str(e)}", 500
-        
-        # Send the report before cleanup
-        logger.info(f"Sending report file: {report_path}")
+        # Remove the workspace once the report has been streamed to the client
+        logger.info("Sending report file: %s", report_path)
         response = send_file(report_path, as_attachment=True)
-        
-        # Clean up after sending the response
-        logger.info(f"Cleaning up: removing {extract_path}, {config_path}, {input_path}")
-        if extract_path and os.path.exists(extract_path):
-            shutil.rmtree(extract_path, ignore_errors=True)
-        if config_path and os.path.exists(config_path):
-            os.remove(config_path)
-        if input_path and os.path.exists(input_path):
-            os.remove(input_path)
-        
+        response.call_on_close(workspace.cleanup)
         return response
 
     return render_template("index.html")
@@ -161,47 +213,136 @@ def index():
 @app.route("/api/analyze", methods=["POST"])
 def api_analyze():
     logger.info("Received POST request to /api/analyze")
-    data = request.get_json()
+    data = request.get_json(silent=True) or {}
     input_path = data.get("input_path")
-    config_data = data.get("config", {})
-    
-    config_path = os.path.join(UPLOAD_FOLDER, "temp_config.json")
-    with open(config_path, "w") as f:
-        json.dump(config_data, f)
-    config = Config(config_path)
-    
-    output_dir = os.path.join(UPLOAD_FOLDER, "output")
-    analyzer = CodeAnalyzer(config)
-    improver = CodeImprover(config)
-    output_gen = OutputGenerator(config, output_dir)
-    
-    supported_extensions = {".py": "python", ".js": "javascript", ".java": "java"}
-    code_files = []
-    dependencies = []
-    for root, _, files in os.walk(input_path):
-        if any(exclude in root for exclude in config.get("exclude")):
-            continue
-        for f in files:
-            ext = os.path.splitext(f)[1].lower()
-            if ext in supported_extensions:
-                code_files.append((os.path.join(root, f), supported_extensions[ext]))
-            elif f in ('requirements.txt', 'package.json', 'pom.xml'):
-                dependencies.append(os.path.join(root, f))
-    
-    for file_path, lang in code_files:
-        analysis_results = analyzer.analyze_file(file_path, lang)
-        improved_code = improver.improve_code(file_path, analysis_results, lang)
-        output_gen.save_improved_code(file_path, improved_code, analysis_results)
+    if not input_path or not (is_remote_url(input_path) or os.path.isdir(input_path)):
+        return jsonify({"error": "Provide an existing input_path or a Git URL"}), 400
+    config = load_config(data.get("config", {}))
     
-    report_path = output_gen.generate_report(dependencies)
-    
-    with open(report_path, 'r') as f:
-        report_content = f.read()
+    # {"format": "sarif"} or {"format": "jsonl"} streams that file back instead of Markdown inside JSON
+    fmt = data.get("format", "markdown")
+    if fmt not in OUTPUT_FORMATS:
+        raise UnknownOutputFormat(f"Unknown output format: {fmt} (choose from {', '.join(OUTPUT_FORMATS)})")
+    if fmt != "markdown":
+        config.set("output_formats", parse_formats([*config.get("output_formats"), fmt]))
+        workspace = Workspace(UPLOAD_FOLDER, WORKSPACE_QUOTA_BYTES)
+        try:
+            report_path = run_review(config, input_path, workspace)
+        except Exception:
+            workspace.cleanup()
+            raise
+        response = send_file(output_path(report_path, fmt), mimetype=OUTPUT_MIMETYPES[fmt])
+        response.call_on_close(workspace.cleanup)
+        return response
     
-    shutil.rmtree(output_dir, ignore_errors=True)
-    os.remove(config_path)
+    with Workspace(UPLOAD_FOLDER, WORKSPACE_QUOTA_BYTES) as workspace:
+        report_path = run_review(config, input_path, workspace)
+        with open(report_path, 'r') as f:
+            report_content = f.read()
     
-    return jsonify({"report": report_content, "output_dir": output_dir})
+    # The improved code is removed along with the workspace, so only the report is returned
+    return jsonify({"report": report_content})
+
+@app.route("/api/jobs", methods=["POST"])
+def create_job():
+    """Start a review in the background; accepts the /api/analyze JSON body or a ZIP upload."""
+    logger.info("Received POST request to /api/jobs")
+    workspace = Workspace(UPLOAD_FOLDER, WORKSPACE_QUOTA_BYTES, prefix="job_")
+    try:
+        upload = request.files.get("codebase")
+        ingested = None
+        if upload and upload.filename:
+            config = load_config(config_from_form(request.form))
+            ingested = extract_upload(upload, workspace, config)
+            input_path = ingested.root
+            description = upload.filename
+        else:
+            data = request.get_json(silent=True) or {}
+            input_path = data.get("input_path")
+            config = load_config(data.get("config", {}))
+            description = input_path
+        # Git URLs are cloned by the job itself, not while the request waits
+        if not input_path or not (is_remote_url(input_path) or os.path.isdir(input_path)):
+            workspace.cleanup()
+            return jsonify({"error": "Provide a ZIP upload, an existing input_path or a Git URL"}), 400
+        # Cap each job's workers so one large repository can't take the whole machine
+        config.set("jobs", min(resolve_jobs(config.get("jobs")), MAX_WORKERS_PER_JOB))
+    except zipfile.BadZipFile:
+        workspace.cleanup()
+        return jsonify({"error": "Invalid ZIP file"}), 400
+    except Exception:
+        workspace.cleanup()
+        raise
+
+    def work(job):
+        return run_review(
+            config, input_path, workspace, ingested,
+            progress=job.update_progress, cancel_event=job.cancel_event
+        )
+
+    try:
+        job = job_manager.submit(work, description=description, cleanup=workspace.cleanup)
+    except JobQueueFull as e:
+        workspace.cleanup()
+        return jsonify({"error": str(e)}), 429
+    return jsonify(job.to_dict()), 202
+
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    result = job.to_dict()
+    if job.status == "succeeded":
+        with open(job.report_path, 'r') as f:
+            result["report"] = f.read()
+    return jsonify(result)
+
+@app.route("/api/jobs/<job_id>/report", methods=["GET"])
+def get_job_report(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    if job.status != "succeeded":
+        return jsonify({"error": f"Job is {job.status}"}), 409
+    return send_file(job.report_path, as_attachment=True)
+
+@app.route("/api/jobs/<job_id>/output/<fmt>", methods=["GET"])
+def get_job_output(job_id, fmt):
+    """One of a finished job's outputs: markdown, or sarif/jsonl if the job's config asked for it."""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    if job.status != "succeeded":
+        return jsonify({"error": f"Job is {job.status}"}), 409
+    if fmt not in OUTPUT_FORMATS:
+        return jsonify({"error": f"Unknown output format: {fmt}"}), 404
+    path = output_path(job.report_path, fmt)
+    if not os.path.exists(path):
+        return jsonify({"error": f"Job did not write {fmt} output; add it to config output_formats"}), 404
+    return send_file(path, mimetype=OUTPUT_MIMETYPES[fmt])
+
+@app.route("/api/jobs/<job_id>", methods=["DELETE"])
+def cancel_job(job_id):
+    job = job_manager.cancel(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify(job.to_dict()), 202
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Prometheus scrape endpoint: stage/tool totals for finished runs plus live job counts."""
+    statuses = {"queued": 0, "running": 0, "succeeded": 0, "failed": 0, "cancelled": 0}
+    with job_manager.lock:
+        for job in job_manager.jobs.values():
+            statuses[job.status] = statuses.get(job.status, 0) + 1
+    gauges = {
+        "code_review_jobs": (
+            "Review jobs currently tracked, by status.",
+            {(("status", status),): count for status, count in statuses.items()}
+        )
+    }
+    return Response(prometheus_text(gauges=gauges), mimetype="text/plain; version=0.0.4")
 
 @app.route('/favicon.ico')
 def favicon():
@@ -0,0 +1,731 @@
+import io
+import os
+import re
+import ast
+import json
+import fnmatch
+import hashlib
+import logging
+import shutil
+import xml.etree.ElementTree as ET
+from daemons import get_daemon_pool, DaemonError
+from python_analysis import analyze_source, empty_results, issue
+from instrumentation import run_tool, tool
+from log_setup import excerpt, log_tool_output
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ESLINT_CONFIG_FILES = (".eslintrc.json", ".eslintrc.js", ".eslintrc.cjs", ".eslintrc.yml", "eslint.config.js")
+
+# Where a backend's work runs best. The pipeline sends in-process backends (CPU-bound
+# Python code) to worker processes; the others mostly wait on a tool and use threads.
+IN_PROCESS = "in-process"
+SUBPROCESS = "subprocess"
+DAEMON = "daemon"
+
+# What a backend can do with a file
+ANALYZE = "analyze"
+IMPROVE = "improve"
+FORMAT = "format"
+
+# Pylint message types that indicate a likely bug rather than a style problem
+PYLINT_BUG_TYPES = {"fatal", "error"}
+# ESLint rules whose findings are security issues rather than bugs or smells
+ESLINT_SECURITY_RULES = {"no-eval", "no-implied-eval", "no-new-func", "no-script-url"}
+
+# Project index: top-level symbols and imports, read without running any tool
+PYTHON_ENTRY_POINTS = {"__init__.py", "__main__.py", "setup.py", "conftest.py", "manage.py", "wsgi.py", "asgi.py"}
+JS_IMPORT = re.compile(r"""(?:\bfrom\s*|\bimport\s*\(?\s*|\brequire\s*\(\s*)['"]([^'"\n]+)['"]""")
+JS_SYMBOL = re.compile(
+    r"^(?:export\s+(?:default\s+)?)?(?:(?:async\s+)?function\s*\*?\s*(\w+)|class\s+(\w+)|(?:const|let|var)\s+(\w+)\s*=)",
+    re.MULTILINE,
+)
+JAVA_PACKAGE = re.compile(r"^\s*package\s+([\w.]+)\s*;", re.MULTILINE)
+JAVA_IMPORT = re.compile(r"^\s*import\s+(static\s+)?([\w.]+(?:\.\*)?)\s*;", re.MULTILINE)
+JAVA_SYMBOL = re.compile(
+    r"^\s*(?:(?:public|protected|private|abstract|final|static|sealed|non-sealed)\s+)*"
+    r"(?:class|interface|enum|record|@interface)\s+(\w+)",
+    re.MULTILINE,
+)
+JAVA_TYPE_NAME = re.compile(r"\b[A-Z]\w*")
+JAVA_MAIN = re.compile(r"\bstatic\s+void\s+main\s*\(")
+
+# language -> Backend subclass, and file extension -> language
+BACKENDS = {}
+SUPPORTED_EXTENSIONS = {}
+
+
+def register(backend_class):
+    """Class decorator adding a backend to the registry."""
+    BACKENDS[backend_class.language] = backend_class
+    for extension in backend_class.extensions:
+        SUPPORTED_EXTENSIONS[extension] = backend_class.language
+    return backend_class
+
+
+def get_backend(language, config):
+    backend_class = BACKENDS.get(language)
+    if backend_class is None:
+        raise ValueError(f"Unsupported language: {language}")
+    return backend_class(config)
+
+
+class Backend:
+    """Everything language-specific: which files, which tools, and how to schedule them.
+
+    Subclasses declare their ``extensions``, the ``capabilities`` they offer
+    (analyze, improve, format), whether one linter run can take a whole batch of
+    files (``batching``) and the ``executor`` their work prefers (in-process,
+    subprocess or daemon). The pipeline plans its batches and pools from these.
+    """
+
+    language = None
+    extensions = ()
+    # Line comment syntax for the TODO header each improved file starts with
+    comment_prefix = "//"
+    capabilities = frozenset()
+    batching = True
+    executor = SUBPROCESS
+    # Tool -> the priority ("security", "performance", "readability") that turns it
+    # on; tools not listed always run
+    checks = {}
+    # Config files (git wildmatch patterns) the tools look for next to the reviewed
+    # sources; sparse Git checkouts must include them
+    config_files = ()
+    # File names a test runner collects; the project index never reports them as unused
+    test_file_pattern = None
+
+    def __init__(self, config):
+        self.config = config
+
+    def runs(self, tool_name):
+        """Whether ``tool_name`` runs under this config's priorities (priority 0 turns a check off)."""
+        check = self.checks.get(tool_name)
+        return check is None or self.config.priority(check) > 0
+
+    def executor_type(self):
+        """The executor this run actually uses; daemon backends run tools directly when daemons are off."""
+        if self.executor == DAEMON and not (self.config.get("daemons") or {}).get("enabled"):
+            return SUBPROCESS
+        return self.executor
+
+    def concurrency(self, jobs):
+        """How many batches of this language are worth running at once with ``jobs`` workers."""
+        if self.executor_type() == DAEMON:
+            # Requests beyond the daemon instances would only queue for one
+            return max(1, min(jobs, int((self.config.get("daemons") or {}).get("instances", 1))))
+        return jobs
+
+    def analyze(self, file_paths, sources):
+        """Lint ``file_paths`` (one batch) and return ``{path: results}``."""
+        return {path: empty_results() for path in file_paths}
+
+    def improve(self, code, file_path, analysis_results):
+        """Apply this language's documentation edits and formatting to ``code``."""
+        return code
+
+    @classmethod
+    def tool_versions(cls):
+        """Versions/fingerprints of the tools results depend on, without starting them (for cache keys)."""
+        return {}
+
+    @classmethod
+    def config_fingerprint(cls, directory):
+        """Hashes of the ``config_files`` directly in ``directory``, by name (for cache keys)."""
+        try:
+            names = sorted(os.listdir(directory))
+        except OSError:
+            return {}
+        return {
+            name: _file_fingerprint(os.path.join(directory, name))
+            for name in names
+            if any(fnmatch.fnmatchcase(name, pattern) for pattern in cls.config_files)
+        }
+
+    @classmethod
+    def index_file(cls, entry, code):
+        """Record the symbols and imports of ``code`` on a project index entry (``project_index.IndexedFile``).
+
+        Imports go to ``entry.imports`` as (name as written, line); anything else
+        ``import_resolver`` needs goes to ``entry.details``.
+        """
+
+    @classmethod
+    def import_resolver(cls, entries):
+        """A ``resolve(entry, name)`` function giving the paths among ``entries`` that an import refers to."""
+        return lambda entry, name: []
+
+    @classmethod
+    def used_without_import(cls, entries):
+        """Paths of ``entries`` that other files can use without importing them."""
+        return set()
+
+
+@register
+class PythonBackend(Backend):
+    language = "python"
+    extensions = (".py",)
+    comment_prefix = "#"
+    capabilities = frozenset({ANALYZE, IMPROVE, FORMAT})
+    # bandit, radon and black run inside the agent and are CPU-bound
+    executor = IN_PROCESS
+    checks = {"bandit": "security", "radon": "performance"}
+    config_files = ("pylintrc", ".pylintrc", "pyproject.toml", "setup.cfg", "tox.ini", ".bandit")
+    test_file_pattern = re.compile(r"^test_.*\.py$|_test\.py$")
+
+    def analyze(self, file_paths, sources):
+        results = self._run_pylint(file_paths)
+        security, complexity = self.runs("bandit"), self.runs("radon")
+        if not (security or complexity):
+            return results
+        # Bandit and radon run in this process on one shared parse of each file
+        for file_path, result in results.items():
+            code = sources.get(file_path)
+            if code is None:
+                with open(file_path, 'r') as f:
+                    code = f.read()
+            native = analyze_source(file_path, code, security, complexity)
+            result["security_issues"].extend(native["security_issues"])
+            result["code_smells"].extend(native["code_smells"])
+            result["metrics"].update(native["metrics"])
+        return results
+
+    def _run_pylint(self, file_paths):
+        try:
+            logger.debug("Running Pylint on %d file(s)", len(file_paths))
+            result = run_tool(
+                "pylint",
+                ["pylint", *file_paths, "--output-format=json"],
+                capture_output=True,
+                text=True
+            )
+            log_tool_output("pylint", result)
+            if result.returncode & 32:  # Exit code 32 means fatal error (e.g., file not found)
+                raise Exception(
+                    f"Pylint failed with fatal error: {excerpt(result.stderr)}\n{excerpt(result.stdout)}"
+                )
+            messages = json.loads(result.stdout) if result.stdout else []
+        except FileNotFoundError as e:
+            logger.error("Pylint not found: %s", e)
+            raise Exception("Pylint not found. Ensure it is installed in the environment.")
+        except json.JSONDecodeError as e:
+            logger.error("Pylint output is not valid JSON: %s", excerpt(result.stdout))
+            raise Exception(f"Pylint output is not valid JSON: {excerpt(result.stdout)}")
+
+        index = _PathIndex(file_paths)
+        results = {path: empty_results() for path in file_paths}
+        for message in messages:
+            path = index.lookup(message.get("path"))
+            if path is None:
+                logger.warning("Pylint reported an unknown file: %s", message.get("path"))
+                continue
+            kind = "bugs" if message.get("type") in PYLINT_BUG_TYPES else "code_smells"
+            severity = "error" if kind == "bugs" else message.get("type")
+            results[path][kind].append(issue(
+                message.get("line"), message.get("column"), severity,
+                message.get("message"), f"pylint:{message.get('symbol')}"
+            ))
+        return results
+
+    def improve(self, code, file_path, analysis_results):
+        # Refactor: Add docstrings (FR-3.1, FR-3.5), as text edits on a single parse
+        if self.config.get("aggressiveness") != "low":
+            code = self._add_docstrings(code)
+
+        # Format with black once, after all edits (FR-3.4); imported here so
+        # JavaScript/Java-only runs never pay for loading it
+        import black
+        try:
+            with tool("black"):
+                return black.format_str(code, mode=black.FileMode(line_length=self.config.get_style("python")["line_length"]))
+        except Exception:
+            return code
+
+    @staticmethod
+    def _add_docstrings(code):
+        """Insert a placeholder docstring into every function that lacks one.
+
+        The source is parsed once and edited in place, so formatting and comments
+        are kept; code that doesn't parse, before or after the edits, is returned unchanged.
+        """
+        try:
+            tree = ast.parse(code)
+        except (SyntaxError, ValueError):
+            return code
+        # Split only where Python itself ends a line; str.splitlines also breaks on \f, \x1c-\x1e, \x85, \u2028...
+        lines = io.StringIO(code, newline="").readlines()
+        edits = []
+        for node in ast.walk(tree):
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and ast.get_docstring(node) is None:
+                first = node.body[0]
+                # A decorated def or class starts at its first decorator, not at its own lineno
+                row = min([first.lineno] + [d.lineno for d in getattr(first, "decorator_list", ())]) - 1
+                edits.append((row, first.col_offset, f'"""Function {node.name} description"""'))
+        # Apply bottom-up so earlier positions stay valid
+        for row, col_offset, docstring in sorted(edits, reverse=True):
+            line = lines[row]
+            # col_offset counts UTF-8 bytes, not characters
+            col = len(line.encode("utf-8")[:col_offset].decode("utf-8", errors="ignore"))
+            if line[:col].strip():
+                # Body on the same line as the def, e.g. "def f(): return 1"
+                lines[row] = f"{line[:col]}{docstring}; {line[col:]}"
+            else:
+                lines.insert(row, f"{line[:col]}{docstring}\n")
+        improved = "".join(lines)
+        try:
+            ast.parse(improved)
+        except (SyntaxError, ValueError):
+            logger.warning("Adding docstrings produced invalid code; keeping the original")
+            return code
+        return improved
+
+    @classmethod
+    def tool_versions(cls):
+        return {name: _package_version(name) for name in ("pylint", "bandit", "radon", "black")}
+
+    @classmethod
+    def index_file(cls, entry, code):
+        if os.path.basename(entry.path) in PYTHON_ENTRY_POINTS:
+            entry.entry_point = True
+        try:
+            tree = ast.parse(code, filename=entry.path)
+        except (SyntaxError, ValueError):
+            return
+        for node in tree.body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                entry.symbols.append(node.name)
+            elif isinstance(node, ast.If) and _is_main_guard(node.test):
+                entry.entry_point = True
+        for node in _statements(tree.body):
+            if isinstance(node, ast.Import):
+                entry.imports.extend((alias.name, node.lineno) for alias in node.names)
+            elif isinstance(node, ast.ImportFrom):
+                # Leading dots mark relative imports; each name may be a submodule or a symbol
+                base = "." * node.level + (node.module or "")
+                entry.imports.extend((f"{base}:{alias.name}", node.lineno) for alias in node.names)
+
+    @classmethod
+    def import_resolver(cls, entries):
+        return _PythonImports(entries).resolve
+
+
+@register
+class JavaScriptBackend(Backend):
+    language = "javascript"
+    extensions = (".js",)
+    capabilities = frozenset({ANALYZE, IMPROVE, FORMAT})
+    # ESLint and Prettier run in a long-lived Node worker when daemons are enabled
+    executor = DAEMON
+    config_files = (
+        *ESLINT_CONFIG_FILES, ".eslintrc", ".eslintrc.yaml", ".eslintignore",
+        ".prettierrc", ".prettierrc.*", "prettier.config.*", ".prettierignore", ".editorconfig",
+    )
+    test_file_pattern = re.compile(r"\.(test|spec)\.js$")
+
+    def analyze(self, file_paths, sources):
+        daemons = get_daemon_pool(self.config)
+        if daemons is not None:
+            try:
+                logger.debug("Sending %d file(s) to the ESLint daemon", len(file_paths))
+                with tool("eslint-daemon"):
+                    output = daemons.eslint(file_paths)
+                return self._split_eslint(file_paths, json.loads(output))
+            except (DaemonError, json.JSONDecodeError) as e:
+                logger.warning("ESLint daemon failed, running ESLint directly: %s", e)
+        try:
+            logger.debug("Running ESLint on %d file(s)", len(file_paths))
+            result = run_tool(
+                "eslint",
+                ["npx", "eslint", *file_paths, "--format", "json"],
+                capture_output=True,
+                text=True
+            )
+            log_tool_output("eslint", result)
+            if result.returncode not in [0, 1]:  # 1 means issues found, which is fine
+                raise Exception(f"ESLint failed: {excerpt(result.stderr)}\n{excerpt(result.stdout)}")
+            entries = json.loads(result.stdout) if result.stdout else []
+        except FileNotFoundError as e:
+            logger.error("ESLint not found: %s", e)
+            raise Exception("ESLint not found. Ensure it is installed in the environment.")
+        except json.JSONDecodeError as e:
+            logger.error("ESLint output is not valid JSON: %s", excerpt(result.stdout))
+            raise Exception(f"ESLint output is not valid JSON: {excerpt(result.stdout)}")
+        return self._split_eslint(file_paths, entries)
+
+    def _split_eslint(self, file_paths, entries):
+        index = _PathIndex(file_paths)
+        results = {path: empty_results() for path in file_paths}
+        for entry in entries:
+            path = index.lookup(entry.get("filePath"))
+            if path is None:
+                logger.warning("ESLint reported an unknown file: %s", entry.get("filePath"))
+                continue
+            for message in entry.get("messages", []):
+                rule = message.get("ruleId")
+                if rule in ESLINT_SECURITY_RULES or (rule or "").startswith("security/"):
+                    kind = "security_issues"
+                else:
+                    # Severity 2 is an error, 1 a warning; parse errors have no rule
+                    kind = "bugs" if message.get("severity") == 2 or message.get("fatal") else "code_smells"
+                results[path][kind].append(issue(
+                    message.get("line"), message.get("column"),
+                    "error" if message.get("severity") == 2 else "warning",
+                    message.get("message"), f"eslint:{rule or 'parse'}"
+                ))
+            results[path]["metrics"].update({
+                "errors": entry.get("errorCount", 0), "warnings": entry.get("warningCount", 0)
+            })
+        return results
+
+    def improve(self, code, file_path, analysis_results):
+        # Format with Prettier (FR-3.4)
+        code = self._run_prettier(code, file_path)
+
+        # Add JSDoc (FR-3.5)
+        if self.config.get("aggressiveness") != "low":
+            code = f"/** @description Improved by AI Code Review Agent */\n{code}"
+        return code
+
+    def _run_prettier(self, code, file_path):
+        print_width = self.config.get_style('javascript')['printWidth']
+        daemons = get_daemon_pool(self.config)
+        if daemons is not None:
+            try:
+                with tool("prettier-daemon"):
+                    return daemons.prettier(code, file_path, print_width)
+            except DaemonError as e:
+                logger.warning("Prettier daemon failed, running Prettier directly: %s", e)
+        # Format via stdin so the input file is left untouched
+        return run_formatter(
+            "prettier", ["npx", "prettier", "--stdin-filepath", file_path, "--print-width", str(print_width)], code
+        )
+
+    @classmethod
+    def tool_versions(cls):
+        return {
+            "eslint": _node_package_version("eslint"),
+            "prettier": _node_package_version("prettier"),
+        }
+
+    @classmethod
+    def index_file(cls, entry, code):
+        for match in JS_SYMBOL.finditer(code):
+            entry.symbols.append(next(name for name in match.groups() if name))
+        for match in JS_IMPORT.finditer(code):
+            entry.imports.append((match.group(1), code.count("\n", 0, match.start()) + 1))
+
+    @classmethod
+    def import_resolver(cls, entries):
+        paths = {os.path.normpath(entry.path): entry.path for entry in entries}
+
+        def resolve(entry, specifier):
+            if not specifier.startswith("."):
+                # A package from node_modules
+                return []
+            base = os.path.normpath(os.path.join(os.path.dirname(entry.path), specifier))
+            for candidate in (base, base + ".js", os.path.join(base, "index.js")):
+                if candidate in paths:
+                    return [paths[candidate]]
+            return []
+
+        return resolve
+
+
+@register
+class JavaBackend(Backend):
+    language = "java"
+    extensions = (".java",)
+    capabilities = frozenset({ANALYZE, IMPROVE, FORMAT})
+    # Checkstyle and google-java-format run in long-lived JVMs when daemons are enabled
+    executor = DAEMON
+    # sun_checks are style and design rules only
+    checks = {"checkstyle": "readability"}
+    config_files = ("checkstyle*.xml", "*_checks.xml")
+    test_file_pattern = re.compile(r"Tests?\.java$")
+
+    def analyze(self, file_paths, sources):
+        if not self.runs("checkstyle"):
+            return super().analyze(file_paths, sources)
+        daemons = get_daemon_pool(self.config)
+        if daemons is not None:
+            try:
+                logger.debug("Sending %d file(s) to the Checkstyle daemon", len(file_paths))
+                with tool("checkstyle-daemon"):
+                    output = daemons.checkstyle(file_paths)
+                return self._split_checkstyle(file_paths, ET.fromstring(output))
+            except (DaemonError, ET.ParseError) as e:
+                logger.warning("Checkstyle daemon failed, running Checkstyle directly: %s", e)
+        try:
+            # Look for checkstyle.jar and sun_checks.xml in the project root
+            checkstyle_jar = os.path.join(PROJECT_ROOT, "checkstyle.jar")
+            sun_checks_xml = os.path.join(PROJECT_ROOT, "sun_checks.xml")
+            logger.debug(
+                "Running Checkstyle on %d file(s) with JAR %s and config %s",
+                len(file_paths), checkstyle_jar, sun_checks_xml
+            )
+            result = run_tool(
+                "checkstyle",
+                ["java", "-jar", checkstyle_jar, "-c", sun_checks_xml, "-f", "xml", *file_paths],
+                capture_output=True,
+                text=True
+            )
+            log_tool_output("checkstyle", result)
+            # Parse Checkstyle XML output regardless of exit status
+            root = ET.fromstring(result.stdout)
+        except FileNotFoundError as e:
+            logger.error("Checkstyle or Java not found: %s", e)
+            raise Exception("Checkstyle or Java not found. Ensure they are installed in the environment.")
+        except ET.ParseError as e:
+            logger.error("Checkstyle output is not valid XML: %s", excerpt(result.stdout))
+            raise Exception(
+                f"Checkstyle failed: {excerpt(result.stderr)}\n"
+                f"Checkstyle output is not valid XML: {excerpt(result.stdout)}"
+            )
+        return self._split_checkstyle(file_paths, root)
+
+    def _split_checkstyle(self, file_paths, root):
+        index = _PathIndex(file_paths)
+        results = {path: empty_results() for path in file_paths}
+        for file in root.findall("file"):
+            path = index.lookup(file.get("name"))
+            if path is None:
+                logger.warning("Checkstyle reported an unknown file: %s", file.get("name"))
+                continue
+            # Checkstyle's sun_checks are style and design rules, so they count as smells
+            for error in file.findall("error"):
+                results[path]["code_smells"].append(issue(
+                    _int_or_none(error.get("line")),
+                    _int_or_none(error.get("column")),
+                    error.get("severity"),
+                    error.get("message"),
+                    f"checkstyle:{(error.get('source') or '').rsplit('.', 1)[-1]}"
+                ))
+        return results
+
+    def improve(self, code, file_path, analysis_results):
+        # Format with google-java-format (FR-3.4)
+        code = self._run_google_java_format(code)
+
+        # Add JavaDoc (FR-3.5)
+        if self.config.get("aggressiveness") != "low":
+            code = f"/** Improved by AI Code Review Agent */\n{code}"
+        return code
+
+    def _run_google_java_format(self, code):
+        daemons = get_daemon_pool(self.config)
+        if daemons is not None:
+            try:
+                with tool("google-java-format-daemon"):
+                    return daemons.google_java_format(code)
+            except DaemonError as e:
+                logger.warning("google-java-format daemon failed, running it directly: %s", e)
+        return run_formatter("google-java-format", ["google-java-format", "-"], code)
+
+    @classmethod
+    def tool_versions(cls):
+        return {
+            "checkstyle": _file_fingerprint(os.path.join(PROJECT_ROOT, "checkstyle.jar")),
+            "checkstyle_config": _file_fingerprint(os.path.join(PROJECT_ROOT, "sun_checks.xml")),
+            "google-java-format": _executable_fingerprint("google-java-format"),
+        }
+
+    @classmethod
+    def index_file(cls, entry, code):
+        package = JAVA_PACKAGE.search(code)
+        entry.details["package"] = package.group(1) if package else ""
+        entry.symbols.extend(match.group(1) for match in JAVA_SYMBOL.finditer(code))
+        for match in JAVA_IMPORT.finditer(code):
+            name = match.group(2)
+            if match.group(1):
+                # import static a.b.C.member -> a.b.C
+                name = name.rsplit(".", 1)[0]
+            entry.imports.append((name, code.count("\n", 0, match.start()) + 1))
+        # Capitalised names used in the file: same-package classes need no import
+        references = set(JAVA_TYPE_NAME.findall(code))
+        references.discard(_class_name(entry))
+        entry.details["references"] = references
+        entry.entry_point = bool(JAVA_MAIN.search(code))
+
+    @classmethod
+    def import_resolver(cls, entries):
+        return _JavaImports(entries).resolve
+
+    @classmethod
+    def used_without_import(cls, entries):
+        referenced = {(entry.details["package"], name) for entry in entries for name in entry.details["references"]}
+        return {entry.path for entry in entries if (entry.details["package"], _class_name(entry)) in referenced}
+
+
+def run_formatter(name, command, code):
+    """Pipe ``code`` through a formatter; a missing or failing formatter leaves it unformatted."""
+    try:
+        result = run_tool(name, command, input=code, capture_output=True, text=True)
+    except OSError:
+        return code
+    if result.returncode != 0 or not result.stdout:
+        return code
+    return result.stdout
+
+
+class _PythonImports:
+    """Maps Python import names, as recorded by ``PythonBackend.index_file``, to indexed files."""
+
+    def __init__(self, entries):
+        # Every dotted suffix of a module's path-derived name, so "src/pkg/mod.py"
+        # is found as pkg.mod and mod too
+        self.names = {}
+        self.modules = {}
+        for entry in entries:
+            parts = _python_parts(entry.path)
+            self.modules[entry.path] = parts
+            for i in range(len(parts)):
+                self.names.setdefault(".".join(parts[i:]), []).append(entry.path)
+
+    def resolve(self, entry, name):
+        if ":" not in name:
+            return self._module(entry, name)
+        base, _, member = name.partition(":")
+        level = len(base) - len(base.lstrip("."))
+        module = base[level:]
+        if level:
+            parts = self.modules[entry.path]
+            package = parts if os.path.basename(entry.path) == "__init__.py" else parts[:-1]
+            package = package[:len(package) - (level - 1)]
+            module = ".".join([*package, module] if module else package)
+            # Relative names are exact, so no suffix matching
+            for candidate in (f"{module}.{member}" if module else member, module):
+                found = [path for path in self.names.get(candidate, []) if self.modules[path] == candidate.split(".")]
+                if found:
+                    return found
+            return []
+        # "from pkg import mod" imports a submodule if there is one, otherwise a symbol of pkg
+        return self._module(entry, f"{module}.{member}") or self._module(entry, module)
+
+    def _module(self, entry, module):
+        candidates = self.names.get(module, [])
+        if len(candidates) > 1:
+            # Several files end in the same dotted name; prefer the closest to the importer
+            directory = os.path.dirname(entry.path)
+            best = max(len(os.path.commonpath([directory, path])) for path in candidates)
+            candidates = [path for path in candidates if len(os.path.commonpath([directory, path])) == best]
+        return candidates
+
+
+class _JavaImports:
+    """Maps Java imports (classes, nested classes and packages) to indexed files."""
+
+    def __init__(self, entries):
+        self.entries = {entry.path: entry for entry in entries}
+        self.classes = {}
+        self.packages = {}
+        for entry in entries:
+            package = entry.details["package"]
+            self.classes[f"{package}.{_class_name(entry)}" if package else _class_name(entry)] = entry.path
+            self.packages.setdefault(package, []).append(entry.path)
+
+    def resolve(self, entry, name):
+        if name.endswith(".*"):
+            # Only the classes of the package that the file actually uses
+            return [
+                path for path in self.packages.get(name[:-2], [])
+                if _class_name(self.entries[path]) in entry.details["references"]
+            ]
+        # a.b.C, or a.b.C.Inner for a nested class
+        while name:
+            if name in self.classes:
+                return [self.classes[name]]
+            name = name.rpartition(".")[0]
+        return []
+
+
+def _statements(body):
+    # Imports are statements, so expressions (most of the tree) are never visited
+    pending = list(reversed(body))
+    while pending:
+        node = pending.pop()
+        yield node
+        for field in ("cases", "finalbody", "orelse", "handlers", "body"):
+            pending.extend(reversed(getattr(node, field, ())))
+
+
+def _is_main_guard(test):
+    return (
+        isinstance(test, ast.Compare) and isinstance(test.left, ast.Name) and test.left.id == "__name__"
+        and any(isinstance(c, ast.Constant) and c.value == "__main__" for c in test.comparators)
+    )
+
+
+def _python_parts(file_path):
+    parts = os.path.normpath(os.path.splitext(file_path)[0]).split(os.sep)
+    parts = [part for part in parts if part not in ("", ".", "..")]
+    if parts and parts[-1] == "__init__":
+        parts = parts[:-1]
+    return parts
+
+
+def _class_name(entry):
+    return os.path.splitext(os.path.basename(entry.path))[0]
+
+
+class _PathIndex:
+    """Maps the file names reported by a linter back to the paths we passed in."""
+
+    def __init__(self, file_paths):
+        self.paths = {}
+        for path in file_paths:
+            self.paths[self._key(path)] = path
+            self.paths.setdefault(self._key(os.path.realpath(path)), path)
+
+    @staticmethod
+    def _key(path):
+        return os.path.normcase(os.path.abspath(path))
+
+    def lookup(self, reported_path):
+        if not reported_path:
+            return None
+        return self.paths.get(self._key(reported_path)) or self.paths.get(
+            self._key(os.path.realpath(reported_path))
+        )
+
+
+def _int_or_none(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _package_version(name):
+    from importlib import metadata
+    try:
+        return metadata.version(name)
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def _node_package_version(name):
+    for base in (os.getcwd(), PROJECT_ROOT):
+        manifest = os.path.join(base, "node_modules", name, "package.json")
+        try:
+            with open(manifest, "r") as f:
+                return json.load(f).get("version")
+        except (OSError, ValueError):
+            continue
+    return None
+
+
+def _file_fingerprint(path):
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+def _executable_fingerprint(name):
+    path = shutil.which(name)
+    if not path:
+        return None
+    stat = os.stat(path)
+    return f"{path}:{stat.st_size}:{int(stat.st_mtime)}"
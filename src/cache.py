@@ -0,0 +1,197 @@
+import os
+import json
+import hashlib
+import logging
+import tempfile
+import functools
+
+from backends import BACKENDS
+
+logger = logging.getLogger(__name__)
+
+# Bump when the shape of cached entries changes so old entries are ignored
+CACHE_FORMAT_VERSION = 2
+# Total size of the entries, kept next to them so opening the cache needs no directory scan
+SIZE_FILE = "size"
+
+
+def default_cache_dir():
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "ai-code-review-agent")
+
+
+@functools.lru_cache(maxsize=None)
+def tool_fingerprint(lang):
+    """Identify the linter/formatter versions a result depends on, without starting them."""
+    backend_class = BACKENDS.get(lang)
+    tools = backend_class.tool_versions() if backend_class is not None else {}
+    return json.dumps(tools, sort_keys=True)
+
+
+class ResultCache:
+    """On-disk cache of per-file analysis and improvement results.
+
+    Entries are keyed by file content (not location), language, tool versions and
+    the config sections that change the output. With a ``root``, the linter config
+    files in a file's directory and each parent up to the root are hashed into its
+    key too, so editing the project's .eslintrc or .pylintrc invalidates it. The directory is kept under
+    ``max_bytes`` by evicting the least recently used entries; a hit refreshes
+    the entry's mtime, which serves as its access time.
+
+    The running total is stored in the directory and only read on the first
+    ``put``. Processes sharing the directory can make it drift; every eviction
+    rescans the entries and corrects it.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=512 * 1024 * 1024, root=None):
+        self.root = os.path.abspath(root) if root else None
+        # (language, directory) -> its config file hashes, read once per run
+        self._configs = {}
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_bytes = max_bytes
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+        except OSError:
+            # e.g. read-only home directory on serverless hosts
+            self.cache_dir = os.path.join(tempfile.gettempdir(), "ai-code-review-agent-cache")
+            os.makedirs(self.cache_dir, exist_ok=True)
+        self._size = None
+
+    @property
+    def size(self):
+        if self._size is None:
+            try:
+                with open(os.path.join(self.cache_dir, SIZE_FILE), "r") as f:
+                    self._size = int(f.read())
+            except (OSError, ValueError):
+                # First use of this directory, or written by an older version
+                self._size = sum(size for _, size, _ in self._entries())
+                self._save_size()
+        return self._size
+
+    @classmethod
+    def from_config(cls, config, root=None):
+        settings = config.get("cache") or {}
+        if not settings.get("enabled", True):
+            return None
+        max_size_mb = settings.get("max_size_mb", 512)
+        return cls(settings.get("dir"), int(max_size_mb * 1024 * 1024), root)
+
+    def key_for_file(self, file_path, lang, config, content=None):
+        if content is not None:
+            content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        else:
+            with open(file_path, "rb") as f:
+                content_hash = hashlib.sha256(f.read()).hexdigest()
+        return self.key(content_hash, os.path.basename(file_path), lang, config, self._project_configs(file_path, lang))
+
+    def key(self, content_hash, file_name, lang, config, project_configs=None):
+        material = json.dumps({
+            "format": CACHE_FORMAT_VERSION,
+            "content": content_hash,
+            "name": file_name,
+            "lang": lang,
+            "tools": tool_fingerprint(lang),
+            "style": config.get_style(lang),
+            "aggressiveness": config.get("aggressiveness"),
+            "checks": config.enabled_checks(),
+            "project_configs": project_configs or [],
+        }, sort_keys=True)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _project_configs(self, file_path, lang):
+        """Config file hashes from the file's directory up to the root, nearest first, skipping directories without any."""
+        backend_class = BACKENDS.get(lang)
+        if self.root is None or backend_class is None or not backend_class.config_files:
+            return []
+        directory = os.path.dirname(os.path.abspath(file_path))
+        if os.path.commonpath([directory, self.root]) != self.root:
+            return []
+        found = []
+        while True:
+            configs = self._configs.get((lang, directory))
+            if configs is None:
+                configs = self._configs[lang, directory] = backend_class.config_fingerprint(directory)
+            if configs:
+                found.append(configs)
+            if directory == self.root:
+                return found
+            directory = os.path.dirname(directory)
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "r") as f:
+                entry = json.load(f)
+            os.utime(path)
+            return entry
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable cache entry %s: %s", path, e)
+            return None
+
+    def put(self, key, entry):
+        path = self._path(key)
+        # Read (or computed) before the new entry exists, so it isn't counted twice
+        size = self.size
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(entry, f)
+            # An existing entry for the key is replaced, so only the difference counts
+            try:
+                replaced = os.path.getsize(path)
+            except FileNotFoundError:
+                replaced = 0
+            os.replace(tmp_path, path)
+            self._size = size + os.path.getsize(path) - replaced
+        except OSError as e:
+            logger.warning("Failed to write cache entry %s: %s", path, e)
+            return
+        if self._size > self.max_bytes:
+            self.evict()
+        else:
+            self._save_size()
+
+    def evict(self):
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        # Evict down to 90% so we don't rescan the directory on every put
+        target = self.max_bytes * 0.9
+        for path, size, _ in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self._size = total
+        self._save_size()
+
+    def _save_size(self):
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                f.write(str(self._size))
+            os.replace(tmp_path, os.path.join(self.cache_dir, SIZE_FILE))
+        except OSError as e:
+            logger.warning("Failed to write cache size to %s: %s", self.cache_dir, e)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _entries(self):
+        for shard in os.scandir(self.cache_dir):
+            # Only the key shards; history/ and git-mirrors/ share the directory
+            if len(shard.name) != 2 or not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(".json"):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    yield entry.path, stat.st_size, stat.st_mtime
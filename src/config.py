@@ -2,7 +2,7 @@ import json
 import os
 
 class Config:
-    def __init__(self, config_file="config.json"):
+    def __init__(self, config_file="config.json", data=None):
         self.defaults = {
             "priorities": {"security": 1, "performance": 1, "readability": 1},
             "style": {
@@ -12,16 +12,41 @@ class Config:
             },
             "exclude": [],
             "aggressiveness": "moderate",
-            "languages": ["python", "javascript", "java"]
+            "languages": ["python", "javascript", "java"],
+            "jobs": 0,
+            "cache": {"enabled": True, "dir": None, "max_size_mb": 512},
+            "daemons": {"enabled": False, "instances": 1, "google_java_format_jar": None, "timeout_s": 120},
+            "discovery": {"gitignore": True, "max_file_size_mb": 5},
+            "report": {"diff_lines": 10},
+            "output_formats": ["markdown"],
+            "git": {"mirror": True, "mirror_dir": None, "depth": 1, "branch": None, "filter": "blob:none", "sparse": True},
+            "schedule": {"order": "auto", "time_budget_s": None, "cpu_budget_s": None, "churn_days": 90},
+            "project_analysis": {"enabled": True, "duplicate_min_lines": 6}
         }
-        if os.path.exists(config_file):
+        if data is not None:
+            self.config = {**self.defaults, **data}
+        elif config_file and os.path.exists(config_file):
             with open(config_file, 'r') as f:
                 self.config = {**self.defaults, **json.load(f)}
         else:
             self.config = self.defaults
     
+    @classmethod
+    def from_dict(cls, data):
+        return cls(config_file=None, data=data)
+    
     def get(self, key):
         return self.config.get(key)
     
+    def set(self, key, value):
+        self.config[key] = value
+    
     def get_style(self, language):
-        return self.config["style"].get(language, {})
\ No newline at end of file
+        return self.config["style"].get(language, {})
+    
+    def priority(self, check):
+        """Weight of "security", "performance" or "readability"; 0 turns those checks off."""
+        return int((self.config.get("priorities") or {}).get(check, 1))
+    
+    def enabled_checks(self):
+        return sorted(check for check in self.defaults["priorities"] if self.priority(check) > 0)
\ No newline at end of file
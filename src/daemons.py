@@ -0,0 +1,272 @@
+import os
+import json
+import queue
+import atexit
+import logging
+import threading
+import subprocess
+
+from log_setup import tool_output_logger
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKERS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "workers")
+
+# A daemon that keeps crashing is given up on for the rest of the session
+MAX_RESTARTS = 5
+# Default for config "daemons": {"timeout_s": N}; a daemon that takes longer to answer is killed
+DEFAULT_TIMEOUT_S = 120
+
+# google-java-format needs the javac internals it is built on
+GJF_JVM_FLAGS = [
+    f"--add-exports=jdk.compiler/com.sun.tools.javac.{package}=ALL-UNNAMED"
+    for package in ("api", "code", "file", "parser", "tree", "util")
+]
+
+
+class DaemonError(Exception):
+    """A daemon request failed; callers fall back to the one-shot command."""
+
+
+class DaemonUnavailable(DaemonError):
+    """The daemon could not be started or keeps crashing."""
+
+
+class DaemonTimeout(DaemonError):
+    """The daemon did not answer in time and was killed."""
+
+
+class ToolDaemon:
+    """One long-lived tool process speaking the framed protocol in src/workers.
+
+    Requests are ``<command>\\t<length>\\n`` followed by ``length`` bytes of body;
+    responses are ``OK <length>\\n`` or ``ERR <length>\\n`` followed by the body.
+    A daemon that takes longer than ``timeout`` seconds to answer is killed and
+    started again for the next request.
+    """
+
+    def __init__(self, name, argv, cwd=None, timeout=DEFAULT_TIMEOUT_S):
+        self.name = name
+        self.argv = argv
+        self.cwd = cwd
+        self.timeout = timeout
+        self.process = None
+        self.restarts = 0
+
+    def request(self, command, body):
+        for attempt in range(2):
+            self._ensure_started()
+            try:
+                return self._exchange(command, body)
+            except DaemonTimeout as e:
+                # Not retried: the same request would most likely hang a fresh daemon too.
+                # The next request starts a new one; this one falls back to the command line
+                self.stop()
+                self.restarts += 1
+                if self.restarts > MAX_RESTARTS:
+                    raise DaemonUnavailable(f"{self.name} daemon keeps hanging: {str(e)}")
+                raise
+            except (OSError, EOFError, ValueError) as e:
+                logger.warning("%s daemon died (%s), restarting", self.name, e)
+                self.stop()
+                self.restarts += 1
+                if self.restarts > MAX_RESTARTS:
+                    raise DaemonUnavailable(f"{self.name} daemon keeps crashing: {str(e)}")
+                if attempt:
+                    # The same request crashed a fresh daemon too; give up on this one only
+                    raise DaemonError(f"{self.name} daemon crashed on this request: {str(e)}")
+
+    def stop(self):
+        if self.process is None:
+            return
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            self.process.kill()
+        self.process = None
+
+    def _ensure_started(self):
+        if self.process is not None and self.process.poll() is None:
+            return
+        if self.process is not None:
+            logger.warning("%s daemon exited with code %s, restarting", self.name, self.process.returncode)
+            self.process = None
+            self.restarts += 1
+            if self.restarts > MAX_RESTARTS:
+                raise DaemonUnavailable(f"{self.name} daemon keeps crashing")
+        logger.info("Starting %s daemon: %s", self.name, " ".join(self.argv))
+        try:
+            self.process = subprocess.Popen(
+                self.argv,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                cwd=self.cwd
+            )
+        except OSError as e:
+            raise DaemonUnavailable(f"Failed to start {self.name} daemon: {str(e)}")
+        threading.Thread(target=self._drain_stderr, args=(self.process,), daemon=True).start()
+        try:
+            self._exchange("ping", "")
+        except (OSError, EOFError, ValueError, DaemonError) as e:
+            self.stop()
+            raise DaemonUnavailable(f"{self.name} daemon did not start: {str(e)}")
+
+    def _exchange(self, command, body):
+        process = self.process
+        payload = body.encode("utf-8")
+        # Pipe reads can't time out, so a daemon that hangs is killed, which ends them with EOF
+        timed_out = threading.Event()
+        watchdog = threading.Timer(self.timeout, self._kill_hung, args=(process, timed_out))
+        watchdog.daemon = True
+        watchdog.start()
+        try:
+            process.stdin.write(f"{command}\t{len(payload)}\n".encode("utf-8") + payload)
+            process.stdin.flush()
+            header = process.stdout.readline()
+            if header:
+                status, _, length = header.decode("utf-8").strip().partition(" ")
+                response = process.stdout.read(int(length))
+        except OSError:
+            if not timed_out.is_set():
+                raise
+        finally:
+            watchdog.cancel()
+        if timed_out.is_set():
+            raise DaemonTimeout(f"{self.name} daemon did not answer {command!r} within {self.timeout}s")
+        if not header:
+            raise EOFError("no response")
+        if len(response) != int(length):
+            raise EOFError("truncated response")
+        response = response.decode("utf-8")
+        if status != "OK":
+            raise DaemonError(response)
+        return response
+
+    def _kill_hung(self, process, timed_out):
+        timed_out.set()
+        process.kill()
+
+    def _drain_stderr(self, process):
+        for line in process.stderr:
+            if tool_output_logger.isEnabledFor(logging.DEBUG):
+                tool_output_logger.debug("%s daemon: %s", self.name, line.decode("utf-8", "replace").rstrip())
+
+
+class DaemonGroup:
+    """Up to ``size`` interchangeable daemons for one tool, handed out one request at a time."""
+
+    def __init__(self, name, argv, size=1, cwd=None, timeout=DEFAULT_TIMEOUT_S):
+        self.name = name
+        self.argv = argv
+        self.cwd = cwd
+        self.size = size
+        self.timeout = timeout
+        self.idle = queue.Queue()
+        self.created = 0
+        self.lock = threading.Lock()
+        self.disabled = None
+
+    def request(self, command, body):
+        if self.disabled:
+            raise DaemonUnavailable(self.disabled)
+        daemon = self._acquire()
+        try:
+            return daemon.request(command, body)
+        except DaemonUnavailable as e:
+            self.disabled = str(e)
+            logger.warning("Disabling %s daemon for this session: %s", self.name, e)
+            raise
+        finally:
+            self.idle.put(daemon)
+
+    def stop(self):
+        while not self.idle.empty():
+            self.idle.get_nowait().stop()
+
+    def _acquire(self):
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self.lock:
+            if self.created < self.size:
+                self.created += 1
+                return ToolDaemon(self.name, self.argv, self.cwd, self.timeout)
+        return self.idle.get()
+
+
+class DaemonPool:
+    """The set of tool daemons shared by every file in a CLI run or web worker process."""
+
+    def __init__(self, settings):
+        size = max(1, int(settings.get("instances", 1)))
+        timeout = float(settings.get("timeout_s") or DEFAULT_TIMEOUT_S)
+        node_worker = os.path.join(WORKERS_DIR, "node_worker.js")
+        java_worker = os.path.join(WORKERS_DIR, "JavaToolWorker.java")
+        checkstyle_jar = os.path.join(PROJECT_ROOT, "checkstyle.jar")
+        sun_checks_xml = os.path.join(PROJECT_ROOT, "sun_checks.xml")
+        gjf_jar = settings.get("google_java_format_jar") or os.path.join(
+            PROJECT_ROOT, "tools", "google-java-format.jar"
+        )
+        cwd = os.getcwd()
+        self.groups = {
+            "node": DaemonGroup("node", ["node", node_worker], size, cwd, timeout),
+            "checkstyle": DaemonGroup(
+                "checkstyle",
+                ["java", "-cp", checkstyle_jar, java_worker, "checkstyle", sun_checks_xml],
+                size, cwd, timeout
+            ),
+            "google-java-format": DaemonGroup(
+                "google-java-format",
+                ["java", *GJF_JVM_FLAGS, "-cp", gjf_jar, java_worker, "google-java-format"],
+                size, cwd, timeout
+            ),
+        }
+        if not os.path.exists(gjf_jar):
+            self.groups["google-java-format"].disabled = f"{gjf_jar} not found"
+
+    def eslint(self, file_paths):
+        body = json.dumps({"files": [os.path.abspath(path) for path in file_paths]})
+        return self.groups["node"].request("eslint", body)
+
+    def prettier(self, source, file_path, print_width):
+        body = json.dumps({"source": source, "filepath": file_path, "printWidth": print_width})
+        return self.groups["node"].request("prettier", body)
+
+    def checkstyle(self, file_paths):
+        return self.groups["checkstyle"].request("check", "\n".join(os.path.abspath(path) for path in file_paths))
+
+    def google_java_format(self, source):
+        return self.groups["google-java-format"].request("format", source)
+
+    def stop(self):
+        for group in self.groups.values():
+            group.stop()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_daemon_pool(config):
+    """Return the session's daemon pool, or None when daemon mode is off."""
+    global _pool
+    settings = config.get("daemons") or {}
+    if not settings.get("enabled"):
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = DaemonPool(settings)
+            atexit.register(shutdown_daemon_pool)
+        return _pool
+
+
+def shutdown_daemon_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.stop()
+            _pool = None
@@ -0,0 +1,216 @@
+import bisect
+import difflib
+import itertools
+
+# Lines of context around each change, as in ``diff -u``
+CONTEXT_LINES = 3
+# Changed regions longer than this (on either side) skip difflib's line matching,
+# which is super-linear, and are split at lines that occur once on each side instead
+MAX_MATCHED_LINES = 2000
+
+
+class FileDiff:
+    """Unified diff between two versions of a file, computed in near-linear time.
+
+    Common leading and trailing lines are trimmed first. What is left goes to
+    difflib when it is small; larger regions are split at lines that occur once
+    on each side (as in patience diff), ignoring whitespace, and each piece is
+    matched the same way. ``added`` and ``removed`` count the changed lines;
+    ``lines()`` yields the unified diff lazily, so a report that shows only the
+    first few lines never formats the rest.
+    """
+
+    def __init__(self, before, after, fromfile="original", tofile="improved"):
+        self.fromfile = fromfile
+        self.tofile = tofile
+        self.added = 0
+        self.removed = 0
+        self.whitespace_only = False
+        self.identical = before == after
+        if self.identical:
+            self.a = self.b = []
+            self.groups = []
+            return
+
+        self.a = a = before.splitlines()
+        self.b = b = after.splitlines()
+        opcodes = _opcodes(a, b)
+        for tag, i1, i2, j1, j2 in opcodes:
+            if tag != "equal":
+                self.removed += i2 - i1
+                self.added += j2 - j1
+        # Re-indentation or trailing whitespace: every changed line pairs with one that differs only in whitespace
+        self.whitespace_only = all(
+            tag == "equal" or (
+                tag == "replace" and i2 - i1 == j2 - j1
+                and all(x.split() == y.split() for x, y in zip(a[i1:i2], b[j1:j2]))
+            )
+            for tag, i1, i2, j1, j2 in opcodes
+        )
+        self.groups = _group(opcodes)
+
+    @property
+    def changed(self):
+        return self.added + self.removed
+
+    def lines(self):
+        """Yield unified-diff lines (without line endings), hunk by hunk."""
+        if not self.groups:
+            return
+        yield f"--- {self.fromfile}"
+        yield f"+++ {self.tofile}"
+        for group in self.groups:
+            first, last = group[0], group[-1]
+            yield f"@@ -{_range(first[1], last[2])} +{_range(first[3], last[4])} @@"
+            for tag, i1, i2, j1, j2 in group:
+                if tag == "equal":
+                    for line in self.a[i1:i2]:
+                        yield " " + line
+                    continue
+                for line in self.a[i1:i2]:
+                    yield "-" + line
+                for line in self.b[j1:j2]:
+                    yield "+" + line
+
+    def preview(self, max_lines):
+        return list(itertools.islice(self.lines(), max_lines))
+
+
+def _opcodes(a, b):
+    """difflib-style opcodes covering all of ``a`` and ``b``, with adjacent runs of one tag merged."""
+    opcodes = []
+    # Regions still to match, last one first, so opcodes come out in order
+    pending = [(0, len(a), 0, len(b))]
+    while pending:
+        a_lo, a_hi, b_lo, b_hi = pending.pop()
+        # Only the part between the common leading and trailing lines needs matching
+        prefix = 0
+        limit = min(a_hi - a_lo, b_hi - b_lo)
+        while prefix < limit and a[a_lo + prefix] == b[b_lo + prefix]:
+            prefix += 1
+        suffix = 0
+        limit -= prefix
+        while suffix < limit and a[a_hi - 1 - suffix] == b[b_hi - 1 - suffix]:
+            suffix += 1
+        _append(opcodes, "equal", a_lo, a_lo + prefix, b_lo, b_lo + prefix)
+        a_lo += prefix
+        b_lo += prefix
+        a_end = a_hi - suffix
+        b_end = b_hi - suffix
+        regions = []
+        if a_lo == a_end or b_lo == b_end:
+            _append(opcodes, "delete" if a_lo < a_end else "insert", a_lo, a_end, b_lo, b_end)
+        elif a_end - a_lo == b_end - b_lo and all(
+            x.split() == y.split() for x, y in zip(a[a_lo:a_end], b[b_lo:b_end])
+        ):
+            _paired(opcodes, a, b, a_lo, b_lo, a_end - a_lo)
+        elif max(a_end - a_lo, b_end - b_lo) <= MAX_MATCHED_LINES:
+            matcher = difflib.SequenceMatcher(None, a[a_lo:a_end], b[b_lo:b_end], autojunk=False)
+            for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+                _append(opcodes, tag, i1 + a_lo, i2 + a_lo, j1 + b_lo, j2 + b_lo)
+        else:
+            anchors = _unique_anchors(a, b, a_lo, a_end, b_lo, b_end)
+            if not anchors:
+                _append(opcodes, "replace", a_lo, a_end, b_lo, b_end)
+            i, j = a_lo, b_lo
+            for anchor_i, anchor_j in anchors:
+                regions.append((i, anchor_i, j, anchor_j))
+                regions.append((anchor_i, anchor_i + 1, anchor_j, anchor_j + 1))
+                i, j = anchor_i + 1, anchor_j + 1
+            if anchors:
+                regions.append((i, a_end, j, b_end))
+        if suffix:
+            # The trailing equal lines come after everything matched in this region
+            regions.append((a_end, a_hi, b_end, b_hi))
+        pending.extend(reversed(regions))
+    return opcodes
+
+
+def _unique_anchors(a, b, a_lo, a_hi, b_lo, b_hi):
+    # (i, j) pairs of lines that occur once on each side (ignoring whitespace),
+    # reduced to the longest run that is in order on both sides
+    seen = {}
+    for i in range(a_lo, a_hi):
+        key = " ".join(a[i].split())
+        seen[key] = None if key in seen else i
+    candidates = {}
+    for j in range(b_lo, b_hi):
+        key = " ".join(b[j].split())
+        if seen.get(key) is not None:
+            candidates[key] = None if key in candidates else j
+    pairs = sorted((seen[key], j) for key, j in candidates.items() if j is not None)
+    # Longest increasing subsequence of the b positions, by patience sorting
+    tails = []
+    tail_index = []
+    previous = [None] * len(pairs)
+    for index, (_, j) in enumerate(pairs):
+        pile = bisect.bisect_left(tails, j)
+        previous[index] = tail_index[pile - 1] if pile else None
+        if pile == len(tails):
+            tails.append(j)
+            tail_index.append(index)
+        else:
+            tails[pile] = j
+            tail_index[pile] = index
+    anchors = []
+    index = tail_index[-1] if tail_index else None
+    while index is not None:
+        anchors.append(pairs[index])
+        index = previous[index]
+    return anchors[::-1]
+
+
+def _paired(opcodes, a, b, i, j, length):
+    # Runs of equal and differing lines over a region where a[i + k] pairs with b[j + k]
+    for k in range(length):
+        tag = "equal" if a[i + k] == b[j + k] else "replace"
+        _append(opcodes, tag, i + k, i + k + 1, j + k, j + k + 1)
+
+
+def _append(opcodes, tag, i1, i2, j1, j2):
+    if i1 == i2 and j1 == j2:
+        return
+    if opcodes:
+        last_tag, last_i1, last_i2, last_j1, last_j2 = opcodes[-1]
+        if last_tag == tag and last_i2 == i1 and last_j2 == j1:
+            opcodes[-1] = (tag, last_i1, i2, last_j1, j2)
+            return
+    opcodes.append((tag, i1, i2, j1, j2))
+
+
+def _group(opcodes, context=CONTEXT_LINES):
+    """Hunks of opcodes with ``context`` equal lines around changes, like difflib's get_grouped_opcodes."""
+    opcodes = [op for op in opcodes if op[1] != op[2] or op[3] != op[4]]
+    if not any(tag != "equal" for tag, *_ in opcodes):
+        return []
+    # Trim the leading and trailing equal runs to the context size
+    if opcodes[0][0] == "equal":
+        tag, i1, i2, j1, j2 = opcodes[0]
+        opcodes[0] = (tag, max(i1, i2 - context), i2, max(j1, j2 - context), j2)
+    if opcodes[-1][0] == "equal":
+        tag, i1, i2, j1, j2 = opcodes[-1]
+        opcodes[-1] = (tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context))
+
+    groups = []
+    group = []
+    for tag, i1, i2, j1, j2 in opcodes:
+        # Split long equal runs between changes into two hunks
+        if tag == "equal" and i2 - i1 > context * 2:
+            group.append((tag, i1, i1 + context, j1, j1 + context))
+            groups.append(group)
+            group = []
+            i1, j1 = i2 - context, j2 - context
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == "equal"):
+        groups.append(group)
+    return groups
+
+
+def _range(start, stop):
+    # Unified diff ranges are 1-based; an empty range names the line before it
+    length = stop - start
+    if length == 1:
+        return f"{start + 1}"
+    if length == 0:
+        return f"{start},0"
+    return f"{start + 1},{length}"
@@ -0,0 +1,250 @@
+import os
+import re
+import logging
+
+# File extension -> language, as declared by the registered backends
+from backends import SUPPORTED_EXTENSIONS
+
+logger = logging.getLogger(__name__)
+
+DEPENDENCY_FILES = ("requirements.txt", "package.json", "pom.xml")
+# Vendored dependencies, build output and VCS metadata are never descended into
+PRUNED_DIRS = {
+    "node_modules", ".git", ".hg", ".svn", "__pycache__", "venv", ".venv",
+    "target", ".tox", ".mypy_cache", ".pytest_cache", ".gradle",
+}
+
+
+def classify(name):
+    """Return the language of a file name, "dependency" for manifests, or None."""
+    if name in DEPENDENCY_FILES:
+        return "dependency"
+    return SUPPORTED_EXTENSIONS.get(os.path.splitext(name)[1].lower())
+
+
+def _glob_to_regex(glob):
+    out = []
+    i = 0
+    while i < len(glob):
+        c = glob[i]
+        if glob.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+            continue
+        if glob.startswith("**", i):
+            out.append(".*")
+            i += 2
+            continue
+        if c == "*":
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            end = glob.find("]", i + 1)
+            if end == -1:
+                out.append(re.escape(c))
+            else:
+                body = glob[i + 1:end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append(f"[{body}]")
+                i = end
+        elif c == "\\" and i + 1 < len(glob):
+            i += 1
+            out.append(re.escape(glob[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+
+class IgnoreRules:
+    """Compiled gitignore-style patterns, relative to ``base`` (a /-separated directory).
+
+    Supports comments, ``!`` negation, trailing ``/`` for directories, leading or
+    embedded ``/`` for anchoring and ``*``, ``?``, ``[...]`` and ``**`` wildcards.
+    """
+
+    def __init__(self, patterns, base=""):
+        self.base = base
+        self.rules = []
+        for line in patterns:
+            rule = self._compile(line)
+            if rule is not None:
+                self.rules.append(rule)
+
+    @classmethod
+    def from_excludes(cls, exclude):
+        # The web form sends "" for an empty exclude box; that must not exclude everything
+        return cls(pattern for pattern in (exclude or ()) if pattern and pattern.strip())
+
+    @classmethod
+    def from_file(cls, path, base=""):
+        try:
+            with open(path, "r", errors="replace") as f:
+                return cls(f.read().splitlines(), base)
+        except OSError as e:
+            logger.warning("Could not read %s: %s", path, e)
+            return None
+
+    @staticmethod
+    def _compile(line):
+        if line.endswith("\\ "):
+            line = line[:-2].rstrip() + "\\ "
+        else:
+            line = line.rstrip()
+        if not line or line.startswith("#"):
+            return None
+        negate = line.startswith("!")
+        if negate:
+            line = line[1:]
+        elif line.startswith("\\"):
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            return None
+        if "/" in line:
+            # Anchored to the directory holding the pattern
+            regex = _glob_to_regex(line.lstrip("/"))
+        else:
+            regex = "(?:.*/)?" + _glob_to_regex(line)
+        return re.compile(regex + r"\Z"), negate, dir_only
+
+    def match(self, rel_path, is_dir):
+        """True if ignored, False if re-included by a negation, None if no pattern applies."""
+        if self.base:
+            if not rel_path.startswith(self.base + "/"):
+                return None
+            rel_path = rel_path[len(self.base) + 1:]
+        result = None
+        for regex, negate, dir_only in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.match(rel_path):
+                result = not negate
+        return result
+
+    def excludes(self, rel_path):
+        """True if the file ``rel_path`` or any directory above it is ignored."""
+        parts = rel_path.split("/")
+        for i in range(1, len(parts)):
+            if self.match("/".join(parts[:i]), True):
+                return True
+        return bool(self.match(rel_path, False))
+
+
+def _ignored(rules, rel_path, is_dir):
+    # Later rule sets (deeper .gitignore files, then the configured excludes) win
+    ignored = False
+    for rule_set in rules:
+        verdict = rule_set.match(rel_path, is_dir)
+        if verdict is not None:
+            ignored = verdict
+    return ignored
+
+
+class FileDiscovery:
+    """Lazily finds the files to review under ``root``.
+
+    Iterating yields ``(path, language)`` pairs in a stable order while the tree is
+    still being walked; dependency manifests are collected into ``dependencies`` as
+    they are found. Vendored directories, ``exclude`` patterns (gitignore syntax)
+    and, unless disabled, ``.gitignore`` files prune directories before they are
+    entered. Files larger than ``max_file_bytes`` are skipped.
+    """
+
+    def __init__(self, root, exclude=(), max_file_bytes=None, use_gitignore=True):
+        # os.scandir(None) would list the current directory
+        if not root:
+            raise ValueError("File discovery needs a root directory")
+        self.root = root
+        self.exclude = IgnoreRules.from_excludes(exclude)
+        self.max_file_bytes = max_file_bytes
+        self.use_gitignore = use_gitignore
+        self.dependencies = []
+        self.skipped = 0
+
+    @classmethod
+    def from_config(cls, root, config):
+        settings = config.get("discovery") or {}
+        max_size_mb = settings.get("max_file_size_mb")
+        return cls(
+            root, config.get("exclude"),
+            max_file_bytes=int(max_size_mb * 1024 * 1024) if max_size_mb else None,
+            use_gitignore=settings.get("gitignore", True)
+        )
+
+    def __iter__(self):
+        rules = [self.exclude]
+        if self.use_gitignore:
+            rules = self._with_gitignore(rules, self.root, "")
+        stack = [(self.root, "", rules)]
+        while stack:
+            directory, rel_dir, rules = stack.pop()
+            try:
+                with os.scandir(directory) as it:
+                    entries = sorted(it, key=lambda entry: entry.name)
+            except OSError as e:
+                logger.warning("Skipping unreadable directory %s: %s", directory, e)
+                continue
+            subdirs = []
+            for entry in entries:
+                rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in PRUNED_DIRS and not _ignored(rules, rel_path, True):
+                        subdirs.append((entry.path, rel_path))
+                    continue
+                kind = classify(entry.name)
+                if kind is None or _ignored(rules, rel_path, False):
+                    continue
+                if not self._within_size(entry):
+                    continue
+                if kind == "dependency":
+                    self.dependencies.append(entry.path)
+                else:
+                    yield entry.path, kind
+            # Depth-first, in name order
+            for path, rel_path in reversed(subdirs):
+                child_rules = self._with_gitignore(rules, path, rel_path) if self.use_gitignore else rules
+                stack.append((path, rel_path, child_rules))
+        if self.skipped:
+            logger.info("Skipped %d file(s) larger than %d bytes", self.skipped, self.max_file_bytes)
+
+    def select(self, paths):
+        """Like iterating, but over an explicit list of paths (e.g. files git reports as changed)."""
+        for path in paths:
+            rel_path = os.path.relpath(path, self.root).replace(os.sep, "/")
+            parts = rel_path.split("/")
+            kind = classify(parts[-1])
+            if kind is None or PRUNED_DIRS.intersection(parts[:-1]) or self.exclude.excludes(rel_path):
+                continue
+            if kind == "dependency":
+                self.dependencies.append(path)
+            else:
+                yield path, kind
+
+    def _within_size(self, entry):
+        if self.max_file_bytes is None:
+            return True
+        try:
+            size = entry.stat().st_size
+        except OSError:
+            return False
+        if size > self.max_file_bytes:
+            # Counted and reported once the walk ends
+            logger.debug("Skipping %s: %d bytes exceeds the size limit", entry.path, size)
+            self.skipped += 1
+            return False
+        return True
+
+    @staticmethod
+    def _with_gitignore(rules, directory, rel_dir):
+        gitignore = os.path.join(directory, ".gitignore")
+        if not os.path.isfile(gitignore):
+            return rules
+        rule_set = IgnoreRules.from_file(gitignore, rel_dir)
+        if rule_set is None:
+            return rules
+        # Keep the configured excludes last so they always take precedence
+        return rules[:-1] + [rule_set, rules[-1]]
@@ -0,0 +1,150 @@
+import os
+import re
+import logging
+
+from analyzer import chunk_paths
+
+logger = logging.getLogger(__name__)
+
+HUNK_HEADER = re.compile(r"^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@")
+# Backslash escapes git uses in quoted paths, besides octal bytes
+C_ESCAPES = {"a": "\a", "b": "\b", "t": "\t", "n": "\n", "v": "\v", "f": "\f", "r": "\r"}
+
+
+class ChangeSet:
+    """Files added or modified since a base commit, with their changed line ranges.
+
+    ``files`` maps absolute paths to a list of ``(first, last)`` line ranges, or to
+    None when the whole file is new (untracked, or added since the base).
+    """
+
+    def __init__(self, base, files):
+        self.base = base
+        self.files = files
+
+    def __contains__(self, file_path):
+        return os.path.realpath(file_path) in self.files
+
+    def touches_line(self, file_path, line):
+        ranges = self.files.get(os.path.realpath(file_path))
+        if ranges is None:
+            return True
+        try:
+            line = int(line)
+        except (TypeError, ValueError):
+            return True
+        return any(first <= line <= last for first, last in ranges)
+
+    def restrict(self, file_path, analysis_results):
+        """Drop reported issues that lie outside the file's changed lines."""
+        if isinstance(analysis_results, list):
+            return [
+                self.restrict(file_path, item) for item in analysis_results
+                if not (isinstance(item, dict) and "line" in item and not self.touches_line(file_path, item["line"]))
+            ]
+        if isinstance(analysis_results, dict):
+            return {key: self.restrict(file_path, value) for key, value in analysis_results.items()}
+        return analysis_results
+
+
+def collect_changes(path, since=None, with_lines=False):
+    """Find files under ``path`` that differ from ``since`` (default: HEAD) using the git index.
+
+    When ``since`` names another branch, changes are taken relative to its merge base
+    with HEAD, like a pull request diff. Staged, unstaged and untracked files count.
+    """
+    import git
+
+    repo = git.Repo(path, search_parent_directories=True)
+    root = repo.working_tree_dir
+    base = _resolve_base(repo, since)
+    logger.info("Collecting changes in %s since %s", root, base.hexsha[:12])
+
+    changed = {}
+    # Base commit -> index: everything committed or staged since the base
+    for diff in repo.index.diff(base, R=True):
+        if diff.change_type != "D":
+            changed[diff.b_path] = diff.change_type
+    # Index -> working tree: unstaged edits and deletions
+    for diff in repo.index.diff(None):
+        if diff.change_type == "D":
+            changed.pop(diff.a_path, None)
+        else:
+            changed.setdefault(diff.b_path, diff.change_type)
+    for untracked in repo.untracked_files:
+        changed[untracked] = "A"
+
+    scope = os.path.realpath(path)
+    files = {}
+    for rel_path, change_type in changed.items():
+        abs_path = os.path.realpath(os.path.join(root, rel_path))
+        if abs_path != scope and not abs_path.startswith(scope + os.sep):
+            continue
+        if not os.path.isfile(abs_path):
+            continue
+        files[abs_path] = None if change_type == "A" else []
+
+    if with_lines:
+        modified = [os.path.relpath(p, root) for p, ranges in files.items() if ranges is not None]
+        for chunk in chunk_paths(modified):
+            output = repo.git.diff(
+                "--unified=0", "--no-color", "--no-ext-diff", "--src-prefix=a/", "--dst-prefix=b/",
+                base.hexsha, "--", *chunk
+            )
+            for rel_path, ranges in _parse_hunks(output).items():
+                abs_path = os.path.realpath(os.path.join(root, rel_path))
+                if abs_path in files:
+                    files[abs_path] = ranges
+    return ChangeSet(base.hexsha, files)
+
+
+def _resolve_base(repo, since):
+    if not since:
+        return repo.head.commit
+    ref = repo.commit(since)
+    try:
+        merge_bases = repo.merge_base(ref, repo.head.commit)
+    except Exception:
+        merge_bases = []
+    return merge_bases[0] if merge_bases else ref
+
+
+def _parse_hunks(diff_output):
+    ranges = {}
+    current = None
+    for line in diff_output.splitlines():
+        if line.startswith("+++ "):
+            target = _unquote(line[4:])
+            current = target[2:] if target.startswith("b/") else None
+            if current is not None:
+                ranges.setdefault(current, [])
+            continue
+        match = HUNK_HEADER.match(line)
+        if match and current is not None:
+            first = int(match.group(1))
+            count = int(match.group(2)) if match.group(2) is not None else 1
+            if count:
+                ranges[current].append((first, first + count - 1))
+    return ranges
+
+
+def _unquote(name):
+    """A path as git prints it in diff headers: names with spaces end in a tab, and
+    names with quotes, control or non-ASCII characters are C-quoted with octal bytes.
+    """
+    name = name.rstrip("\t")
+    if not (len(name) >= 2 and name.startswith('"') and name.endswith('"')):
+        return name
+    raw = bytearray()
+    chars = iter(name[1:-1])
+    for char in chars:
+        if char != "\\":
+            raw.extend(char.encode("utf-8"))
+            continue
+        char = next(chars, "")
+        if char and char in "01234567":
+            digits = char + next(chars, "") + next(chars, "")
+            raw.append(int(digits, 8))
+        else:
+            raw.extend(C_ESCAPES.get(char, char).encode("utf-8"))
+    return raw.decode("utf-8", "replace")
@@ -0,0 +1,176 @@
+import os
+import shutil
+import hashlib
+import logging
+import tempfile
+import contextlib
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: mirrors are still used, but concurrent runs are not serialised
+    fcntl = None
+
+from backends import BACKENDS, SUPPORTED_EXTENSIONS
+from discovery import DEPENDENCY_FILES, PRUNED_DIRS
+
+logger = logging.getLogger(__name__)
+
+REMOTE_PREFIXES = ("http://", "https://", "ssh://", "git://", "file://", "git@")
+# Refs in a mirror that hold the last commit fetched for each branch (or the remote's HEAD)
+MIRROR_REF_PREFIX = "refs/review/"
+DEFAULT_SETTINGS = {
+    "mirror": True,
+    "mirror_dir": None,
+    "depth": 1,
+    "branch": None,
+    "filter": "blob:none",
+    "sparse": True,
+}
+
+
+def is_remote_url(path):
+    return isinstance(path, str) and path.startswith(REMOTE_PREFIXES)
+
+
+def sparse_patterns():
+    """Sparse-checkout patterns for what a review reads: sources, manifests, linter configs and .gitignore files."""
+    patterns = [f"*{ext}" for ext in sorted(SUPPORTED_EXTENSIONS)]
+    patterns += [*DEPENDENCY_FILES, ".gitignore"]
+    # Without its config files a linter would run with different rules than on a full checkout
+    patterns += sorted({name for backend in BACKENDS.values() for name in backend.config_files})
+    patterns += [f"!**/{name}/**" for name in sorted(PRUNED_DIRS)]
+    return patterns
+
+
+def default_mirror_dir(config):
+    from cache import default_cache_dir
+    cache_dir = (config.get("cache") or {}).get("dir") or default_cache_dir()
+    return os.path.join(cache_dir, "git-mirrors")
+
+
+@contextlib.contextmanager
+def _locked(path):
+    # Exclusive across processes: fetches and worktree changes on one mirror never overlap
+    with open(path, "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield
+
+
+class RemoteCheckout:
+    """One commit of a remote repository, checked out into a private temp directory.
+
+    Only ``depth`` commits of one branch are fetched, without file contents
+    (``filter``); with ``sparse`` the checkout then downloads just the files
+    discovery would review. With ``mirror`` on, each URL has a bare mirror under
+    ``mirror_dir`` that later runs fetch into incrementally, and every checkout
+    is a worktree of it. Otherwise the repository is cloned directly.
+    """
+
+    def __init__(self, url, settings=None, parent_dir=None):
+        settings = {**DEFAULT_SETTINGS, **(settings or {})}
+        self.url = url
+        self.depth = settings["depth"]
+        self.branch = settings["branch"]
+        self.filter = settings["filter"]
+        self.sparse = settings["sparse"]
+        self.mirror = None
+        if settings["mirror"] and settings["mirror_dir"]:
+            digest = hashlib.sha256(url.encode("utf-8")).hexdigest()[:24]
+            self.mirror = os.path.join(settings["mirror_dir"], f"{digest}.git")
+        # Unique per run, so concurrent reviews of the same URL never share a directory
+        self.temp_dir = tempfile.mkdtemp(prefix="review_git_", dir=parent_dir)
+        self.path = os.path.join(self.temp_dir, "repo")
+        self.commit = None
+
+    @classmethod
+    def from_config(cls, url, config, parent_dir=None):
+        settings = {**DEFAULT_SETTINGS, **(config.get("git") or {})}
+        if settings["mirror"] and not settings["mirror_dir"]:
+            settings["mirror_dir"] = default_mirror_dir(config)
+        return cls(url, settings, parent_dir)
+
+    def checkout(self):
+        # GitPython is only needed for Git URLs, so local folders and ZIPs skip importing it
+        import git
+        try:
+            if self.mirror is not None and self._mirror_dir_writable():
+                self._checkout_from_mirror(git)
+            else:
+                self._clone(git)
+        except Exception:
+            self.cleanup()
+            raise
+        logger.info("Checked out commit %s into %s", self.commit[:12], self.path)
+        return self.path
+
+    def cleanup(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+        if self.mirror is not None and os.path.isdir(self.mirror):
+            import git
+            with _locked(self.mirror + ".lock"):
+                git.Git(self.mirror).worktree("prune")
+
+    def _mirror_dir_writable(self):
+        try:
+            os.makedirs(os.path.dirname(self.mirror), exist_ok=True)
+        except OSError:
+            # e.g. read-only home directory on serverless hosts
+            logger.warning("Git mirror directory %s is not writable; cloning instead", os.path.dirname(self.mirror))
+            return False
+        return True
+
+    def _fetch_options(self):
+        options = []
+        if self.depth:
+            options.append(f"--depth={self.depth}")
+        if self.filter:
+            options.append(f"--filter={self.filter}")
+        return options
+
+    def _checkout_from_mirror(self, git):
+        ref = MIRROR_REF_PREFIX + (self.branch or "HEAD")
+        with _locked(self.mirror + ".lock"):
+            mirror = self._open_mirror(git)
+            mirror.fetch(*self._fetch_options(), "origin", f"+{self.branch or 'HEAD'}:{ref}")
+            # Forget worktrees of earlier runs whose directories are gone
+            mirror.worktree("prune")
+            mirror.worktree("add", "--no-checkout", "--detach", self.path, ref)
+            # Checking out fetches the missing file contents into the mirror, so it stays locked
+            self._populate(git)
+
+    def _open_mirror(self, git):
+        # Plain git commands rather than git.Repo: once a worktree is sparse, core.bare
+        # lives in the mirror's config.worktree, which GitPython does not read
+        mirror = git.Git(self.mirror)
+        if os.path.isdir(self.mirror):
+            try:
+                mirror.config("remote.origin.url")
+                return mirror
+            except git.GitCommandError:
+                # Left behind by a run that died while creating it
+                shutil.rmtree(self.mirror)
+        git.Git().init("--bare", self.mirror)
+        mirror.remote("add", "origin", self.url)
+        # Commits are only reachable from worktrees between fetches; never prune them
+        mirror.config("gc.auto", "0")
+        return mirror
+
+    def _clone(self, git):
+        options = {"no_checkout": True, "single_branch": True}
+        if self.depth:
+            options["depth"] = self.depth
+        if self.filter:
+            options["filter"] = self.filter
+        if self.branch:
+            options["branch"] = self.branch
+        git.Repo.clone_from(self.url, self.path, **options)
+        self._populate(git)
+
+    def _populate(self, git):
+        worktree = git.Repo(self.path)
+        if self.sparse:
+            worktree.git.sparse_checkout("set", "--no-cone", *sparse_patterns())
+        worktree.git.checkout()
+        self.commit = worktree.head.commit.hexsha
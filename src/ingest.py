@@ -0,0 +1,142 @@
+import os
+import logging
+import zipfile
+
+from discovery import classify, IgnoreRules, PRUNED_DIRS
+
+logger = logging.getLogger(__name__)
+
+
+class ArchiveRejected(Exception):
+    """Raised when an archive breaks the ingestion limits (e.g. a likely zip bomb)."""
+
+
+class IngestLimits:
+    def __init__(self, max_entries=100000, max_total_bytes=512 * 1024 * 1024,
+                 max_file_bytes=5 * 1024 * 1024, max_ratio=200,
+                 in_memory_file_bytes=64 * 1024, max_in_memory_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_total_bytes = max_total_bytes
+        self.max_file_bytes = max_file_bytes
+        # Uncompressed/compressed size ratio above which a member counts as a zip bomb
+        self.max_ratio = max_ratio
+        self.in_memory_file_bytes = in_memory_file_bytes
+        self.max_in_memory_bytes = max_in_memory_bytes
+
+
+class IngestedArchive:
+    """What ``ingest_zip`` kept: files to review, manifests, and in-memory sources."""
+
+    def __init__(self, root):
+        self.root = root
+        self.code_files = []
+        self.dependencies = []
+        # path -> text for small files, so the pipeline doesn't read them back from disk
+        self.sources = {}
+        self.skipped = 0
+
+
+def ingest_zip(archive, dest_dir, exclude=(), limits=None, reserve=None):
+    """Extract only reviewable members of ``archive`` (a path or file object) into ``dest_dir``.
+
+    The central directory is read once; members that are not supported source files
+    or dependency manifests, that sit in excluded or vendored directories, or that
+    exceed the per-file limit are never decompressed. ``reserve(total_bytes)`` is
+    called before anything is written, e.g. to enforce a workspace quota.
+    """
+    limits = limits or IngestLimits()
+    exclude = IgnoreRules.from_excludes(exclude)
+    result = IngestedArchive(dest_dir)
+    with zipfile.ZipFile(archive, "r") as zip_ref:
+        members = zip_ref.infolist()
+        if len(members) > limits.max_entries:
+            raise ArchiveRejected(f"Archive has {len(members)} entries (limit {limits.max_entries})")
+
+        selected = []
+        total = 0
+        for info in members:
+            kind = _classify(info, exclude)
+            if kind is None:
+                continue
+            if info.file_size > limits.max_file_bytes:
+                logger.debug("Skipping %s: %d bytes exceeds the per-file limit", info.filename, info.file_size)
+                result.skipped += 1
+                continue
+            if info.compress_size and info.file_size / info.compress_size > limits.max_ratio:
+                raise ArchiveRejected(f"Suspicious compression ratio for {info.filename}")
+            total += info.file_size
+            if total > limits.max_total_bytes:
+                raise ArchiveRejected(f"Archive expands to more than {limits.max_total_bytes} bytes")
+            selected.append((info, kind))
+
+        logger.info(
+            "Extracting %d of %d archive entries (%d bytes); %d file(s) over the size limit skipped",
+            len(selected), len(members), total, result.skipped
+        )
+        if reserve is not None:
+            reserve(total)
+
+        in_memory = 0
+        for info, kind in selected:
+            path = os.path.join(dest_dir, *info.filename.split("/"))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            keep_in_memory = (
+                kind != "dependency"
+                and info.file_size <= limits.in_memory_file_bytes
+                and in_memory + info.file_size <= limits.max_in_memory_bytes
+            )
+            with zip_ref.open(info) as src, open(path, "wb") as dst:
+                if keep_in_memory:
+                    data = _read_limited(src, info)
+                    dst.write(data)
+                    try:
+                        # Same newline handling as reading the file in text mode
+                        text = data.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+                    except UnicodeDecodeError:
+                        text = None
+                    if text is not None:
+                        result.sources[path] = text
+                        in_memory += len(data)
+                else:
+                    _copy_limited(src, dst, info)
+            if kind == "dependency":
+                result.dependencies.append(path)
+            else:
+                result.code_files.append((path, kind))
+    return result
+
+
+def _classify(info, exclude):
+    if info.is_dir():
+        return None
+    name = info.filename
+    parts = name.split("/")
+    if name.startswith("/") or "\\" in name or ".." in parts or ":" in parts[0]:
+        logger.warning("Skipping unsafe archive path: %s", name)
+        return None
+    if PRUNED_DIRS.intersection(parts[:-1]):
+        return None
+    kind = classify(parts[-1])
+    if kind is None or exclude.excludes(name):
+        return None
+    return kind
+
+
+def _read_limited(src, info):
+    # Never trust the header: stop once the declared size is exceeded
+    data = src.read(info.file_size + 1)
+    if len(data) > info.file_size:
+        raise ArchiveRejected(f"{info.filename} is larger than its header claims")
+    return data
+
+
+def _copy_limited(src, dst, info):
+    copied = 0
+    while True:
+        chunk = src.read(64 * 1024)
+        if not chunk:
+            break
+        copied += len(chunk)
+        if copied > info.file_size:
+            raise ArchiveRejected(f"{info.filename} is larger than its header claims")
+        dst.write(chunk)
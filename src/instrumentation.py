@@ -0,0 +1,333 @@
+import os
+import sys
+import time
+import threading
+import subprocess
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_active = threading.local()
+
+
+class Recorder:
+    """Wall time, CPU time and subprocess runs per pipeline stage and per file, plus tool invocations.
+
+    A stage's CPU time is the CPU of the thread that ran it plus that of the tool
+    subprocesses it started. A recorder is made active for the current thread with
+    ``activate``; ``run_tool`` and ``tool`` then charge their time to it. Worker
+    processes send back a ``snapshot()`` that the parent ``merge``s.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.tools = {}
+        self.files = {}
+        self.runs = 0
+        self.peak_rss_bytes = 0
+
+    @contextmanager
+    def stage(self, name, file_paths=()):
+        usage = _thread_usage()
+        wall = time.perf_counter()
+        cpu = time.thread_time()
+        child_cpu, subprocesses = usage
+        try:
+            yield
+        finally:
+            self.record_stage(
+                name, time.perf_counter() - wall, time.thread_time() - cpu + usage[0] - child_cpu, file_paths,
+                usage[1] - subprocesses
+            )
+
+    def timed(self, name, iterable):
+        """Yield ``iterable``'s items, charging the time spent producing them to stage ``name``.
+
+        For lazy inputs such as file discovery, whose work happens inside ``next()``.
+        Items are (file_path, ...) tuples; the stage is recorded once the iterator ends.
+        """
+        iterator = iter(iterable)
+        wall = cpu = 0.0
+        file_paths = []
+        try:
+            while True:
+                started, cpu_started = time.perf_counter(), time.thread_time()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    wall += time.perf_counter() - started
+                    cpu += time.thread_time() - cpu_started
+                file_paths.append(item[0])
+                yield item
+        finally:
+            self.record_stage(name, wall, cpu, file_paths)
+
+    def record_stage(self, name, wall, cpu, file_paths=(), subprocesses=0):
+        with self.lock:
+            stats = self.stages.setdefault(name, _stage_stats())
+            stats["count"] += 1
+            stats["files"] += len(file_paths)
+            stats["wall_seconds"] += wall
+            stats["cpu_seconds"] += cpu
+            stats["subprocesses"] += subprocesses
+            # A batched stage (e.g. one linter run over many files) is split evenly between its
+            # files; each file counts the subprocesses it took part in
+            for file_path in file_paths:
+                timings = self.files.setdefault(file_path, {})
+                file_stats = timings.setdefault(name, {"wall_seconds": 0.0, "cpu_seconds": 0.0, "subprocesses": 0})
+                file_stats["wall_seconds"] += wall / len(file_paths)
+                file_stats["cpu_seconds"] += cpu / len(file_paths)
+                file_stats["subprocesses"] += subprocesses
+
+    def record_tool(self, name, wall, failed=False, cpu=0.0):
+        with self.lock:
+            stats = self.tools.setdefault(name, {"count": 0, "failures": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0})
+            stats["count"] += 1
+            stats["failures"] += int(failed)
+            stats["wall_seconds"] += wall
+            stats["cpu_seconds"] += cpu
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "stages": {name: dict(stats) for name, stats in self.stages.items()},
+                "tools": {name: dict(stats) for name, stats in self.tools.items()},
+                "files": {
+                    path: {stage: dict(stats) for stage, stats in timings.items()} for path, timings in self.files.items()
+                },
+                "peak_rss_bytes": max(self.peak_rss_bytes, peak_rss_bytes()),
+            }
+
+    def merge(self, snapshot, include_files=True):
+        with self.lock:
+            for kind in ("stages", "tools"):
+                target = getattr(self, kind)
+                for name, stats in snapshot[kind].items():
+                    merged = target.setdefault(name, {key: 0 for key in stats})
+                    for key, value in stats.items():
+                        merged[key] = merged.get(key, 0) + value
+            if include_files:
+                for path, timings in snapshot["files"].items():
+                    merged = self.files.setdefault(path, {})
+                    for name, stats in timings.items():
+                        file_stats = merged.setdefault(name, {key: 0 for key in stats})
+                        for key, value in stats.items():
+                            file_stats[key] = file_stats.get(key, 0) + value
+            self.peak_rss_bytes = max(self.peak_rss_bytes, snapshot["peak_rss_bytes"])
+
+    def summary(self):
+        """JSON-friendly totals for the run so far."""
+        snapshot = self.snapshot()
+        subprocesses = sum(stats["count"] for name, stats in snapshot["tools"].items() if not _in_process(name))
+        return {
+            "wall_seconds": round(time.perf_counter() - self.started, 3),
+            "process_cpu_seconds": round(time.process_time(), 3),
+            "child_cpu_seconds": round(child_cpu_seconds(), 3),
+            "peak_rss_bytes": snapshot["peak_rss_bytes"],
+            "peak_child_rss_bytes": peak_rss_bytes(children=True),
+            "files": len(snapshot["files"]),
+            "subprocesses": subprocesses,
+            "stages": {name: _rounded(stats) for name, stats in snapshot["stages"].items()},
+            "tools": {name: _rounded(stats) for name, stats in snapshot["tools"].items()},
+        }
+
+    def file_timings(self):
+        """(file_path, {stage: stats}, totals) rows, slowest wall time first.
+
+        ``stats`` and ``totals`` hold wall_seconds, cpu_seconds and subprocesses.
+        """
+        rows = []
+        with self.lock:
+            for path, timings in self.files.items():
+                totals = {key: sum(stats[key] for stats in timings.values()) for key in FILE_STAT_KEYS}
+                rows.append((path, {stage: dict(stats) for stage, stats in timings.items()}, totals))
+        return sorted(rows, key=lambda row: row[2]["wall_seconds"], reverse=True)
+
+
+# Everything finished in this process, for the /metrics endpoint
+TOTALS = Recorder()
+
+# Tools that run inside the agent rather than as a subprocess
+IN_PROCESS_TOOLS = {"bandit", "radon", "black"}
+FILE_STAT_KEYS = ("wall_seconds", "cpu_seconds", "subprocesses")
+
+
+def _stage_stats():
+    return {"count": 0, "files": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0, "subprocesses": 0}
+
+
+def _thread_usage():
+    # [CPU seconds of finished tool subprocesses, subprocesses started] on this thread
+    usage = getattr(_active, "usage", None)
+    if usage is None:
+        usage = _active.usage = [0.0, 0]
+    return usage
+
+
+def record_run(recorder):
+    """Add a finished run's stage and tool totals to ``TOTALS``."""
+    TOTALS.merge(recorder.snapshot(), include_files=False)
+    with TOTALS.lock:
+        TOTALS.runs += 1
+
+
+def _in_process(name):
+    return name in IN_PROCESS_TOOLS or name.endswith("-daemon")
+
+
+def _rounded(stats):
+    return {key: round(value, 4) if isinstance(value, float) else value for key, value in stats.items()}
+
+
+def current():
+    return getattr(_active, "recorder", None)
+
+
+@contextmanager
+def activate(recorder):
+    """Charge tool time on this thread to ``recorder`` for the duration of the block."""
+    previous = current()
+    _active.recorder = recorder
+    try:
+        yield recorder
+    finally:
+        _active.recorder = previous
+
+
+@contextmanager
+def tool(name):
+    """Time an in-process tool or daemon call against the active recorder."""
+    started = time.perf_counter()
+    failed = True
+    try:
+        yield
+        failed = False
+    finally:
+        recorder = current()
+        if recorder is not None:
+            recorder.record_tool(name, time.perf_counter() - started, failed)
+
+
+class _MeasuredPopen(subprocess.Popen):
+    """Popen that keeps the CPU time of the child it reaps (POSIX only)."""
+
+    cpu_seconds = 0.0
+
+    if hasattr(os, "wait4"):
+        def _try_wait(self, wait_flags):
+            # Same as Popen._try_wait, but wait4 also returns the child's resource usage
+            try:
+                pid, status, usage = os.wait4(self.pid, wait_flags)
+            except ChildProcessError:
+                return self.pid, 0
+            if pid:
+                self.cpu_seconds = usage.ru_utime + usage.ru_stime
+            return pid, status
+
+
+def _run_measured(command, input=None, capture_output=False, timeout=None, check=False, **kwargs):
+    # subprocess.run, on a Popen that measures the child's CPU time
+    if capture_output:
+        kwargs["stdout"] = kwargs["stderr"] = subprocess.PIPE
+    if input is not None:
+        kwargs["stdin"] = subprocess.PIPE
+    with _MeasuredPopen(command, **kwargs) as process:
+        try:
+            stdout, stderr = process.communicate(input, timeout=timeout)
+        except BaseException:
+            process.kill()
+            process.wait()
+            raise
+    result = subprocess.CompletedProcess(process.args, process.returncode, stdout, stderr)
+    if check:
+        result.check_returncode()
+    return result, process.cpu_seconds
+
+
+def run_tool(name, command, **kwargs):
+    """``subprocess.run`` that records the invocation, and the tool's CPU time, against the active recorder."""
+    started = time.perf_counter()
+    failed = True
+    cpu = 0.0
+    try:
+        result, cpu = _run_measured(command, **kwargs)
+        failed = False
+        return result
+    finally:
+        # Charged to the stage running on this thread
+        usage = _thread_usage()
+        usage[0] += cpu
+        usage[1] += 1
+        recorder = current()
+        if recorder is not None:
+            recorder.record_tool(name, time.perf_counter() - started, failed, cpu)
+
+
+def peak_rss_bytes(children=False):
+    if resource is None:
+        return 0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    # ru_maxrss is in kilobytes on Linux but bytes on macOS
+    return usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+
+
+def child_cpu_seconds():
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def prometheus_text(recorder=TOTALS, gauges=None):
+    """Render ``recorder``'s totals in the Prometheus text format.
+
+    ``gauges`` adds extra series as ``{name: (help_text, {((label, value), ...): sample})}``.
+    """
+    snapshot = recorder.snapshot()
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            label_text = ",".join(f'{key}="{_escape(val)}"' for key, val in labels)
+            lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+
+    stages = sorted(snapshot["stages"].items())
+    tools = sorted(snapshot["tools"].items())
+    metric("code_review_runs_total", "counter", "Completed review runs.", [((), recorder.runs)])
+    metric("code_review_stage_seconds_total", "counter", "Wall time spent per pipeline stage.",
+           [((("stage", name),), round(stats["wall_seconds"], 6)) for name, stats in stages])
+    metric("code_review_stage_cpu_seconds_total", "counter",
+           "CPU time spent per pipeline stage, including the tool subprocesses it ran.",
+           [((("stage", name),), round(stats["cpu_seconds"], 6)) for name, stats in stages])
+    metric("code_review_stage_files_total", "counter", "Files processed per pipeline stage.",
+           [((("stage", name),), stats["files"]) for name, stats in stages])
+    metric("code_review_stage_subprocesses_total", "counter", "Tool subprocesses started per pipeline stage.",
+           [((("stage", name),), stats.get("subprocesses", 0)) for name, stats in stages])
+    metric("code_review_tool_invocations_total", "counter", "Linter/formatter invocations.",
+           [((("tool", name),), stats["count"]) for name, stats in tools])
+    metric("code_review_tool_failures_total", "counter", "Linter/formatter invocations that raised an error.",
+           [((("tool", name),), stats["failures"]) for name, stats in tools])
+    metric("code_review_tool_seconds_total", "counter", "Wall time spent in linters/formatters.",
+           [((("tool", name),), round(stats["wall_seconds"], 6)) for name, stats in tools])
+    metric("code_review_tool_cpu_seconds_total", "counter", "CPU time of linter/formatter subprocesses.",
+           [((("tool", name),), round(stats.get("cpu_seconds", 0.0), 6)) for name, stats in tools])
+    metric("code_review_peak_rss_bytes", "gauge", "Peak resident set size of the agent process.",
+           [((), max(snapshot["peak_rss_bytes"], peak_rss_bytes()))])
+    metric("code_review_child_cpu_seconds_total", "counter", "CPU time of finished tool subprocesses.",
+           [((), round(child_cpu_seconds(), 6))])
+    for name, (help_text, samples) in (gauges or {}).items():
+        metric(name, "gauge", help_text, sorted(samples.items()))
+    return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
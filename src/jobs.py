@@ -0,0 +1,142 @@
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from pipeline import PipelineCancelled
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueueFull(Exception):
+    """Raised when a job is submitted while the queue is at its limit."""
+
+
+class Job:
+    def __init__(self, description=None):
+        self.id = uuid.uuid4().hex
+        self.description = description
+        self.status = "queued"
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.total_files = 0
+        self.processed_files = 0
+        self.current_file = None
+        self.report_path = None
+        self.error = None
+        self.cancel_event = threading.Event()
+        self.future = None
+        # Called once the job has finished, whatever the outcome (e.g. to drop scratch files)
+        self.cleanup = None
+
+    @property
+    def done(self):
+        return self.status in ("succeeded", "failed", "cancelled")
+
+    def update_progress(self, done, total, file_path):
+        self.processed_files = done
+        self.total_files = total
+        self.current_file = file_path
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "description": self.description,
+            "status": self.status,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "progress": {
+                "processed_files": self.processed_files,
+                "total_files": self.total_files,
+                "current_file": self.current_file,
+            },
+            "error": self.error,
+        }
+
+
+class JobManager:
+    """Runs review jobs on a bounded background executor and tracks their progress.
+
+    At most ``max_concurrent`` jobs run at once and at most ``max_queued`` more may
+    wait; finished jobs are forgotten after ``retention_seconds``.
+    """
+
+    def __init__(self, max_concurrent=2, max_queued=16, retention_seconds=3600):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.retention_seconds = retention_seconds
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="review-job")
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def submit(self, work, description=None, cleanup=None):
+        """Queue ``work(job)``, which returns the report path; raises JobQueueFull when busy."""
+        with self.lock:
+            self._prune()
+            waiting = sum(1 for job in self.jobs.values() if job.status == "queued")
+            if waiting >= self.max_queued:
+                raise JobQueueFull(f"{waiting} jobs are already waiting; try again later")
+            job = Job(description)
+            job.cleanup = cleanup
+            self.jobs[job.id] = job
+            job.future = self.executor.submit(self._run, job, work)
+        logger.info("Queued job %s", job.id)
+        return job
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is None:
+            return None
+        job.cancel_event.set()
+        if job.future.cancel():
+            # Never started, so _run won't get the chance to finish it
+            self._finish(job, "cancelled")
+        return job
+
+    def _run(self, job, work):
+        if job.cancel_event.is_set():
+            self._finish(job, "cancelled")
+            return
+        job.status = "running"
+        job.started = time.time()
+        logger.info("Starting job %s", job.id)
+        try:
+            job.report_path = work(job)
+            self._finish(job, "succeeded")
+        except PipelineCancelled as e:
+            logger.info("Job %s cancelled: %s", job.id, e)
+            self._finish(job, "cancelled")
+        except Exception as e:
+            logger.error("Job %s failed: %s", job.id, e, exc_info=True)
+            job.error = str(e)
+            self._finish(job, "failed")
+
+    def _finish(self, job, status):
+        job.status = status
+        job.finished = time.time()
+        if job.cleanup is not None and status != "succeeded":
+            # Successful jobs keep their files until the job is pruned
+            self._cleanup(job)
+
+    def _prune(self):
+        cutoff = time.time() - self.retention_seconds
+        for job_id, job in list(self.jobs.items()):
+            if job.done and job.finished < cutoff:
+                self._cleanup(job)
+                del self.jobs[job_id]
+
+    @staticmethod
+    def _cleanup(job):
+        cleanup, job.cleanup = job.cleanup, None
+        if cleanup is not None:
+            try:
+                cleanup()
+            except Exception as e:
+                logger.warning("Cleanup for job %s failed: %s", job.id, e)
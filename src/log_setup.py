@@ -0,0 +1,90 @@
+import logging
+
+# Raw linter/formatter output goes to this logger only
+TOOL_OUTPUT_LOGGER = "code_review.tool_output"
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+# Longest slice of tool output quoted in an error message or exception
+MAX_EXCERPT_CHARS = 2000
+
+tool_output_logger = logging.getLogger(TOOL_OUTPUT_LOGGER)
+logger = logging.getLogger(__name__)
+
+# What configure_logging was last called with, so worker processes can repeat it
+_settings = {"level": None, "capture_file": None}
+
+
+def configure_logging(level="INFO", capture_file=None):
+    """Set up logging for an entry point (the CLI, the web app or a pool worker).
+
+    Library modules only create loggers; nothing is configured at import time.
+    Raw tool output is logged at DEBUG, or always written to ``capture_file``
+    (and kept out of the main log) when one is given.
+    """
+    if isinstance(level, str):
+        name = level
+        level = logging.getLevelName(name.upper())
+        if not isinstance(level, int):
+            raise ValueError(f"Unknown log level: {name}")
+    root = logging.getLogger()
+    if not root.handlers:
+        logging.basicConfig(level=level, format=LOG_FORMAT)
+    else:
+        root.setLevel(level)
+
+    for handler in list(tool_output_logger.handlers):
+        tool_output_logger.removeHandler(handler)
+        handler.close()
+    if capture_file:
+        handler = logging.FileHandler(capture_file, mode="a", encoding="utf-8")
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        tool_output_logger.addHandler(handler)
+        tool_output_logger.setLevel(logging.DEBUG)
+        tool_output_logger.propagate = False
+    else:
+        tool_output_logger.setLevel(logging.NOTSET)
+        tool_output_logger.propagate = True
+    _settings.update(level=level, capture_file=capture_file)
+
+
+def worker_settings():
+    """``initargs`` for ``configure_worker_logging`` in a process pool."""
+    return _settings["level"], _settings["capture_file"]
+
+
+def configure_worker_logging(level, capture_file):
+    # Pool initializer: forkserver/spawn children start with logging unconfigured
+    if level is not None:
+        configure_logging(level, capture_file)
+
+
+def log_tool_output(name, result):
+    """Record a finished subprocess's exit code, stdout and stderr, if anyone is listening."""
+    if not tool_output_logger.isEnabledFor(logging.DEBUG):
+        return
+    tool_output_logger.debug(
+        "%s exited with code %s\n--- stdout ---\n%s\n--- stderr ---\n%s",
+        name, result.returncode, result.stdout, result.stderr
+    )
+
+
+def excerpt(text, limit=MAX_EXCERPT_CHARS):
+    """The start of ``text``, so error messages stay short however much a tool printed."""
+    if not text or len(text) <= limit:
+        return text
+    return f"{text[:limit]}... [{len(text) - limit} more characters]"
+
+
+def log_run_summary(summary, jobs):
+    """One INFO line per run, from ``Recorder.summary()``."""
+    stages = ", ".join(
+        f"{name} {stats['wall_seconds']:.2f}s" for name, stats in sorted(summary["stages"].items())
+    )
+    tools = ", ".join(
+        f"{name} x{stats['count']}" + (f" ({stats['failures']} failed)" if stats["failures"] else "")
+        for name, stats in sorted(summary["tools"].items())
+    )
+    logger.info(
+        "Reviewed %d file(s) with %d worker(s) in %.2fs; stages: %s; tools: %s; peak RSS %.1f MB",
+        summary["files"], jobs, summary["wall_seconds"], stages or "none", tools or "none",
+        summary["peak_rss_bytes"] / (1024 * 1024)
+    )
@@ -1,89 +1,202 @@
-mport sys
+import sys
 import os
 
 # Add the src directory to sys.path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 import argparse
-import zipfile
+import itertools
+import json
 import shutil
-import git
+import tempfile
 from analyzer import CodeAnalyzer
 from improver import CodeImprover
 from output_generator import OutputGenerator
 from config import Config
+from pipeline import ReviewPipeline
+from project_index import ProjectIndex
+from scheduler import ORDERS, Scheduler
+from cache import ResultCache
+from daemons import shutdown_daemon_pool
+from git_changes import collect_changes
+from ingest import ingest_zip
+from discovery import FileDiscovery, SUPPORTED_EXTENSIONS
+from git_source import RemoteCheckout, is_remote_url
+from instrumentation import Recorder
+from log_setup import configure_logging
+from structured_output import parse_formats
 
 def setup_arguments():
     parser = argparse.ArgumentParser(description="AI Code Review Agent")
     parser.add_argument("input_path", help="Path to codebase (folder, ZIP, or Git URL)")
     parser.add_argument("--output", default="output_codebase", help="Output directory")
     parser.add_argument("--config", default="config.json", help="Configuration file")
+    parser.add_argument("--jobs", type=int, help="Number of parallel workers (0 = one per CPU)")
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or write the result cache")
+    parser.add_argument("--cache-dir", help="Directory for cached analysis/improvement results")
+    parser.add_argument("--since", metavar="REF",
+                        help="Only review files changed since this git ref (merge base with HEAD)")
+    parser.add_argument("--changed-only", action="store_true",
+                        help="Only review files with uncommitted changes (or changes since --since)")
+    parser.add_argument("--changed-lines-only", action="store_true",
+                        help="With --since/--changed-only, only report issues on changed lines")
+    parser.add_argument("--daemons", action="store_true",
+                        help="Keep ESLint, Prettier, Checkstyle and google-java-format running for the whole run")
+    parser.add_argument("--metrics-file", metavar="PATH",
+                        help="Write the timing/resource summary JSON here instead of printing it")
+    parser.add_argument("--format", metavar="FORMATS",
+                        help="Comma-separated outputs besides the Markdown report: sarif, jsonl")
+    parser.add_argument("--time-budget", type=float, metavar="SECONDS",
+                        help="Stop taking new files after this long and write a partial report")
+    parser.add_argument("--cpu-budget", type=float, metavar="SECONDS",
+                        help="Stop taking new files after this much CPU time (agent, workers and tools)")
+    parser.add_argument("--order", choices=ORDERS,
+                        help="Review order: discovery, or risk (size, recent churn, past issues); "
+                             "auto uses risk when a budget is set")
+    parser.add_argument("--branch", help="Branch to review for Git URLs (default: the remote's default branch)")
+    parser.add_argument("--depth", type=int,
+                        help="Commits of history to fetch for Git URLs (default 1; 0 = full history)")
+    parser.add_argument("--no-git-mirror", action="store_true",
+                        help="Clone Git URLs directly instead of through the local mirror cache")
+    parser.add_argument("--log-level", default="INFO",
+                        help="DEBUG, INFO, WARNING or ERROR (DEBUG includes raw linter/formatter output)")
+    parser.add_argument("--capture-tool-output", metavar="PATH",
+                        help="Append raw linter/formatter output to this file instead of the log")
     return parser.parse_args()
 
-def clone_git_repo(git_url, extract_to):
-    repo_dir = os.path.join(extract_to, "git_repo")
-    git.Repo.clone_from(git_url, repo_dir)
-    return repo_dir
-
-def extract_zip(zip_path, extract_to):
-    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-        zip_ref.extractall(extract_to)
-    return extract_to
-
 def main():
     args = setup_arguments()
+    configure_logging(args.log_level, args.capture_tool_output)
     config = Config(args.config)
+    if args.jobs is not None:
+        config.set("jobs", args.jobs)
+    if args.no_cache or args.cache_dir:
+        cache_settings = dict(config.get("cache") or {})
+        if args.no_cache:
+            cache_settings["enabled"] = False
+        if args.cache_dir:
+            cache_settings["dir"] = args.cache_dir
+        config.set("cache", cache_settings)
+    if args.daemons:
+        config.set("daemons", {**(config.get("daemons") or {}), "enabled": True})
+    if args.format:
+        config.set("output_formats", parse_formats(args.format))
+    if args.time_budget or args.cpu_budget or args.order:
+        schedule = dict(config.get("schedule") or {})
+        if args.time_budget:
+            schedule["time_budget_s"] = args.time_budget
+        if args.cpu_budget:
+            schedule["cpu_budget_s"] = args.cpu_budget
+        if args.order:
+            schedule["order"] = args.order
+        config.set("schedule", schedule)
+    if args.branch or args.depth is not None or args.no_git_mirror:
+        git_settings = dict(config.get("git") or {})
+        if args.branch:
+            git_settings["branch"] = args.branch
+        if args.depth is not None:
+            git_settings["depth"] = args.depth
+        if args.no_git_mirror:
+            git_settings["mirror"] = False
+        config.set("git", git_settings)
     
     # Handle input (FR-1.1)
     input_path = args.input_path
     temp_dir = None
-    if input_path.endswith('.zip'):
-        temp_dir = "temp_extracted_codebase"
-        input_path = extract_zip(input_path, temp_dir)
-    elif input_path.startswith(('http://', 'https://', 'git@')):
-        temp_dir = "temp_git_codebase"
-        input_path = clone_git_repo(input_path, temp_dir)
-    
+    checkout = None
+    ingested = None
+    try:
+        if input_path.endswith('.zip'):
+            # A fresh directory per run, so concurrent runs don't extract over each other
+            temp_dir = tempfile.mkdtemp(prefix="review_zip_")
+            # Only supported sources and manifests are extracted
+            ingested = ingest_zip(input_path, temp_dir, config.get("exclude"))
+            input_path = temp_dir
+        elif is_remote_url(input_path):
+            # Shallow, blob-filtered and sparse; fetched through a local mirror when enabled
+            checkout = RemoteCheckout.from_config(input_path, config)
+            input_path = checkout.checkout()
+        review(args, config, input_path, ingested)
+    finally:
+        # Also when nothing changed or the review failed, so extractions and worktrees don't pile up
+        if temp_dir and os.path.exists(temp_dir):
+            shutil.rmtree(temp_dir)
+        if checkout is not None:
+            checkout.cleanup()
+
+def review(args, config, input_path, ingested=None):
+    """Review the prepared input directory and print where the outputs went."""
     # Validate input directory (FR-1.1, FR-1.2)
     if not os.path.isdir(input_path):
         raise ValueError("Input path must be a valid directory, ZIP, or Git URL")
     
+    # The budget clock starts here; issue history is kept per input, not per temp directory
+    project = args.input_path if is_remote_url(args.input_path) else os.path.abspath(args.input_path)
+    scheduler = Scheduler(config, input_path, project)
+    recorder = Recorder()
+    
     # Identify code files and project structure (FR-1.3, FR-1.4)
-    code_files = []
-    supported_extensions = {'.py': 'python', '.js': 'javascript', '.java': 'java'}
-    dependencies = []
-    for root, dirs, files in os.walk(input_path):
-        if any(exclude in root for exclude in config.get("exclude")):
-            continue
-        for file in files:
-            ext = os.path.splitext(file)[1].lower()
-            if ext in supported_extensions:
-                code_files.append((os.path.join(root, file), supported_extensions[ext]))
-            elif file in ('requirements.txt', 'package.json', 'pom.xml'):
-                dependencies.append(os.path.join(root, file))
+    # Files are yielded while the tree is walked, so review starts before discovery ends
+    changes = None
+    if ingested is not None:
+        code_files, dependencies = iter(ingested.code_files), ingested.dependencies
+    else:
+        discovery = FileDiscovery.from_config(input_path, config)
+        if args.since or args.changed_only or args.changed_lines_only:
+            # Only look at what git reports as added/modified instead of walking the tree
+            changes = collect_changes(input_path, args.since, with_lines=args.changed_lines_only)
+            code_files = discovery.select(sorted(changes.files))
+        else:
+            code_files = iter(discovery)
+        # Filled in as discovery proceeds
+        dependencies = discovery.dependencies
+        code_files = recorder.timed("discovery", code_files)
     
-    if not code_files:
-        raise ValueError("No supported code files (.py, .js, .java) found")
+    first_file = next(code_files, None)
+    if first_file is None:
+        if changes is not None:
+            print(f"No changed code files since {changes.base[:12]}; nothing to review.")
+            return
+        raise ValueError(f"No supported code files ({', '.join(SUPPORTED_EXTENSIONS)}) found")
     
     # Initialize components
     analyzer = CodeAnalyzer(config)
     improver = CodeImprover(config)
     output_gen = OutputGenerator(config, args.output)
     
-    # Process files
-    for file_path, lang in code_files:
-        analysis_results = analyzer.analyze_file(file_path, lang)
-        improved_code = improver.improve_code(file_path, analysis_results, lang)
-        output_gen.save_improved_code(file_path, improved_code, analysis_results)
+    # Process files: batched analysis, parallel improvement, ordered saving
+    cache = ResultCache.from_config(config, input_path)
+    output_gen.start_report()
+    try:
+        issue_filter = changes.restrict if args.changed_lines_only else None
+        sources = ingested.sources if ingested is not None else None
+        pipeline = ReviewPipeline(
+            config, analyzer, improver, output_gen, cache=cache, issue_filter=issue_filter, sources=sources,
+            recorder=recorder, scheduler=scheduler, project_index=ProjectIndex.from_config(config)
+        )
+        pipeline.run(itertools.chain([first_file], code_files))
+    finally:
+        shutdown_daemon_pool()
     
     # Generate report (FR-4.3, FR-4.4, FR-4.6)
-    report_path = output_gen.generate_report(dependencies)
-    
-    # Clean up
-    if temp_dir and os.path.exists(temp_dir):
-        shutil.rmtree(temp_dir)
+    with recorder.stage("report"):
+        report_path = output_gen.generate_report(dependencies, recorder, pipeline.coverage(), pipeline.project_index)
     
     print(f"Processing complete. Report generated at: {report_path}")
+    coverage = pipeline.coverage()
+    if not coverage["complete"]:
+        print(f"Partial review ({coverage['stop_reason']}): {coverage['files_reviewed']} of {coverage['files_total']} files")
+    for fmt, path in output_gen.outputs.items():
+        if fmt != "markdown":
+            print(f"{fmt.upper()} output: {path}")
+    
+    # Where the time went: per stage, per tool, CPU and peak memory
+    summary = json.dumps(recorder.summary(), indent=2)
+    if args.metrics_file:
+        with open(args.metrics_file, 'w') as f:
+            f.write(summary)
+    else:
+        print(summary)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,73 +1,251 @@
 import os
-import shutil
+import json
 import datetime
 from pathlib import Path
-import difflib
 import tempfile
+from diffs import FileDiff
+from structured_output import WRITERS, output_path, parse_formats
+
+# Only this much of each file ends up in the report
+PREVIEW_CHARS = 200
+# Default for config "report": {"diff_lines": N}
+PREVIEW_DIFF_LINES = 10
+# The per-file timing table lists at most this many of the slowest files
+TIMING_TABLE_ROWS = 100
+# Project-level findings listed per kind in the report; all of them go to SARIF/JSONL
+PROJECT_FINDINGS_LISTED = 50
+PROJECT_FINDING_TITLES = {
+    "import_cycle": "Import cycles",
+    "duplicate_block": "Duplicate blocks",
+    "unused_module": "Files not imported by any other reviewed file",
+}
 
 class OutputGenerator:
-    def __init__(self, config, output_dir):
+    def __init__(self, config, output_dir, reports_dir=None, reserve=None):
         self.config = config
-        # Use /tmp/ for Vercel serverless environment
-        self.output_dir = os.path.join(tempfile.gettempdir(), output_dir.lstrip("/"))
-        self.reports_dir = os.path.join(tempfile.gettempdir(), "reports")
-        self.reports = []
+        # Called with the size of each improved file before it is written, e.g. Workspace.reserve
+        self.reserve = reserve
+        # Use /tmp/ for Vercel serverless environment (absolute paths are used as given)
+        if os.path.isabs(output_dir):
+            self.output_dir = output_dir
+        else:
+            self.output_dir = os.path.join(tempfile.gettempdir(), output_dir)
+        self.reports_dir = reports_dir or os.path.join(tempfile.gettempdir(), "reports")
         os.makedirs(self.output_dir, exist_ok=True)
         os.makedirs(self.reports_dir, exist_ok=True)  # Fixed: Use self.reports_dir instead of "reports"
-    
-    def save_improved_code(self, file_path, improved_code, analysis_results):
+        # The report is written section by section; only these counters stay in memory
+        self.report_path = None
+        self.report_file = None
+        self.dependencies_written = False
+        self.files_reported = 0
+        self.metrics = {"bugs_fixed": 0, "smells_improved": 0, "security_fixed": 0, "lines_added": 0, "lines_removed": 0}
+        self.diff_lines = (config.get("report") or {}).get("diff_lines", PREVIEW_DIFF_LINES)
+        # SARIF/JSONL writers selected by config "output_formats", streamed alongside the report
+        self.formats = parse_formats(config.get("output_formats"))
+        self.writers = []
+
+    def start_report(self, dependencies=None):
+        """Open the report and write its header; file sections are appended as files finish."""
+        if self.report_file is not None:
+            return
+        self.report_path = os.path.join(self.reports_dir, f"report_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.md")
+        self.report_file = open(self.report_path, 'w')
+        self.report_file.write("# AI Code Review Agent Report\n\n")
+        self.report_file.write(f"Generated on: {datetime.datetime.now()}\n\n")
+        for fmt in self.formats:
+            if fmt in WRITERS:
+                writer = WRITERS[fmt](output_path(self.report_path, fmt))
+                writer.start()
+                self.writers.append(writer)
+        if dependencies is not None:
+            self._write_dependencies(dependencies)
+
+    def save_improved_code(self, file_path, improved_code, analysis_results, original_code=None):
         relative_path = os.path.relpath(file_path, start=os.path.dirname(os.path.dirname(file_path)))
-        output_path = os.path.join(self.output_dir, relative_path)
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        
-        with open(output_path, 'w') as f:
+        saved_path = os.path.join(self.output_dir, relative_path)
+        os.makedirs(os.path.dirname(saved_path), exist_ok=True)
+
+        if self.reserve is not None:
+            self.reserve(len(improved_code.encode("utf-8")))
+        with open(saved_path, 'w') as f:
             f.write(improved_code)
-        
-        original_code = Path(file_path).read_text()
-        diff = list(difflib.unified_diff(
-            original_code.splitlines(), improved_code.splitlines(),
-            fromfile="original", tofile="improved", lineterm=""
-        ))
-        self.reports.append({
-            "file": file_path,
-            "analysis": analysis_results,
-            "before": original_code,
-            "after": improved_code,
-            "diff": diff
-        })
-    
-    def generate_report(self, dependencies):
-        report_content = "# AI Code Review Agent Report\n\n"
-        report_content += f"Generated on: {datetime.datetime.now()}\n\n"
-        
-        report_content += "## Project Structure\n"
-        report_content += f"Dependencies detected:\n"
-        for dep in dependencies:
-            report_content += f"- {dep}\n"
-        report_content += "\n"
-        
-        metrics = {"bugs_fixed": 0, "smells_improved": 0, "security_fixed": 0}
-        for entry in self.reports:
-            report_content += f"## File: {entry['file']}\n"
-            report_content += "### Analysis Results\n"
-            for key, value in entry['analysis'].items():
-                report_content += f"- **{key}**: {value}\n"
-                if key == "bugs" and value:
-                    metrics["bugs_fixed"] += len(value)
-                if key == "code_smells" and value:
-                    metrics["smells_improved"] += len(value)
-            report_content += "\n### Before vs After\n"
-            report_content += f"**Before**:\n```python\n{entry['before'][:200]}...\n```\n"
-            report_content += f"**After**:\n```python\n{entry['after'][:200]}...\n```\n"
-            report_content += f"**Diff**:\n```diff\n{''.join(entry['diff'][:10])}\n```\n\n"
-        
-        report_content += "## Quality Metrics\n"
-        report_content += f"- Bugs fixed: {metrics['bugs_fixed']}\n"
-        report_content += f"- Code smells improved: {metrics['smells_improved']}\n"
-        report_content += f"- Security issues noted: {metrics['security_fixed']}\n"
-        
-        report_path = os.path.join(self.reports_dir, f"report_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.md")
-        with open(report_path, 'w') as f:
-            f.write(report_content)
-        
-        return report_path
+
+        if original_code is None:
+            original_code = Path(file_path).read_text()
+        # Every changed line is counted, but only the previewed hunks are formatted
+        diff = FileDiff(original_code, improved_code)
+        self.metrics["lines_added"] += diff.added
+        self.metrics["lines_removed"] += diff.removed
+        self._write_file_section(file_path, analysis_results, original_code, improved_code, diff)
+        for writer in self.writers:
+            writer.write_file(file_path, analysis_results, diff)
+
+    @property
+    def outputs(self):
+        """Paths of everything this run writes, by format."""
+        return {fmt: output_path(self.report_path, fmt) for fmt in ["markdown", *self.formats]}
+
+    def generate_report(self, dependencies, recorder=None, coverage=None, project_index=None):
+        self.start_report(dependencies)
+        if not self.dependencies_written:
+            self._write_dependencies(dependencies)
+
+        self.report_file.write("## Quality Metrics\n")
+        self.report_file.write(f"- Bugs fixed: {self.metrics['bugs_fixed']}\n")
+        self.report_file.write(f"- Code smells improved: {self.metrics['smells_improved']}\n")
+        self.report_file.write(f"- Security issues noted: {self.metrics['security_fixed']}\n")
+        self.report_file.write(f"- Lines changed: +{self.metrics['lines_added']} -{self.metrics['lines_removed']}\n")
+        findings = None
+        if project_index is not None:
+            # Files skipped by a budget may be the importers, so unimported files are only reported for full runs
+            findings = project_index.findings(complete=coverage is None or coverage["complete"])
+            self._write_project_findings(project_index.summary(), findings)
+        if coverage is not None:
+            self._write_coverage(coverage)
+        timings = None
+        if recorder is not None:
+            timings = recorder.summary()
+            self._write_timings(timings, recorder.file_timings())
+        self.report_file.close()
+        self.report_file = None
+
+        # Sidecar with the same numbers for tools that don't want to parse Markdown
+        sidecar = {"files": self.files_reported, **self.metrics}
+        if findings is not None:
+            sidecar["project"] = {**project_index.summary(), **_count_kinds(findings)}
+        if coverage is not None:
+            sidecar["coverage"] = coverage
+        if timings is not None:
+            sidecar["timings"] = timings
+        with open(os.path.splitext(self.report_path)[0] + ".metrics.json", 'w') as f:
+            json.dump(sidecar, f, indent=2)
+        for writer in self.writers:
+            if findings:
+                writer.write_project(findings)
+            writer.finish(sidecar)
+        self.writers = []
+
+        return self.report_path
+
+    def _write_dependencies(self, dependencies):
+        section = ["## Project Structure\n", "Dependencies detected:\n"]
+        section.extend(f"- {dep}\n" for dep in dependencies)
+        section.append("\n")
+        self.report_file.write("".join(section))
+        self.dependencies_written = True
+
+    def _write_project_findings(self, summary, findings):
+        languages = ", ".join(f"{count} {lang}" for lang, count in sorted(summary["languages"].items()))
+        section = [
+            "\n## Project Analysis\n",
+            f"Indexed {summary['files']} files ({languages or 'none'}): "
+            f"{summary['symbols']} top-level symbols, {summary['imports']} imports.\n",
+        ]
+        counts = _count_kinds(findings)
+        for kind, title in PROJECT_FINDING_TITLES.items():
+            if kind not in counts:
+                continue
+            matching = [finding for finding in findings if finding["kind"] == kind]
+            section.append(f"\n### {title} ({counts[kind]})\n")
+            for finding in matching[:PROJECT_FINDINGS_LISTED]:
+                where = ", ".join(f"{location['path']}:{location['line']}" for location in finding["locations"])
+                section.append(f"- {finding['message']} ({where})\n")
+        self.report_file.write("".join(section))
+
+    def _write_coverage(self, coverage):
+        section = ["\n## Coverage\n"]
+        if coverage["stop_reason"]:
+            section.append(f"Partial review: {coverage['stop_reason']}, so no further files were started.\n")
+        if coverage["order"] == "risk":
+            section.append("Files were reviewed highest risk first (size, recent commits, issues found last time).\n")
+        section.append(
+            f"- Files reviewed: {coverage['files_reviewed']} of {coverage['files_total']} "
+            f"({_percent(coverage['files_reviewed'], coverage['files_total'])})\n"
+        )
+        section.append(
+            f"- Source reviewed: {coverage['bytes_reviewed'] // 1024} KB of {coverage['bytes_total'] // 1024} KB "
+            f"({_percent(coverage['bytes_reviewed'], coverage['bytes_total'])})\n"
+        )
+        for lang, counts in sorted(coverage["by_language"].items()):
+            section.append(f"- {lang}: {counts['reviewed']} of {counts['total']} files\n")
+        if coverage["skipped_count"]:
+            shown = len(coverage["skipped"])
+            count = f"{coverage['skipped_count']}" if shown == coverage["skipped_count"] else f"first {shown} of {coverage['skipped_count']}"
+            section.append(f"\n### Not reviewed ({count})\n")
+            section.extend(f"- {file_path}\n" for file_path in coverage["skipped"])
+        self.report_file.write("".join(section))
+
+    def _write_timings(self, timings, file_rows):
+        section = ["\n## Timings\n"]
+        section.append(
+            f"- Wall time: {timings['wall_seconds']:.2f}s, CPU: {timings['process_cpu_seconds']:.2f}s "
+            f"(+{timings['child_cpu_seconds']:.2f}s in tools), peak RSS: {timings['peak_rss_bytes'] // (1024 * 1024)} MB, "
+            f"subprocesses: {timings['subprocesses']}\n\n"
+        )
+        section.append("| Stage | Files | Wall (s) | CPU (s) | Subprocesses |\n|---|---|---|---|---|\n")
+        for name, stats in timings["stages"].items():
+            section.append(
+                f"| {name} | {stats['files']} | {stats['wall_seconds']:.3f} | {stats['cpu_seconds']:.3f} "
+                f"| {stats.get('subprocesses', 0)} |\n"
+            )
+        section.append("\n| Tool | Calls | Failures | Wall (s) | CPU (s) |\n|---|---|---|---|---|\n")
+        for name, stats in sorted(timings["tools"].items(), key=lambda item: -item[1]["wall_seconds"]):
+            section.append(
+                f"| {name} | {stats['count']} | {stats['failures']} | {stats['wall_seconds']:.3f} "
+                f"| {stats.get('cpu_seconds', 0.0):.3f} |\n"
+            )
+
+        stages = ["discovery", "index", "analyze", "improve", "save"]
+        shown = file_rows[:TIMING_TABLE_ROWS]
+        section.append(f"\n### Slowest files ({len(shown)} of {len(file_rows)})\n")
+        section.append(
+            "Batched analysis time is split evenly between the files of each linter run; "
+            "subprocesses counts the tool runs a file was part of.\n\n"
+        )
+        section.append(
+            "| File | " + " | ".join(f"{stage} (ms)" for stage in stages) + " | Total (ms) | CPU (ms) | Subprocesses |\n"
+        )
+        section.append("|---" * (len(stages) + 4) + "|\n")
+        for file_path, file_timings, totals in shown:
+            cells = " | ".join(
+                f"{file_timings.get(stage, {}).get('wall_seconds', 0.0) * 1000:.1f}" for stage in stages
+            )
+            section.append(
+                f"| {file_path} | {cells} | {totals['wall_seconds'] * 1000:.1f} | {totals['cpu_seconds'] * 1000:.1f} "
+                f"| {totals['subprocesses']} |\n"
+            )
+        self.report_file.write("".join(section))
+
+    def _write_file_section(self, file_path, analysis_results, before, after, diff):
+        self.start_report()
+        section = [f"## File: {file_path}\n", "### Analysis Results\n"]
+        for key, value in analysis_results.items():
+            section.append(f"- **{key}**: {value}\n")
+            if key == "bugs" and value:
+                self.metrics["bugs_fixed"] += len(value)
+            if key == "code_smells" and value:
+                self.metrics["smells_improved"] += len(value)
+            if key == "security_issues" and value:
+                self.metrics["security_fixed"] += len(value)
+        section.append("\n### Before vs After\n")
+        section.append(f"**Before**:\n```python\n{before[:PREVIEW_CHARS]}...\n```\n")
+        section.append(f"**After**:\n```python\n{after[:PREVIEW_CHARS]}...\n```\n")
+        if diff.identical:
+            section.append("**Diff**: no changes\n\n")
+        else:
+            summary = f"+{diff.added} -{diff.removed} lines" + (", whitespace only" if diff.whitespace_only else "")
+            preview = "\n".join(diff.preview(self.diff_lines))
+            section.append(f"**Diff** ({summary}):\n```diff\n{preview}\n```\n\n")
+        self.report_file.write("".join(section))
+        self.files_reported += 1
+
+
+def _percent(part, whole):
+    return f"{part / whole * 100:.1f}%" if whole else "100.0%"
+
+
+def _count_kinds(findings):
+    counts = {}
+    for finding in findings:
+        counts[finding["kind"]] = counts.get(finding["kind"], 0) + 1
+    return counts
@@ -0,0 +1,340 @@
+import os
+import math
+import logging
+import itertools
+import multiprocessing
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
+
+from backends import IN_PROCESS, get_backend
+from instrumentation import Recorder, activate, record_run
+from log_setup import configure_worker_logging, log_run_summary, worker_settings
+from scheduler import Scheduler
+
+logger = logging.getLogger(__name__)
+
+# How many finished files may wait for an earlier, slower file before the
+# pipeline blocks. Results are saved strictly in discovery order.
+PENDING_FILES_PER_WORKER = 4
+
+# Files are taken from the (possibly still running) discovery in waves of this
+# many per worker; the next wave is discovered and submitted for analysis while
+# the current one is being improved.
+FILES_PER_WAVE_PER_WORKER = 64
+
+
+class PipelineCancelled(Exception):
+    """Raised by ReviewPipeline.run when its cancel event is set."""
+
+
+def resolve_jobs(jobs):
+    """Turn a configured worker count into a concrete one (0 or None means one per CPU)."""
+    if not jobs or int(jobs) < 1:
+        return os.cpu_count() or 1
+    return int(jobs)
+
+
+def _analyze_in_worker(config, file_paths, lang, sources):
+    from analyzer import CodeAnalyzer
+    recorder = Recorder()
+    with activate(recorder), recorder.stage("analyze", file_paths):
+        results = CodeAnalyzer(config).analyze_files(file_paths, lang, sources)
+    # Timings travel back with the result and are merged into the parent's recorder
+    return results, recorder.snapshot()
+
+
+def _improve_in_worker(config, file_path, analysis_results, lang, code=None):
+    # Runs in a child process, so build a fresh improver from the picklable config
+    from improver import CodeImprover
+    recorder = Recorder()
+    with activate(recorder), recorder.stage("improve", [file_path]):
+        improved_code = CodeImprover(config).improve_code(file_path, analysis_results, lang, code)
+    return improved_code, recorder.snapshot()
+
+
+class ReviewPipeline:
+    """Runs analyze -> improve -> save over a set of files using a pool of workers."""
+
+    def __init__(self, config, analyzer, improver, output_gen, jobs=None, cache=None, issue_filter=None,
+                 progress=None, cancel_event=None, sources=None, recorder=None, scheduler=None, project_index=None):
+        self.config = config
+        self.analyzer = analyzer
+        self.improver = improver
+        self.output_gen = output_gen
+        self.jobs = resolve_jobs(jobs if jobs is not None else config.get("jobs"))
+        self.cache = cache
+        # Optional (file_path, analysis_results) -> analysis_results applied to what
+        # gets reported; the improver and the cache always see the full results.
+        self.issue_filter = issue_filter
+        # progress(done, total, file_path) is called after each file is saved
+        self.progress = progress
+        self.cancel_event = cancel_event
+        # Already-loaded file contents (path -> text); anything missing is read from disk
+        self.sources = sources or {}
+        # Per-stage, per-file and per-tool timings for this run
+        self.recorder = recorder or Recorder()
+        # Review order, time/CPU budget and which files need improving
+        self.scheduler = scheduler or Scheduler(config)
+        # Optional cross-file index (symbols, imports, duplicate blocks), fed as files are loaded
+        self.project_index = project_index
+        # Sources read for the index, kept until the file is saved so it is read only once
+        self.loaded = {}
+        self.done = 0
+        self.total = 0
+
+    def run(self, code_files):
+        """Review ``code_files``, an iterable of (path, language) that may still be growing."""
+        self.done = 0
+        self.total = 0
+        self.merged_futures = set()
+        waves = self._waves(self.scheduler.schedule(code_files))
+        try:
+            with activate(self.recorder):
+                if self.jobs == 1:
+                    self._run_serial(waves)
+                else:
+                    self._run_parallel(waves)
+        finally:
+            record_run(self.recorder)
+            self.scheduler.finish()
+        # One line per run, however many files or tool runs it took
+        log_run_summary(self.recorder.summary(), self.jobs)
+
+    def coverage(self):
+        return self.scheduler.coverage()
+
+    def _waves(self, code_files):
+        code_files = iter(code_files)
+        wave_size = self.jobs * FILES_PER_WAVE_PER_WORKER
+        while not self.scheduler.should_stop():
+            wave = list(itertools.islice(code_files, wave_size))
+            if not wave:
+                return
+            with self.recorder.stage("cache_lookup"):
+                cached, cache_keys = self._lookup_cache(wave)
+            if self.project_index is not None:
+                with self.recorder.stage("index", [file_path for file_path, _ in wave]):
+                    self._index(wave)
+            misses = [(file_path, lang) for file_path, lang in wave if file_path not in cached]
+            logger.debug("Queued %d file(s), %d served from cache", len(wave), len(cached))
+            yield wave, misses, cached, cache_keys
+
+    def _index(self, code_files):
+        for file_path, _ in code_files:
+            code = self._source(file_path)
+            if file_path not in self.sources:
+                self.loaded[file_path] = code
+            self.project_index.add(file_path, code)
+
+    def _lookup_cache(self, code_files):
+        cached = {}
+        cache_keys = {}
+        if self.cache is None:
+            return cached, cache_keys
+        for file_path, lang in code_files:
+            key = self.cache.key_for_file(file_path, lang, self.config, self.sources.get(file_path))
+            entry = self.cache.get(key)
+            if entry is not None:
+                cached[file_path] = entry
+            else:
+                cache_keys[file_path] = key
+        return cached, cache_keys
+
+    def _run_serial(self, waves):
+        for code_files, misses, cached, cache_keys in waves:
+            if not self._begin_wave(code_files):
+                return
+            with self.recorder.stage("analyze", [file_path for file_path, _ in misses]):
+                analysis_by_file = self.analyzer.analyze_all(misses, self._batch_sources(path for path, _ in misses))
+            for file_path, lang in code_files:
+                self._check_cancelled()
+                if self.scheduler.should_stop():
+                    return
+                if file_path in cached:
+                    entry = cached[file_path]
+                    self._save(file_path, entry["analysis"], entry["improved_code"])
+                    continue
+                analysis_results = analysis_by_file[file_path]
+                code = self._source(file_path)
+                if not self.scheduler.needs_improvement(analysis_results):
+                    self._save(file_path, analysis_results, code, cache_keys.get(file_path), code)
+                    continue
+                try:
+                    with self.recorder.stage("improve", [file_path]):
+                        improved_code = self.improver.improve_code(file_path, analysis_results, lang, code)
+                except Exception as e:
+                    raise Exception(f"Failed to process file {file_path}: {str(e)}") from e
+                self._save(file_path, analysis_results, improved_code, cache_keys.get(file_path), code)
+
+    def _run_parallel(self, waves):
+        threads = ThreadPoolExecutor(max_workers=self.jobs)
+        processes = self._start_process_pool()
+        try:
+            pending = deque()
+            max_pending = self.jobs * PENDING_FILES_PER_WORKER
+            current = self._start_wave(threads, processes, next(waves, None))
+            while current is not None:
+                code_files, cached, cache_keys, analysis_futures = current
+                if not self._begin_wave(code_files):
+                    break
+                # Keep walking and analyzing ahead while this wave is improved
+                upcoming = self._start_wave(threads, processes, next(waves, None))
+                for file_path, lang in code_files:
+                    self._check_cancelled()
+                    if self.scheduler.should_stop():
+                        # Files already being improved are still saved below
+                        upcoming = None
+                        break
+                    if file_path in cached:
+                        entry = cached[file_path]
+                        future = _done(entry["improved_code"])
+                        pending.append((file_path, entry["analysis"], future, None, None))
+                    else:
+                        analysis_results = self._result(analysis_futures[file_path], file_path)[file_path]
+                        # Read once here; the improver and the report's diff both use it
+                        code = self._source(file_path)
+                        if not self.scheduler.needs_improvement(analysis_results):
+                            future = _done(code)
+                        elif processes is not None and self._in_process(lang):
+                            future = processes.submit(
+                                _improve_in_worker, self.config, file_path, analysis_results, lang, code
+                            )
+                        else:
+                            future = threads.submit(
+                                self._timed, "improve", [file_path],
+                                self.improver.improve_code, file_path, analysis_results, lang, code
+                            )
+                        pending.append((file_path, analysis_results, future, cache_keys.get(file_path), code))
+                    # Save finished files as soon as everything before them is saved
+                    while pending and (len(pending) > max_pending or pending[0][2].done()):
+                        self._save_pending(*pending.popleft())
+                current = upcoming
+            while pending:
+                self._check_cancelled()
+                self._save_pending(*pending.popleft())
+        finally:
+            threads.shutdown(cancel_futures=True)
+            if processes is not None:
+                processes.shutdown(cancel_futures=True)
+
+    def _start_wave(self, threads, processes, wave):
+        if wave is None:
+            return None
+        code_files, misses, cached, cache_keys = wave
+        return code_files, cached, cache_keys, self._submit_analysis(threads, processes, misses)
+
+    def _submit_analysis(self, threads, processes, code_files):
+        # Split each language into as many slices as its backend can use at once;
+        # each slice is still a single batched linter run (chunked only for argv
+        # limits) unless the backend can't batch.
+        by_lang = {}
+        for file_path, lang in code_files:
+            by_lang.setdefault(lang, []).append(file_path)
+        futures = {}
+        for lang, file_paths in by_lang.items():
+            backend = get_backend(lang, self.config)
+            slice_size = math.ceil(len(file_paths) / backend.concurrency(self.jobs)) if backend.batching else 1
+            for start in range(0, len(file_paths), slice_size):
+                batch = file_paths[start:start + slice_size]
+                sources = self._batch_sources(batch)
+                if processes is not None and self._in_process(lang):
+                    future = processes.submit(_analyze_in_worker, self.config, batch, lang, sources)
+                else:
+                    future = threads.submit(
+                        self._timed, "analyze", batch, self.analyzer.analyze_files, batch, lang, sources
+                    )
+                for file_path in batch:
+                    futures[file_path] = future
+        return futures
+
+    def _begin_wave(self, code_files):
+        """Whether to review this wave; only waves that are reviewed count towards the progress total."""
+        self._check_cancelled()
+        if self.scheduler.should_stop():
+            return False
+        self.total += len(code_files)
+        return True
+
+    def _batch_sources(self, file_paths):
+        # Sources in memory, given or read for the index, so the linters' workers don't read them again
+        sources = {}
+        for file_path in file_paths:
+            code = self.sources.get(file_path, self.loaded.get(file_path))
+            if code is not None:
+                sources[file_path] = code
+        return sources
+
+    def _in_process(self, lang):
+        # In-process backends are CPU-bound Python (bandit/radon, black/ast), so they
+        # run in worker processes; the others mostly wait on a tool and use threads
+        return get_backend(lang, self.config).executor_type() == IN_PROCESS
+
+    def _start_process_pool(self):
+        # Forked workers would inherit the exec-status pipe of any subprocess.Popen
+        # another thread is in the middle of, hanging that call; start them clean.
+        methods = multiprocessing.get_all_start_methods()
+        try:
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            return ProcessPoolExecutor(
+                max_workers=self.jobs, mp_context=context,
+                initializer=configure_worker_logging, initargs=worker_settings()
+            )
+        except (OSError, NotImplementedError, ImportError) as e:
+            # Some serverless runtimes have no working multiprocessing primitives
+            logger.warning("Process pool unavailable, using threads only: %s", e)
+            return None
+
+    def _timed(self, stage, file_paths, func, *args):
+        # Thread-pool tasks: time the stage and charge tool calls to this run.
+        # Returns (result, None) to match what the process-pool workers return.
+        with activate(self.recorder), self.recorder.stage(stage, file_paths):
+            return func(*args), None
+
+    def _save_pending(self, file_path, analysis_results, future, cache_key, code):
+        self._save(file_path, analysis_results, self._result(future, file_path), cache_key, code)
+
+    def _source(self, file_path):
+        code = self.sources.get(file_path, self.loaded.get(file_path))
+        if code is None:
+            with open(file_path, 'r') as f:
+                code = f.read()
+        return code
+
+    def _save(self, file_path, analysis_results, improved_code, cache_key=None, code=None):
+        if code is None:
+            code = self.sources.get(file_path, self.loaded.get(file_path))
+        self.loaded.pop(file_path, None)
+        with self.recorder.stage("save", [file_path]):
+            reported_results = analysis_results
+            if self.issue_filter is not None:
+                reported_results = self.issue_filter(file_path, analysis_results)
+            self.output_gen.save_improved_code(file_path, improved_code, reported_results, code)
+            if cache_key is not None:
+                self.cache.put(cache_key, {"analysis": analysis_results, "improved_code": improved_code})
+        self.scheduler.record(file_path, analysis_results)
+        self.done += 1
+        if self.progress is not None:
+            self.progress(self.done, self.total, file_path)
+
+    def _check_cancelled(self):
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise PipelineCancelled(f"Cancelled after {self.done} of {self.total} file(s)")
+
+    def _result(self, future, file_path):
+        try:
+            value, timings = future.result()
+        except Exception as e:
+            raise Exception(f"Failed to process file {file_path}: {str(e)}") from e
+        # Worker-process timings; an analysis future is shared by its whole batch
+        if timings is not None and future not in self.merged_futures:
+            self.merged_futures.add(future)
+            self.recorder.merge(timings)
+            self.scheduler.budget.add_worker_cpu(sum(stats["cpu_seconds"] for stats in timings["stages"].values()))
+        return value
+
+
+def _done(improved_code):
+    # Stands in for an improvement that didn't need a worker (cached or skipped)
+    future = Future()
+    future.set_result((improved_code, None))
+    return future
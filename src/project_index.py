@@ -0,0 +1,281 @@
+import os
+import re
+import hashlib
+import logging
+from array import array
+from collections import deque
+
+from backends import BACKENDS, SUPPORTED_EXTENSIONS
+
+logger = logging.getLogger(__name__)
+
+# Consecutive meaningful lines that must repeat before a block counts as duplicated
+DUPLICATE_MIN_LINES = 6
+# Lines with fewer letters/digits than this (braces, "else:", "});") never start or extend a match
+MIN_LINE_CHARS = 3
+NOT_ALNUM = re.compile(r"[\W_]+")
+COMMENT_PREFIXES = ("#", "//", "/*", "*")
+
+# Directories whose files are collected by a test runner rather than imported
+TEST_DIRS = {"test", "tests", "__tests__", "spec"}
+
+
+class IndexedFile:
+    """What the index keeps for one file: its symbols, imports and content fingerprint."""
+
+    def __init__(self, path, language, fingerprint):
+        self.path = path
+        self.language = language
+        self.fingerprint = fingerprint
+        self.symbols = []
+        # (imported name as written, line)
+        self.imports = []
+        # Whatever else the language's backend needs to resolve imports, e.g. a Java file's package
+        self.details = {}
+        self.entry_point = False
+        # Line numbers of the lines that take part in duplicate matching
+        self.lines = array("I")
+
+
+class ProjectIndex:
+    """Symbols, imports and fingerprints of every reviewed file, plus the project-level findings they give.
+
+    Files are added one at a time as the review pipeline loads them; duplicate
+    blocks are matched as each file is added, keyed on a SHA-256 digest of
+    every window of ``duplicate_min_lines`` meaningful lines. ``findings`` resolves imports into
+    a graph of project files and reports import cycles and files nothing
+    imports. Everything is linear in the number of lines and imports.
+    """
+
+    def __init__(self, duplicate_min_lines=DUPLICATE_MIN_LINES):
+        self.duplicate_min_lines = duplicate_min_lines
+        self.files = {}
+        self.by_fingerprint = {}
+        # Window digest -> (path, index of its first line in that file's ``lines``)
+        self.windows = {}
+        self.duplicates = []
+
+    @classmethod
+    def from_config(cls, config):
+        settings = config.get("project_analysis") or {}
+        if not settings.get("enabled", True):
+            return None
+        return cls(int(settings.get("duplicate_min_lines", DUPLICATE_MIN_LINES)))
+
+    def add(self, file_path, code):
+        language = SUPPORTED_EXTENSIONS.get(os.path.splitext(file_path)[1].lower())
+        if language is None or file_path in self.files:
+            return
+        fingerprint = hashlib.sha256(code.encode("utf-8")).hexdigest()
+        entry = IndexedFile(file_path, language, fingerprint)
+        backend = BACKENDS[language]
+        # Symbols, imports and entry points are language-specific, so each backend reads its own
+        backend.index_file(entry, code)
+        test_file = backend.test_file_pattern
+        if test_file is not None and test_file.search(os.path.basename(file_path)):
+            entry.entry_point = True
+        if TEST_DIRS.intersection(os.path.normpath(file_path).split(os.sep)):
+            entry.entry_point = True
+        self.files[file_path] = entry
+
+        normalized = self._normalize(entry, code)
+        if len(normalized) < self.duplicate_min_lines:
+            return
+        original = self.by_fingerprint.setdefault(fingerprint, file_path)
+        if original != file_path:
+            # An identical copy: one finding for the whole file instead of one per block
+            last = code.count("\n") + 1
+            self.duplicates.append(((file_path, 1, last), (original, 1, last)))
+            return
+        self._match_blocks(entry, normalized)
+
+    @staticmethod
+    def _normalize(entry, code):
+        # Whitespace-insensitive code lines, without comments, imports and lone punctuation
+        normalized = []
+        for number, line in enumerate(code.splitlines(), 1):
+            line = " ".join(line.split())
+            if not line or line.startswith(COMMENT_PREFIXES) or _is_import(line):
+                continue
+            if len(NOT_ALNUM.sub("", line)) < MIN_LINE_CHARS:
+                continue
+            normalized.append(line)
+            entry.lines.append(number)
+        return normalized
+
+    def _match_blocks(self, entry, normalized):
+        size = self.duplicate_min_lines
+        block = None
+        for start in range(len(normalized) - size + 1):
+            # A digest rather than hash(): colliding keys would report unrelated blocks as duplicates
+            key = hashlib.sha256("\n".join(normalized[start:start + size]).encode("utf-8")).digest()
+            seen = self.windows.get(key)
+            if seen is None:
+                self.windows[key] = (entry.path, start)
+            elif seen[0] == entry.path and seen[1] + size > start:
+                # Overlaps itself, e.g. a long run of identical lines
+                seen = None
+            if block is not None and seen == (block[2], block[3] + block[1]):
+                block[1] += 1
+                continue
+            if block is not None:
+                self._close_block(entry, block)
+            block = [start, 1, seen[0], seen[1]] if seen is not None else None
+        if block is not None:
+            self._close_block(entry, block)
+
+    def _close_block(self, entry, block):
+        # block = [first window here, windows matched, other path, first window there]
+        start, windows, other_path, other_start = block
+        last = windows + self.duplicate_min_lines - 2
+        other = self.files[other_path]
+        self.duplicates.append((
+            (entry.path, entry.lines[start], entry.lines[start + last]),
+            (other_path, other.lines[other_start], other.lines[other_start + last]),
+        ))
+
+    def import_graph(self):
+        """{path: {imported project path: line of the import}} for imports that resolve to indexed files."""
+        resolvers = {
+            language: BACKENDS[language].import_resolver(entries)
+            for language, entries in self._by_language().items()
+        }
+        graph = {}
+        for entry in self.files.values():
+            edges = graph.setdefault(entry.path, {})
+            resolve = resolvers[entry.language]
+            for name, line in entry.imports:
+                for target in resolve(entry, name):
+                    if target != entry.path:
+                        edges.setdefault(target, line)
+        return graph
+
+    def findings(self, complete=True):
+        """Project-level issues: import cycles, duplicate blocks and (for complete runs) unimported files."""
+        graph = self.import_graph()
+        findings = []
+        for component in strongly_connected(graph):
+            if len(component) == 1:
+                continue
+            members = set(component)
+            locations = [
+                (path, line) for path in sorted(component)
+                for target, line in graph[path].items() if target in members
+            ]
+            names = " -> ".join(os.path.basename(path) for path in _cycle_order(component, graph))
+            findings.append(_finding("import_cycle", "warning", f"Circular import: {names}", locations))
+
+        for (path, first, last), (other, other_first, other_last) in self.duplicates:
+            findings.append(_finding(
+                "duplicate_block", "warning",
+                f"Lines {first}-{last} duplicate {other} lines {other_first}-{other_last}",
+                [(path, first), (other, other_first)],
+            ))
+
+        # Only meaningful when every file was reviewed: a skipped file may be the importer
+        if complete:
+            used = {target for edges in graph.values() for target in edges}
+            # e.g. Java classes, used by name from their own package without an import
+            for language, entries in self._by_language().items():
+                used.update(BACKENDS[language].used_without_import(entries))
+            for entry in self.files.values():
+                if entry.entry_point or entry.path in used:
+                    continue
+                findings.append(_finding(
+                    "unused_module", "note",
+                    "Not imported by any other reviewed file (ignore if it is an entry point)",
+                    [(entry.path, 1)],
+                ))
+        return findings
+
+    def _by_language(self):
+        by_language = {}
+        for entry in self.files.values():
+            by_language.setdefault(entry.language, []).append(entry)
+        return by_language
+
+    def summary(self):
+        languages = {}
+        for entry in self.files.values():
+            languages[entry.language] = languages.get(entry.language, 0) + 1
+        return {
+            "files": len(self.files),
+            "languages": languages,
+            "symbols": sum(len(entry.symbols) for entry in self.files.values()),
+            "imports": sum(len(entry.imports) for entry in self.files.values()),
+        }
+
+
+def _finding(kind, severity, message, locations):
+    return {
+        "kind": kind,
+        "severity": severity,
+        "message": message,
+        "locations": [{"path": path, "line": line} for path, line in locations],
+    }
+
+
+def _is_import(line):
+    return line.startswith(("import ", "from ", "package ", "#include ")) or "require(" in line
+
+
+def strongly_connected(graph):
+    """Tarjan's strongly connected components of ``{node: iterable of nodes}``, without recursion."""
+    index = {}
+    low = {}
+    stack = []
+    on_stack = set()
+    components = []
+    for root in graph:
+        if root in index:
+            continue
+        index[root] = low[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(graph.get(root, ())))]
+        while work:
+            node, children = work[-1]
+            for child in children:
+                if child not in index:
+                    index[child] = low[child] = len(index)
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter(graph.get(child, ()))))
+                    break
+                if child in on_stack:
+                    low[node] = min(low[node], index[child])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component)
+    return components
+
+
+def _cycle_order(component, graph):
+    # The shortest cycle through the component's first file, for the message
+    members = set(component)
+    start = min(component)
+    parents = {start: None}
+    queue = deque([start])
+    while queue:
+        node = queue.popleft()
+        for target in sorted(graph[node]):
+            if target == start:
+                cycle = [node]
+                while parents[cycle[-1]] is not None:
+                    cycle.append(parents[cycle[-1]])
+                return [*reversed(cycle), start]
+            if target in members and target not in parents:
+                parents[target] = node
+                queue.append(target)
+    return [start, start]
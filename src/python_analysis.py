@@ -0,0 +1,138 @@
+import io
+import ast
+import logging
+import functools
+import tokenize
+
+from instrumentation import tool
+
+# bandit and radon are imported on first use: they add a noticeable import cost and
+# are only needed once a Python file is actually analyzed.
+
+logger = logging.getLogger(__name__)
+
+# Functions and classes above this cyclomatic complexity are reported as code smells
+MAX_COMPLEXITY = 10
+# Bandit's severity levels in the vocabulary the other linters use
+BANDIT_SEVERITY = {"HIGH": "error", "MEDIUM": "warning", "LOW": "info", "UNDEFINED": "info"}
+# Modules whose maintainability index falls below this (radon rank C) are reported as code smells
+MIN_MAINTAINABILITY = 10
+
+
+def empty_results():
+    """The result shape every analyzer produces, for any language."""
+    return {"bugs": [], "code_smells": [], "security_issues": [], "metrics": {}}
+
+
+def issue(line, column, severity, message, source):
+    return {"line": line, "column": column, "severity": severity, "message": message, "source": source}
+
+
+@functools.lru_cache(maxsize=None)
+def _bandit_test_set():
+    from bandit.core import config as bandit_config
+    from bandit.core.test_set import BanditTestSet
+    # Loading the plugins is the expensive part of bandit; do it once per process
+    return BanditTestSet(bandit_config.BanditConfig())
+
+
+def analyze_source(file_path, code, security=True, complexity=True):
+    """Security issues (bandit) and complexity metrics (radon) for one Python file, from a single parse."""
+    results = empty_results()
+    try:
+        tree = ast.parse(code, filename=file_path)
+    except (SyntaxError, ValueError) as e:
+        # Pylint reports the syntax error itself; there is nothing else to measure
+        results["metrics"]["parse_error"] = str(e)
+        return results
+
+    if security:
+        with tool("bandit"):
+            results["security_issues"] = _run_bandit(file_path, code, tree)
+    if complexity:
+        with tool("radon"):
+            metrics, smells = _run_radon(code, tree)
+        results["metrics"] = metrics
+        results["code_smells"] = smells
+    return results
+
+
+def _run_bandit(file_path, code, tree):
+    from bandit.core.meta_ast import BanditMetaAst
+    from bandit.core.metrics import Metrics
+    from bandit.core.node_visitor import BanditNodeVisitor
+
+    data = code.encode("utf-8")
+    metrics = Metrics()
+    metrics.begin(file_path)
+    visitor = BanditNodeVisitor(
+        file_path, io.BytesIO(data), BanditMetaAst(), _bandit_test_set(),
+        False, _nosec_lines(data), metrics
+    )
+    # Same as visitor.process(), but on the tree we already have
+    visitor.generic_visit(tree)
+    return [
+        issue(
+            result.lineno, result.col_offset, BANDIT_SEVERITY.get(result.severity, "info"),
+            f"{result.text} (confidence: {result.confidence.lower()})", f"bandit:{result.test_id}"
+        )
+        for result in visitor.tester.results
+    ]
+
+
+def _nosec_lines(data):
+    from bandit.core import manager as bandit_manager
+
+    nosec_lines = {}
+    try:
+        for token in tokenize.tokenize(io.BytesIO(data).readline):
+            if token.type == tokenize.COMMENT:
+                tests = bandit_manager._parse_nosec_comment(token.string)
+                if tests is not None:
+                    nosec_lines[token.start[0]] = tests
+    except (tokenize.TokenError, SyntaxError):
+        pass
+    return nosec_lines
+
+
+def _run_radon(code, tree):
+    from radon.complexity import cc_rank
+    from radon.metrics import h_visit_ast, mi_compute, mi_rank
+    from radon.raw import analyze
+    from radon.visitors import ComplexityVisitor
+
+    raw = analyze(code)
+    complexity = ComplexityVisitor.from_ast(tree)
+    halstead = h_visit_ast(tree)
+    # Same inputs as radon's mi_visit(code, multi=True)
+    comments = (raw.comments + raw.multi) / float(raw.sloc) * 100 if raw.sloc else 0
+    maintainability = mi_compute(halstead.total.volume, complexity.total_complexity, raw.lloc, comments)
+
+    blocks = complexity.blocks
+    metrics = {
+        "loc": raw.loc,
+        "sloc": raw.sloc,
+        "lloc": raw.lloc,
+        "comments": raw.comments,
+        "cyclomatic_complexity": complexity.total_complexity,
+        "max_complexity": max((block.complexity for block in blocks), default=0),
+        "halstead_volume": round(halstead.total.volume, 2),
+        "maintainability_index": round(maintainability, 2),
+        "maintainability_rank": mi_rank(maintainability),
+    }
+
+    smells = []
+    for block in blocks:
+        if block.complexity > MAX_COMPLEXITY:
+            smells.append(issue(
+                block.lineno, block.col_offset, "warning",
+                f"{block.fullname} is too complex (cyclomatic complexity {block.complexity}, "
+                f"rank {cc_rank(block.complexity)})",
+                "radon:cc"
+            ))
+    if raw.sloc and maintainability < MIN_MAINTAINABILITY:
+        smells.append(issue(
+            1, 0, "warning", f"Low maintainability index {maintainability:.1f} (rank {mi_rank(maintainability)})",
+            "radon:mi"
+        ))
+    return metrics, smells
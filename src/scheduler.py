@@ -0,0 +1,242 @@
+import os
+import json
+import math
+import time
+import hashlib
+import logging
+import tempfile
+
+from cache import default_cache_dir
+from instrumentation import child_cpu_seconds
+
+logger = logging.getLogger(__name__)
+
+ORDERS = ("auto", "discovery", "risk")
+DEFAULT_SCHEDULE = {"order": "auto", "time_budget_s": None, "cpu_budget_s": None, "churn_days": 90}
+# The priority that weighs each kind of issue in a file's past issue density;
+# bugs count at the highest priority, whatever the run focuses on
+ISSUE_PRIORITIES = {"security_issues": "security", "code_smells": "readability", "bugs": None}
+# Files listed by name in the report's "Not reviewed" list
+MAX_SKIPPED_LISTED = 50
+
+
+class Budget:
+    """Wall-clock and CPU limits for one run; ``exceeded`` describes the first one used up.
+
+    CPU counts this process, finished tool subprocesses and what worker processes
+    report back, so in the web app it also includes other requests' work.
+    """
+
+    def __init__(self, time_seconds=None, cpu_seconds=None):
+        self.time_seconds = time_seconds
+        self.cpu_seconds = cpu_seconds
+        self.started = time.monotonic()
+        self.cpu_started = time.process_time() + child_cpu_seconds()
+        self.worker_cpu_seconds = 0.0
+
+    @property
+    def limited(self):
+        return bool(self.time_seconds or self.cpu_seconds)
+
+    def add_worker_cpu(self, seconds):
+        self.worker_cpu_seconds += seconds
+
+    def cpu_used(self):
+        return time.process_time() + child_cpu_seconds() - self.cpu_started + self.worker_cpu_seconds
+
+    def exceeded(self):
+        if self.time_seconds and time.monotonic() - self.started >= self.time_seconds:
+            return f"time budget of {self.time_seconds:g}s reached"
+        if self.cpu_seconds and self.cpu_used() >= self.cpu_seconds:
+            return f"CPU budget of {self.cpu_seconds:g}s reached"
+        return None
+
+
+class IssueHistory:
+    """Weighted issues per KB for each file of a project, as of the run that last reviewed it.
+
+    Stored as one JSON file per project under the cache directory and rewritten
+    at the end of every run that has the cache enabled.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            with open(path, "r") as f:
+                self.density = json.load(f)
+        except FileNotFoundError:
+            self.density = {}
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable issue history %s: %s", path, e)
+            self.density = {}
+
+    @classmethod
+    def from_config(cls, config, project):
+        settings = config.get("cache") or {}
+        if not project or not settings.get("enabled", True):
+            return None
+        digest = hashlib.sha256(project.encode("utf-8")).hexdigest()[:24]
+        return cls(os.path.join(settings.get("dir") or default_cache_dir(), "history", f"{digest}.json"))
+
+    def save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(self.density, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning("Failed to write issue history %s: %s", self.path, e)
+
+
+def recent_churn(root, days):
+    """Commits that touched each file (by real path) in the last ``days`` days; empty outside a git repository."""
+    try:
+        import git
+    except ImportError:
+        return {}
+    try:
+        repo = git.Repo(root, search_parent_directories=True)
+        output = repo.git.log(f"--since={days} days ago", "--name-only", "--format=")
+    except (git.GitError, OSError) as e:
+        logger.debug("No churn data for %s: %s", root, e)
+        return {}
+    churn = {}
+    for line in output.splitlines():
+        if line:
+            path = os.path.realpath(os.path.join(repo.working_tree_dir, line))
+            churn[path] = churn.get(path, 0) + 1
+    return churn
+
+
+class Scheduler:
+    """Decides the order files are reviewed in and when a budgeted run stops.
+
+    With ``order`` "risk" (the default once a budget is set) every file is
+    discovered first and reviewed largest risk first: bigger files, files with
+    more recent commits and files that had more issues last time. Whatever the
+    order, the run stops taking new files once the time or CPU budget is used
+    up, and ``coverage`` reports what was and wasn't reviewed.
+    """
+
+    def __init__(self, config, root=None, project=None):
+        settings = {**DEFAULT_SCHEDULE, **(config.get("schedule") or {})}
+        self.config = config
+        self.root = os.path.realpath(root) if root else None
+        self.budget = Budget(settings["time_budget_s"], settings["cpu_budget_s"])
+        order = settings["order"]
+        if order not in ORDERS:
+            raise ValueError(f"Unknown schedule order: {order} (choose from {', '.join(ORDERS)})")
+        if order == "auto":
+            order = "risk" if self.budget.limited else "discovery"
+        self.order = order
+        self.churn_days = settings["churn_days"]
+        # Past issue density per file, for inputs that keep their identity between runs
+        self.history = IssueHistory.from_config(config, project)
+        self.stop_reason = None
+        self.scheduled = []
+        self.reviewed = set()
+        self.remaining = iter(())
+
+    def schedule(self, code_files):
+        """(path, language) pairs in review order; what is handed out is remembered for ``coverage``."""
+        if self.order == "risk":
+            code_files = self.by_risk(list(code_files))
+        self.remaining = iter(code_files)
+        return self._hand_out()
+
+    def _hand_out(self):
+        for code_file in self.remaining:
+            self.scheduled.append(code_file)
+            yield code_file
+
+    def by_risk(self, code_files):
+        churn = recent_churn(self.root or os.getcwd(), self.churn_days) if code_files else {}
+        known = list(self.history.density.values()) if self.history is not None else []
+        # Files without history rank as if they had the average density
+        default_density = sum(known) / len(known) if known else 0.0
+        scores = {}
+        for file_path, _ in code_files:
+            size = _size(file_path)
+            density = default_density
+            if self.history is not None:
+                density = self.history.density.get(self._key(file_path), default_density)
+            recent = churn.get(os.path.realpath(file_path), 0)
+            scores[file_path] = math.log1p(size) * (1 + math.log1p(recent)) * (1 + density)
+        logger.debug("Ordered %d file(s) by risk (%d with recent commits)", len(code_files), len(churn))
+        return sorted(code_files, key=lambda code_file: scores[code_file[0]], reverse=True)
+
+    def should_stop(self):
+        if self.stop_reason is None:
+            reason = self.budget.exceeded()
+            if reason is None:
+                return False
+            self.stop_reason = reason
+            logger.warning("Stopping early: %s after %d file(s); the report will be partial", reason, len(self.reviewed))
+        return True
+
+    def needs_improvement(self, analysis_results):
+        # Improvements are formatting and documentation, i.e. readability
+        if self.config.priority("readability") <= 0:
+            return False
+        if self.config.get("aggressiveness") == "low":
+            return any(analysis_results.get(category) for category in ISSUE_PRIORITIES)
+        return True
+
+    def record(self, file_path, analysis_results):
+        self.reviewed.add(file_path)
+        if self.history is None:
+            return
+        weights = {category: self._weight(priority) for category, priority in ISSUE_PRIORITIES.items()}
+        issues = sum(weights[category] * len(analysis_results.get(category) or []) for category in weights)
+        self.history.density[self._key(file_path)] = round(issues / max(_size(file_path) / 1024, 1), 3)
+
+    def finish(self):
+        # Files never handed out still count towards coverage
+        self.scheduled.extend(self.remaining)
+        if self.history is not None:
+            self.history.save()
+
+    def coverage(self):
+        """Files and bytes reviewed out of everything scheduled, overall and per language."""
+        by_language = {}
+        bytes_reviewed = bytes_total = 0
+        skipped = []
+        for file_path, lang in self.scheduled:
+            size = _size(file_path)
+            counts = by_language.setdefault(lang, {"reviewed": 0, "total": 0})
+            counts["total"] += 1
+            bytes_total += size
+            if file_path in self.reviewed:
+                counts["reviewed"] += 1
+                bytes_reviewed += size
+            else:
+                skipped.append(file_path)
+        return {
+            "complete": not skipped,
+            "stop_reason": self.stop_reason,
+            "order": self.order,
+            "files_reviewed": len(self.scheduled) - len(skipped),
+            "files_total": len(self.scheduled),
+            "bytes_reviewed": bytes_reviewed,
+            "bytes_total": bytes_total,
+            "by_language": by_language,
+            "skipped": skipped[:MAX_SKIPPED_LISTED],
+            "skipped_count": len(skipped),
+        }
+
+    def _weight(self, priority):
+        if priority is None:
+            return max(self.config.priority(name) for name in ISSUE_PRIORITIES.values() if name)
+        return self.config.priority(priority)
+
+    def _key(self, file_path):
+        path = os.path.realpath(file_path)
+        return os.path.relpath(path, self.root) if self.root else path
+
+
+def _size(file_path):
+    try:
+        return os.path.getsize(file_path)
+    except OSError:
+        return 0
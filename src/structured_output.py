@@ -0,0 +1,182 @@
+import os
+import json
+import datetime
+from pathlib import Path
+
+TOOL_NAME = "AI Code Review Agent"
+SARIF_SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+# Result categories, in the order every analyzer reports them
+ISSUE_CATEGORIES = ("bugs", "security_issues", "code_smells")
+# Linters whose columns count from 0; SARIF columns count from 1
+ZERO_BASED_COLUMNS = ("pylint", "bandit", "radon")
+SARIF_LEVELS = {"fatal": "error", "error": "error", "warning": "warning"}
+
+
+class UnknownOutputFormat(ValueError):
+    """Raised for an output format name that has no writer."""
+
+
+def iter_issues(analysis_results):
+    """(category, issue) pairs from one file's analysis results."""
+    for category in ISSUE_CATEGORIES:
+        for issue in analysis_results.get(category) or []:
+            if isinstance(issue, dict):
+                yield category, issue
+
+
+def _uri(file_path):
+    path = Path(file_path)
+    return path.as_uri() if path.is_absolute() else path.as_posix()
+
+
+class JsonlWriter:
+    """Newline-delimited JSON: a "run" record, then per file one "issue" record per
+    issue followed by a "file" record, and a closing "summary" record.
+    """
+
+    extension = ".jsonl"
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'w')
+
+    def start(self):
+        self._record({"type": "run", "tool": TOOL_NAME, "generated": datetime.datetime.now().isoformat()})
+
+    def write_file(self, file_path, analysis_results, diff):
+        counts = {category: 0 for category in ISSUE_CATEGORIES}
+        for category, issue in iter_issues(analysis_results):
+            counts[category] += 1
+            self._record({"type": "issue", "path": file_path, "category": category, **issue})
+        self._record({
+            "type": "file",
+            "path": file_path,
+            "issues": counts,
+            "lines_added": diff.added,
+            "lines_removed": diff.removed,
+            "metrics": analysis_results.get("metrics") or {},
+        })
+
+    def write_project(self, findings):
+        for finding in findings:
+            self._record({"type": "project_issue", **finding})
+
+    def finish(self, summary):
+        self._record({"type": "summary", **summary})
+        self.file.close()
+
+    def _record(self, record):
+        self.file.write(json.dumps(record, default=str) + "\n")
+
+
+class SarifWriter:
+    """SARIF 2.1.0 for code scanning tools, written one result at a time.
+
+    ``results`` is streamed first and the tool's rule list, which is only known
+    once every file is done, is written after it; JSON key order doesn't matter.
+    """
+
+    extension = ".sarif"
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'w')
+        self.rules = {}
+        self.first_result = True
+
+    def start(self):
+        self.file.write(f'{{"version": "2.1.0", "$schema": "{SARIF_SCHEMA}", "runs": [{{"results": [\n')
+
+    def write_file(self, file_path, analysis_results, diff):
+        uri = _uri(file_path)
+        for category, issue in iter_issues(analysis_results):
+            rule_id = issue.get("source") or category
+            self.rules.setdefault(rule_id, category)
+            result = {
+                "ruleId": rule_id,
+                "level": SARIF_LEVELS.get(issue.get("severity"), "note"),
+                "message": {"text": str(issue.get("message") or rule_id)},
+                "locations": [{"physicalLocation": self._location(uri, rule_id, issue)}],
+                "properties": {"category": category, "severity": issue.get("severity")},
+            }
+            self._result(result)
+
+    def write_project(self, findings):
+        # Cross-file findings have one location per file involved
+        for finding in findings:
+            rule_id = f"project:{finding['kind']}"
+            self.rules.setdefault(rule_id, "project")
+            self._result({
+                "ruleId": rule_id,
+                "level": SARIF_LEVELS.get(finding["severity"], "note"),
+                "message": {"text": finding["message"]},
+                "locations": [
+                    {"physicalLocation": self._location(_uri(location["path"]), rule_id, location)}
+                    for location in finding["locations"]
+                ],
+                "properties": {"category": "project", "severity": finding["severity"]},
+            })
+
+    def _result(self, result):
+        self.file.write(("" if self.first_result else ",\n") + json.dumps(result, default=str))
+        self.first_result = False
+
+    def finish(self, summary):
+        rules = [
+            {"id": rule_id, "properties": {"category": category}}
+            for rule_id, category in sorted(self.rules.items())
+        ]
+        tool = {"driver": {"name": TOOL_NAME, "rules": rules}}
+        invocation = {"executionSuccessful": True, "properties": summary}
+        self.file.write(
+            f"\n], \"tool\": {json.dumps(tool)}, \"invocations\": [{json.dumps(invocation, default=str)}]}}]}}\n"
+        )
+        self.file.close()
+
+    @staticmethod
+    def _location(uri, rule_id, issue):
+        location = {"artifactLocation": {"uri": uri}}
+        line = _positive_int(issue.get("line"))
+        if line is not None:
+            region = {"startLine": line}
+            column = _positive_int(issue.get("column"), rule_id.split(":", 1)[0] in ZERO_BASED_COLUMNS)
+            if column is not None:
+                region["startColumn"] = column
+            location["region"] = region
+        return location
+
+
+def _positive_int(value, zero_based=False):
+    try:
+        value = int(value) + (1 if zero_based else 0)
+    except (TypeError, ValueError):
+        return None
+    return value if value >= 1 else None
+
+
+WRITERS = {"sarif": SarifWriter, "jsonl": JsonlWriter}
+# The Markdown report is always written; these can be added to it
+OUTPUT_FORMATS = ("markdown", *WRITERS)
+
+
+def output_path(report_path, fmt):
+    """Where a run's output in ``fmt`` lives, next to its Markdown report."""
+    if fmt == "markdown":
+        return report_path
+    return os.path.splitext(report_path)[0] + WRITERS[fmt].extension
+
+
+def parse_formats(formats):
+    """Validate a list (or comma-separated string) of output format names."""
+    if isinstance(formats, str):
+        formats = formats.split(",")
+    selected = []
+    for fmt in formats or ():
+        fmt = fmt.strip().lower()
+        if not fmt:
+            continue
+        if fmt not in OUTPUT_FORMATS:
+            raise UnknownOutputFormat(f"Unknown output format: {fmt} (choose from {', '.join(OUTPUT_FORMATS)})")
+        if fmt not in selected:
+            selected.append(fmt)
+    return selected
@@ -0,0 +1,142 @@
+import java.io.ByteArrayOutputStream;
+import java.io.File;
+import java.io.IOException;
+import java.io.InputStream;
+import java.io.OutputStream;
+import java.io.PrintStream;
+import java.lang.reflect.InvocationTargetException;
+import java.lang.reflect.Method;
+import java.nio.charset.StandardCharsets;
+import java.util.ArrayList;
+import java.util.List;
+import java.util.Properties;
+
+/**
+ * Long-lived Checkstyle / google-java-format worker used by src/daemons.py.
+ *
+ * <p>Started with the tool's jar on the classpath via the single-file source launcher:
+ * {@code java -cp checkstyle.jar JavaToolWorker.java checkstyle sun_checks.xml} or
+ * {@code java -cp google-java-format.jar JavaToolWorker.java google-java-format}.
+ * Requests on stdin are {@code <command>\t<length>\n} followed by the body; responses on
+ * stdout are {@code OK <length>\n} or {@code ERR <length>\n} followed by the body. The
+ * tools are called through reflection so one source file works with either jar.
+ */
+public final class JavaToolWorker {
+  private final String mode;
+  private Object checkstyleConfiguration;
+
+  private JavaToolWorker(String[] args) throws Exception {
+    mode = args[0];
+    if (mode.equals("checkstyle")) {
+      Object expander = Class.forName("com.puppycrawl.tools.checkstyle.PropertiesExpander")
+          .getConstructor(Properties.class)
+          .newInstance(System.getProperties());
+      Method load = Class.forName("com.puppycrawl.tools.checkstyle.ConfigurationLoader")
+          .getMethod("loadConfiguration", String.class,
+              Class.forName("com.puppycrawl.tools.checkstyle.PropertyResolver"));
+      checkstyleConfiguration = load.invoke(null, args[1], expander);
+    } else if (!mode.equals("google-java-format")) {
+      throw new IllegalArgumentException("Unknown mode: " + mode);
+    }
+  }
+
+  public static void main(String[] args) throws Exception {
+    // stdout carries the protocol; anything the tools print goes to stderr instead
+    PrintStream protocol = System.out;
+    System.setOut(System.err);
+    JavaToolWorker worker = new JavaToolWorker(args);
+    InputStream in = System.in;
+    String header;
+    while ((header = readLine(in)) != null) {
+      String[] fields = header.split("\t");
+      byte[] body = in.readNBytes(Integer.parseInt(fields[1]));
+      String status = "OK";
+      String result;
+      try {
+        result = worker.handle(fields[0], new String(body, StandardCharsets.UTF_8));
+      } catch (InvocationTargetException e) {
+        status = "ERR";
+        result = String.valueOf(e.getCause());
+      } catch (Exception e) {
+        status = "ERR";
+        result = String.valueOf(e);
+      }
+      byte[] payload = result.getBytes(StandardCharsets.UTF_8);
+      protocol.write((status + " " + payload.length + "\n").getBytes(StandardCharsets.UTF_8));
+      protocol.write(payload);
+      protocol.flush();
+    }
+  }
+
+  private String handle(String command, String body) throws Exception {
+    if (command.equals("ping")) {
+      return "pong";
+    }
+    if (command.equals("check") && mode.equals("checkstyle")) {
+      return check(body);
+    }
+    if (command.equals("format") && mode.equals("google-java-format")) {
+      return format(body);
+    }
+    throw new IllegalArgumentException("Unsupported command for " + mode + ": " + command);
+  }
+
+  private String check(String body) throws Exception {
+    List<File> files = new ArrayList<>();
+    for (String path : body.split("\n")) {
+      if (!path.isEmpty()) {
+        files.add(new File(path));
+      }
+    }
+    Class<?> checkerClass = Class.forName("com.puppycrawl.tools.checkstyle.Checker");
+    Object checker = checkerClass.getConstructor().newInstance();
+    checkerClass.getMethod("setModuleClassLoader", ClassLoader.class)
+        .invoke(checker, checkerClass.getClassLoader());
+    checkerClass.getMethod("configure",
+            Class.forName("com.puppycrawl.tools.checkstyle.api.Configuration"))
+        .invoke(checker, checkstyleConfiguration);
+    ByteArrayOutputStream xml = new ByteArrayOutputStream();
+    Class<?> optionsClass = outputStreamOptionsClass();
+    Object xmlLogger = Class.forName("com.puppycrawl.tools.checkstyle.XMLLogger")
+        .getConstructor(OutputStream.class, optionsClass)
+        .newInstance(xml, optionsClass.getField("NONE").get(null));
+    checkerClass.getMethod("addListener",
+            Class.forName("com.puppycrawl.tools.checkstyle.api.AuditListener"))
+        .invoke(checker, xmlLogger);
+    try {
+      checkerClass.getMethod("process", List.class).invoke(checker, files);
+    } finally {
+      checkerClass.getMethod("destroy").invoke(checker);
+    }
+    return xml.toString(StandardCharsets.UTF_8);
+  }
+
+  private static Class<?> outputStreamOptionsClass() throws ClassNotFoundException {
+    try {
+      // Checkstyle 10.9 and later
+      return Class.forName("com.puppycrawl.tools.checkstyle.AbstractAutomaticBean$OutputStreamOptions");
+    } catch (ClassNotFoundException e) {
+      return Class.forName("com.puppycrawl.tools.checkstyle.api.AutomaticBean$OutputStreamOptions");
+    }
+  }
+
+  private String format(String source) throws Exception {
+    Class<?> formatterClass = Class.forName("com.google.googlejavaformat.java.Formatter");
+    Object formatter = formatterClass.getConstructor().newInstance();
+    // Same as the CLI default: format, then fix imports
+    Method fixImports = formatterClass.getMethod("formatSourceAndFixImports", String.class);
+    return (String) fixImports.invoke(formatter, source);
+  }
+
+  private static String readLine(InputStream in) throws IOException {
+    ByteArrayOutputStream line = new ByteArrayOutputStream();
+    int b;
+    while ((b = in.read()) != '\n') {
+      if (b < 0) {
+        return line.size() == 0 ? null : line.toString(StandardCharsets.UTF_8);
+      }
+      line.write(b);
+    }
+    return line.toString(StandardCharsets.UTF_8);
+  }
+}
@@ -0,0 +1,78 @@
+'use strict';
+
+// Long-lived ESLint/Prettier worker used by src/daemons.py.
+// Requests on stdin:   "<command>\t<length>\n" followed by <length> bytes of JSON.
+// Responses on stdout: "OK <length>\n" or "ERR <length>\n" followed by the body.
+
+const path = require('path');
+
+const PROJECT_ROOT = path.join(__dirname, '..', '..');
+
+// stdout carries the protocol; anything the tools print goes to stderr instead
+console.log = console.info = console.warn = console.error;
+
+function load(name) {
+  return require(require.resolve(name, { paths: [process.cwd(), PROJECT_ROOT] }));
+}
+
+let eslint = null;
+let prettier = null;
+
+async function handle(command, body) {
+  if (command === 'ping') {
+    return 'pong';
+  }
+  const request = JSON.parse(body);
+  if (command === 'eslint') {
+    if (!eslint) {
+      const { ESLint } = load('eslint');
+      eslint = new ESLint();
+    }
+    return JSON.stringify(await eslint.lintFiles(request.files));
+  }
+  if (command === 'prettier') {
+    if (!prettier) {
+      prettier = load('prettier');
+    }
+    // prettier 2 formats synchronously, prettier 3 returns a promise
+    return await prettier.format(request.source, {
+      filepath: request.filepath,
+      printWidth: request.printWidth,
+    });
+  }
+  throw new Error(`Unknown command: ${command}`);
+}
+
+function respond(status, body) {
+  const payload = Buffer.from(body, 'utf8');
+  process.stdout.write(`${status} ${payload.length}\n`);
+  process.stdout.write(payload);
+}
+
+let buffered = Buffer.alloc(0);
+let queue = Promise.resolve();
+
+process.stdin.on('data', (chunk) => {
+  buffered = Buffer.concat([buffered, chunk]);
+  for (;;) {
+    const newline = buffered.indexOf(10);
+    if (newline < 0) {
+      return;
+    }
+    const [command, length] = buffered.subarray(0, newline).toString('utf8').split('\t');
+    const end = newline + 1 + Number(length);
+    if (buffered.length < end) {
+      return;
+    }
+    const body = buffered.subarray(newline + 1, end).toString('utf8');
+    buffered = buffered.subarray(end);
+    // Answer strictly in request order
+    queue = queue
+      .then(() => handle(command, body))
+      .then((result) => respond('OK', result), (error) => respond('ERR', String(error && error.stack || error)));
+  }
+});
+
+process.stdin.on('end', () => {
+  queue.then(() => process.exit(0));
+});
@@ -0,0 +1,70 @@
+import os
+import shutil
+import logging
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+
+class DiskQuotaExceeded(Exception):
+    """Raised when a workspace grows past its disk quota."""
+
+
+class Workspace:
+    """A private scratch directory for one request or job, removed by ``cleanup``.
+
+    Uploads, extracted sources, improved code and reports all live under ``path``,
+    so concurrent requests never share files. The quota covers all of them: input
+    is reserved before it is written, each improved file before it is saved, and
+    ``check_quota`` rescans the directory for anything written without a reservation.
+    """
+
+    def __init__(self, base_dir, quota_bytes=None, prefix="ws_"):
+        os.makedirs(base_dir, exist_ok=True)
+        self.path = tempfile.mkdtemp(prefix=prefix, dir=base_dir)
+        self.quota_bytes = quota_bytes
+        # Bytes in use, counted once and then kept up to date by ``reserve``
+        self._used = None
+
+    def subdir(self, name):
+        path = os.path.join(self.path, name)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def file(self, name):
+        return os.path.join(self.path, os.path.basename(name))
+
+    def usage(self):
+        total = 0
+        for root, _, files in os.walk(self.path):
+            for name in files:
+                try:
+                    total += os.lstat(os.path.join(root, name)).st_size
+                except OSError:
+                    pass
+        return total
+
+    def reserve(self, size):
+        """Fail before writing ``size`` more bytes if that would exceed the quota."""
+        if self.quota_bytes is None:
+            return
+        if self._used is None:
+            self._used = self.usage()
+        if self._used + size > self.quota_bytes:
+            raise DiskQuotaExceeded(f"Workspace quota of {self.quota_bytes} bytes exceeded")
+        self._used += size
+
+    def check_quota(self):
+        """Rescan the workspace, e.g. after saving an upload or cloning a repository."""
+        self._used = None
+        self.reserve(0)
+
+    def cleanup(self):
+        logger.debug("Removing workspace %s", self.path)
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cleanup()
@@ -0,0 +1,60 @@
+import os
+import sys
+
+import pytest
+
+# The modules in src/ import each other by bare name, as when run as scripts
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+from analyzer import CodeAnalyzer
+from config import Config
+from discovery import FileDiscovery
+from improver import CodeImprover
+from instrumentation import Recorder
+from output_generator import OutputGenerator
+from pipeline import ReviewPipeline
+from scheduler import Scheduler
+
+STUBS_DIR = os.path.join(os.path.dirname(SRC_DIR), "benchmarks", "stubs")
+
+
+@pytest.fixture
+def stub_tools(monkeypatch, tmp_path):
+    """Offline stand-ins for pylint, ESLint, Prettier and the Java tools, and a private cache directory."""
+    monkeypatch.setenv("PATH", STUBS_DIR + os.pathsep + os.environ.get("PATH", ""))
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "xdg-cache"))
+
+
+def write_files(root, files):
+    """Create ``{relative path: content}`` under ``root``; returns ``root`` as a string."""
+    for path, content in files.items():
+        path = os.path.join(str(root), path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(content)
+    return str(root)
+
+
+@pytest.fixture
+def review(stub_tools, tmp_path):
+    """Run the review pipeline over a directory with the stub tools; returns (pipeline, report_path)."""
+
+    def run(input_path, config_data=None, **pipeline_options):
+        config = Config.from_dict({"cache": {"enabled": False}, "jobs": 1, **(config_data or {})})
+        output_gen = OutputGenerator(config, str(tmp_path / "output"), str(tmp_path / "reports"))
+        recorder = Recorder()
+        pipeline_options.setdefault("scheduler", Scheduler(config, input_path))
+        pipeline = ReviewPipeline(
+            config, CodeAnalyzer(config), CodeImprover(config), output_gen, recorder=recorder, **pipeline_options
+        )
+        output_gen.start_report()
+        discovery = FileDiscovery.from_config(input_path, config)
+        pipeline.run(discovery)
+        report_path = output_gen.generate_report(
+            discovery.dependencies, recorder, pipeline.coverage(), pipeline.project_index
+        )
+        return pipeline, report_path
+
+    return run
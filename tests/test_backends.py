@@ -0,0 +1,108 @@
+import ast
+import os
+
+import pytest
+
+from backends import JavaScriptBackend, PythonBackend
+from config import Config
+from conftest import write_files
+
+# Files whose names share prefixes, plus one that the stub linters find nothing in
+BATCHED = {
+    "python": {
+        "a.py": "x = eval('1')\n",
+        "a_b.py": '"""Docs."""\nunused = 1\nunused = 2\n',
+        "sub/a.py": '"""Docs."""\n' + "y = 1  # " + "x" * 100 + "\n",
+        "clean.py": '"""Docs."""\n',
+    },
+    "javascript": {
+        "a.js": "eval('1');\n",
+        "a.test.js": "let unusedValue = 1;\nlet unusedOther = 2;\n",
+        "sub/a.js": "const y = 1\n",
+        "clean.js": "const z = 1;\n",
+    },
+}
+EXPECTED = {
+    "python": {
+        "a.py": ["pylint:missing-module-docstring", "pylint:eval-used"],
+        "a_b.py": ["pylint:unused-variable", "pylint:unused-variable"],
+        "sub/a.py": ["pylint:line-too-long"],
+        "clean.py": [],
+    },
+    "javascript": {
+        "a.js": ["eslint:no-eval"],
+        "a.test.js": ["eslint:no-unused-vars", "eslint:no-unused-vars"],
+        "sub/a.js": ["eslint:semi"],
+        "clean.js": [],
+    },
+}
+
+
+@pytest.mark.parametrize("backend_class", [PythonBackend, JavaScriptBackend])
+def test_batched_results_are_split_per_file(backend_class, stub_tools, tmp_path, monkeypatch):
+    language = backend_class.language
+    root = write_files(tmp_path / "src", BATCHED[language])
+    # Pass the files through a symlink and run from elsewhere, so the reported paths differ from ours
+    os.symlink(root, tmp_path / "link")
+    monkeypatch.chdir(tmp_path)
+    paths = {name: os.path.join("link", name) for name in BATCHED[language]}
+    config = Config.from_dict({"priorities": {"security": 0, "performance": 0, "readability": 1}})
+    results = backend_class(config).analyze(list(paths.values()), {})
+
+    assert set(results) == set(paths.values())
+    for name, path in paths.items():
+        result = results[path]
+        sources = [issue["source"] for kind in ("bugs", "code_smells", "security_issues") for issue in result[kind]]
+        assert sorted(sources) == sorted(EXPECTED[language][name]), name
+
+
+def test_add_docstrings_before_a_decorated_closure():
+    code = (
+        "import functools\n"
+        "\n"
+        "def logged(fn):\n"
+        "    @functools.wraps(fn)\n"
+        "    def wrapper(*args, **kwargs):\n"
+        "        return fn(*args, **kwargs)\n"
+        "    return wrapper\n"
+    )
+    improved = PythonBackend._add_docstrings(code)
+    tree = ast.parse(improved)
+    outer = tree.body[1]
+    assert ast.get_docstring(outer) == "Function logged description"
+    assert ast.get_docstring(outer.body[1]) == "Function wrapper description"
+    assert outer.body[1].decorator_list
+
+
+def test_add_docstrings_before_a_decorated_class():
+    code = "def make():\n    @dataclass\n    class Point:\n        x: int\n    return Point\n"
+    improved = PythonBackend._add_docstrings(code)
+    assert ast.get_docstring(ast.parse(improved).body[0]) == "Function make description"
+
+
+def test_add_docstrings_on_a_one_line_def():
+    improved = PythonBackend._add_docstrings("def f(): return 1\n")
+    assert ast.get_docstring(ast.parse(improved).body[0]) == "Function f description"
+
+
+def test_add_docstrings_keeps_existing_docstrings():
+    code = 'def f():\n    """Already documented."""\n    return 1\n'
+    assert PythonBackend._add_docstrings(code) == code
+
+
+@pytest.mark.parametrize("separator", ["\f", "\x1c", "\x85", "\u2028"])
+def test_add_docstrings_counts_lines_the_way_python_does(separator):
+    # Form feeds separate sections in some older modules; the others can only appear in comments or strings
+    code = f"\f\ndef f():\n    # note{separator}more\n    return '{separator}'\n\ndef g():\n    return 2\n"
+    tree = ast.parse(PythonBackend._add_docstrings(code))
+    assert [ast.get_docstring(node) for node in tree.body] == ["Function f description", "Function g description"]
+
+
+def test_add_docstrings_keeps_carriage_return_line_endings():
+    improved = PythonBackend._add_docstrings("def f():\r\n    return 1\r\n")
+    assert improved == 'def f():\r\n    """Function f description"""\n    return 1\r\n'
+
+
+def test_add_docstrings_leaves_unparsable_code_alone():
+    code = "def f(:\n    return 1\n"
+    assert PythonBackend._add_docstrings(code) == code
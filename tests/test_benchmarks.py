@@ -0,0 +1,46 @@
+import os
+import sys
+import json
+
+import pytest
+
+from conftest import STUBS_DIR
+
+sys.path.insert(0, os.path.dirname(STUBS_DIR))
+import run_benchmarks  # noqa: E402
+
+
+def test_run_stage_counts_returned_files():
+    result, value = run_benchmarks.run_stage("discovery", 2, None, lambda: ["a.py", "b.py", "c.py", "d.py"])
+    assert result["files"] == 4
+    assert result["ms_per_file"] is not None
+    assert len(result["runs"]) == 2
+    assert value == ["a.py", "b.py", "c.py", "d.py"]
+
+
+def test_run_stage_fails_without_files():
+    with pytest.raises(Exception, match="processed no files"):
+        run_benchmarks.run_stage("discovery", 1, None, lambda: [])
+
+
+def test_missing_numbers():
+    stages = {
+        "discovery": {"files": 3, "wall_seconds": 0.1, "ms_per_file": None},
+        "output": {"files": 3, "wall_seconds": 0.2, "ms_per_file": 66.7},
+    }
+    assert run_benchmarks.missing_numbers(stages) == ["discovery"]
+
+
+def test_benchmark_reports_every_stage_per_file(stub_tools, tmp_path, monkeypatch):
+    output = tmp_path / "results.json"
+    monkeypatch.setattr(sys, "argv", [
+        "run_benchmarks.py", "--files", "6", "--noise-files", "2", "--repeat", "1", "--sample", "2",
+        "--jobs", "1", "--output", str(output),
+    ])
+    run_benchmarks.main()
+
+    with open(output) as f:
+        stages = json.load(f)["stages"]
+    assert set(stages) == {"discovery", "analyze_file", "analyze_batched", "improve_code", "output", "pipeline"}
+    assert stages["discovery"]["files"] == 6
+    assert run_benchmarks.missing_numbers(stages) == []
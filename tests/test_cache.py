@@ -0,0 +1,133 @@
+import os
+
+import pytest
+
+import cache as cache_module
+from conftest import write_files
+from cache import ResultCache
+from config import Config
+
+KEY = "ab" + "0" * 62
+OTHER_KEY = "cd" + "1" * 62
+
+
+@pytest.fixture
+def config():
+    return Config.from_dict({})
+
+
+def test_get_returns_what_put_stored(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    assert cache.get(KEY) is None
+    cache.put(KEY, {"analysis": {"bugs": []}, "improved_code": "x = 1\n"})
+    assert cache.get(KEY) == {"analysis": {"bugs": []}, "improved_code": "x = 1\n"}
+
+
+def test_opening_the_cache_does_not_scan_it(tmp_path, monkeypatch):
+    ResultCache(str(tmp_path)).put(KEY, {"improved_code": "x"})
+
+    def no_scan(self):
+        raise AssertionError("scanned the cache directory")
+
+    monkeypatch.setattr(ResultCache, "_entries", no_scan)
+    cache = ResultCache(str(tmp_path))
+    assert cache.get(KEY) == {"improved_code": "x"}
+    # The size comes from the stored total
+    cache.put(OTHER_KEY, {"improved_code": "y"})
+    assert cache.size > 0
+
+
+def test_size_is_computed_once_for_a_directory_without_a_total(tmp_path):
+    ResultCache(str(tmp_path)).put(KEY, {"improved_code": "x" * 100})
+    os.remove(os.path.join(str(tmp_path), cache_module.SIZE_FILE))
+    cache = ResultCache(str(tmp_path))
+    assert cache.size == os.path.getsize(cache._path(KEY))
+
+
+def test_overwriting_an_entry_does_not_grow_the_size(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    cache.put(KEY, {"improved_code": "x" * 1000})
+    cache.put(KEY, {"improved_code": "x" * 10})
+    assert cache.size == os.path.getsize(cache._path(KEY))
+    assert ResultCache(str(tmp_path)).size == cache.size
+
+
+def test_eviction_removes_least_recently_used_entries(tmp_path):
+    # Room for three entries of about 1 KB
+    cache = ResultCache(str(tmp_path), max_bytes=3500)
+    keys = [f"{i:02x}" + "0" * 62 for i in range(3)]
+    for age, key in enumerate(keys):
+        cache.put(key, {"improved_code": "x" * 1000})
+        os.utime(cache._path(key), (age, age))
+    cache.get(keys[0])  # refreshes the oldest entry
+    cache.put("ff" + "0" * 62, {"improved_code": "x" * 1000})
+
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[1]) is None
+    assert cache.size <= 3500
+    assert cache.size == sum(size for _, size, _ in cache._entries())
+
+
+def test_eviction_leaves_issue_history_alone(tmp_path):
+    history = tmp_path / "history"
+    history.mkdir()
+    (history / "project.json").write_text("{}" * 1000)
+    cache = ResultCache(str(tmp_path), max_bytes=500)
+    cache.put(KEY, {"improved_code": "x" * 1000})
+    assert (history / "project.json").exists()
+
+
+def test_key_changes_with_content_name_and_config(tmp_path, config):
+    cache = ResultCache(str(tmp_path))
+    key = cache.key("hash", "a.py", "python", config)
+    assert cache.key("hash", "a.py", "python", config) == key
+    assert cache.key("other", "a.py", "python", config) != key
+    assert cache.key("hash", "b.py", "python", config) != key
+    strict = Config.from_dict({"aggressiveness": "high"})
+    assert cache.key("hash", "a.py", "python", strict) != key
+    no_security = Config.from_dict({"priorities": {"security": 0, "performance": 1, "readability": 1}})
+    assert cache.key("hash", "a.py", "python", no_security) != key
+
+
+def test_key_for_file_hashes_content_not_location(tmp_path, config):
+    cache = ResultCache(str(tmp_path / "cache"))
+    first = tmp_path / "one" / "a.py"
+    second = tmp_path / "two" / "a.py"
+    for path in (first, second):
+        path.parent.mkdir()
+        path.write_text("x = 1\n")
+    assert cache.key_for_file(str(first), "python", config) == cache.key_for_file(str(second), "python", config)
+    assert cache.key_for_file(str(first), "python", config, "x = 2\n") != cache.key_for_file(str(first), "python", config)
+
+
+def test_disabled_in_config():
+    assert ResultCache.from_config(Config.from_dict({"cache": {"enabled": False}})) is None
+
+
+def test_project_linter_configs_are_part_of_the_key(tmp_path, config):
+    root = write_files(tmp_path / "src", {
+        ".eslintrc.json": '{"rules": {"semi": "error"}}', "web/app.js": "x();\n", "web/sub/app.js": "x();\n",
+        "app.py": "x = 1\n", "README.md": "",
+    })
+    js_path, nested_path, py_path = (os.path.join(root, name) for name in ("web/app.js", "web/sub/app.js", "app.py"))
+
+    def keys():
+        cache = ResultCache(str(tmp_path / "cache"), root=root)
+        return [cache.key_for_file(path, lang, config) for path, lang in
+                ((js_path, "javascript"), (nested_path, "javascript"), (py_path, "python"))]
+
+    first = keys()
+    assert keys() == first
+    # Same content, same configs up the tree: same key wherever the file sits
+    assert first[0] == first[1]
+    write_files(root, {".eslintrc.json": '{"rules": {"semi": "off"}}', "README.md": "changed"})
+    second = keys()
+    assert second[0] != first[0] and second[2] == first[2]
+    # A config nearer the file only changes the keys below it
+    write_files(root, {"web/sub/.eslintrc.json": "{}"})
+    third = keys()
+    assert third[0] == second[0] and third[1] != second[1]
+    write_files(root, {"pyproject.toml": "[tool.pylint]\n"})
+    assert keys()[2] != first[2]
+    # Without a root the key depends on content and settings only
+    assert ResultCache(str(tmp_path / "cache")).key_for_file(js_path, "javascript", config) != second[0]
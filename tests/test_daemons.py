@@ -0,0 +1,57 @@
+import sys
+import time
+
+import pytest
+
+import daemons
+from backends import JavaScriptBackend
+from config import Config
+from daemons import DaemonGroup, DaemonPool, DaemonTimeout, ToolDaemon
+
+# Speaks the framed protocol: commands named on its command line never get an answer, the rest are echoed
+FAKE_WORKER = """
+import sys, time
+while True:
+    header = sys.stdin.buffer.readline()
+    if not header:
+        break
+    command, _, length = header.decode().rstrip("\\n").partition("\\t")
+    body = sys.stdin.buffer.read(int(length))
+    if command in sys.argv[1:]:
+        time.sleep(3600)
+    sys.stdout.buffer.write(b"OK %d\\n" % len(body) + body)
+    sys.stdout.buffer.flush()
+"""
+
+
+@pytest.fixture
+def fake_worker(tmp_path):
+    path = tmp_path / "worker.py"
+    path.write_text(FAKE_WORKER)
+    return [sys.executable, str(path)]
+
+
+def test_hung_daemon_is_killed_and_restarted(fake_worker):
+    daemon = ToolDaemon("fake", [*fake_worker, "hang"], timeout=0.5)
+    assert daemon.request("echo", "hello") == "hello"
+    hung = daemon.process
+    started = time.monotonic()
+    with pytest.raises(DaemonTimeout):
+        daemon.request("hang", "")
+    assert time.monotonic() - started < 10
+    assert hung.poll() is not None
+    assert daemon.request("echo", "again") == "again"
+    assert daemon.process is not hung
+    daemon.stop()
+
+
+def test_prettier_falls_back_to_the_command_line_on_timeout(fake_worker, monkeypatch, stub_tools):
+    pool = DaemonPool({"instances": 1})
+    pool.groups["node"] = DaemonGroup("node", [*fake_worker, "prettier"], timeout=0.5)
+    monkeypatch.setattr(daemons, "_pool", pool)
+    config = Config.from_dict({"daemons": {"enabled": True}})
+    try:
+        # The stub prettier echoes its input
+        assert JavaScriptBackend(config)._run_prettier("let a = 1;\n", "a.js") == "let a = 1;\n"
+    finally:
+        pool.stop()
@@ -0,0 +1,69 @@
+import difflib
+
+from diffs import FileDiff, MAX_MATCHED_LINES
+
+
+def difflib_counts(before, after):
+    matcher = difflib.SequenceMatcher(None, before.splitlines(), after.splitlines(), autojunk=False)
+    added = removed = 0
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag != "equal":
+            removed += i2 - i1
+            added += j2 - j1
+    return added, removed
+
+
+def numbered_lines(count):
+    return [f"value_{i} = compute({i})" for i in range(count)]
+
+
+def test_small_diff_matches_difflib():
+    before = "a\nb\nc\nd\n"
+    after = "a\nB\nc\nd\ne\n"
+    diff = FileDiff(before, after)
+    expected = difflib.unified_diff(before.splitlines(), after.splitlines(), "original", "improved", lineterm="")
+    assert list(diff.lines()) == list(expected)
+    assert (diff.added, diff.removed) == (2, 1)
+
+
+def test_identical_files_have_no_diff():
+    diff = FileDiff("same\n", "same\n")
+    assert diff.identical
+    assert diff.changed == 0
+    assert list(diff.lines()) == []
+
+
+def test_large_file_with_header_counts_like_difflib():
+    # The improver always prepends a header, so the common prefix is empty
+    lines = numbered_lines(MAX_MATCHED_LINES * 3)
+    middle = len(lines) // 2
+    before = "\n".join(lines)
+    after = "\n".join(["# TODO: header", *lines[:middle], "changed = 1", *lines[middle + 1:]])
+    diff = FileDiff(before, after)
+    assert (diff.added, diff.removed) == difflib_counts(before, after) == (2, 1)
+    assert diff.preview(4) == ["--- original", "+++ improved", "@@ -1,3 +1,4 @@", "+# TODO: header"]
+    assert len(diff.groups) == 2
+
+
+def test_large_file_with_scattered_edits_counts_like_difflib():
+    lines = numbered_lines(MAX_MATCHED_LINES * 3)
+    edited = ["# TODO: header"] + [line for i, line in enumerate(lines) if i % 500 != 7] + ["tail = 1"]
+    before = "\n".join(lines)
+    after = "\n".join(edited)
+    diff = FileDiff(before, after)
+    assert (diff.added, diff.removed) == difflib_counts(before, after)
+
+
+def test_reindented_file_is_whitespace_only():
+    lines = numbered_lines(MAX_MATCHED_LINES * 2)
+    diff = FileDiff("\n".join(lines), "\n".join("    " + line for line in lines))
+    assert diff.whitespace_only
+    assert (diff.added, diff.removed) == (len(lines), len(lines))
+
+
+def test_reindented_large_file_with_header_pairs_lines():
+    lines = numbered_lines(MAX_MATCHED_LINES * 2)
+    diff = FileDiff("\n".join(lines), "\n".join(["# TODO: header", *("  " + line for line in lines)]))
+    assert not diff.whitespace_only
+    assert (diff.added, diff.removed) == (len(lines) + 1, len(lines))
+    assert diff.preview(4)[3] == "+# TODO: header"
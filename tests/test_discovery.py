@@ -0,0 +1,114 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from config import Config
+from conftest import write_files
+from discovery import FileDiscovery, IgnoreRules
+
+GITIGNORED_TREE = {
+    ".gitignore": "# generated\n*.gen.py\n!keep.gen.py\n/build/\nlogs/\ndocs/*.py\n**/cache/\n",
+    "a.py": "",
+    "x.gen.py": "",
+    "keep.gen.py": "",
+    "build/b.py": "",
+    "logs/c.py": "",
+    "docs/d.py": "",
+    "docs/guide/e.py": "",
+    "sub/.gitignore": "local.py\n!x.gen.py\n/only_here.py\n",
+    "sub/x.gen.py": "",
+    "sub/local.py": "",
+    "sub/only_here.py": "",
+    "sub/build/f.py": "",
+    "sub/logs/g.py": "",
+    "sub/deeper/only_here.py": "",
+    "sub/deeper/cache/h.py": "",
+    "sub/other/docs/i.py": "",
+}
+# What git itself makes of GITIGNORED_TREE
+NOT_IGNORED = [
+    "a.py", "docs/guide/e.py", "keep.gen.py", "sub/build/f.py", "sub/deeper/only_here.py",
+    "sub/other/docs/i.py", "sub/x.gen.py",
+]
+
+
+def discovered(root, **options):
+    discovery = FileDiscovery(root, **options)
+    return [os.path.relpath(path, root).replace(os.sep, "/") for path, _ in discovery], discovery
+
+
+def test_root_is_required():
+    with pytest.raises(ValueError):
+        FileDiscovery(None)
+
+
+def test_vendored_directories_are_pruned(tmp_path):
+    root = write_files(tmp_path, {
+        "app.py": "", "requirements.txt": "", "web/main.js": "", "web/package.json": "",
+        "node_modules/dep/index.js": "", "node_modules/dep/package.json": "",
+        ".git/hooks/x.py": "", "venv/lib/y.py": "", "pkg/__pycache__/z.py": "", "target/T.java": "",
+        "README.md": "",
+    })
+    files, discovery = discovered(root)
+    assert files == ["app.py", "web/main.js"]
+    assert sorted(os.path.relpath(path, root) for path in discovery.dependencies) == [
+        "requirements.txt", os.path.join("web", "package.json")
+    ]
+
+
+def test_nested_gitignore_with_negation_and_anchors(tmp_path):
+    root = write_files(tmp_path, GITIGNORED_TREE)
+    files, _ = discovered(root)
+    assert sorted(files) == NOT_IGNORED
+    # Depth-first, each directory's files before its subdirectories
+    assert files[:3] == ["a.py", "keep.gen.py", "docs/guide/e.py"]
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="needs the git command")
+def test_gitignore_matches_git(tmp_path):
+    root = write_files(tmp_path, GITIGNORED_TREE)
+    subprocess.run(["git", "init", "-q"], cwd=root, check=True)
+    output = subprocess.run(
+        ["git", "ls-files", "--others", "--exclude-standard"], cwd=root, check=True, capture_output=True, text=True
+    ).stdout
+    assert sorted(path for path in output.splitlines() if path.endswith(".py")) == NOT_IGNORED
+
+
+def test_gitignore_can_be_turned_off(tmp_path):
+    root = write_files(tmp_path, GITIGNORED_TREE)
+    files, _ = discovered(root, use_gitignore=False)
+    assert len(files) == len([path for path in GITIGNORED_TREE if path.endswith(".py")])
+
+
+def test_excludes_use_gitignore_syntax_and_win(tmp_path):
+    root = write_files(tmp_path, GITIGNORED_TREE)
+    files, _ = discovered(root, exclude=["keep.gen.py", "sub/", "", "  "])
+    assert files == ["a.py", "docs/guide/e.py"]
+    files, _ = discovered(root, exclude=["/*.py", "!a.py"])
+    assert sorted(files) == ["a.py", *NOT_IGNORED[1:2], *NOT_IGNORED[3:]]
+
+
+def test_large_files_are_skipped(tmp_path):
+    root = write_files(tmp_path, {"small.py": "x = 1\n", "big.py": "x = 1\n" * 100})
+    config = Config.from_dict({"discovery": {"max_file_size_mb": 200 / (1024 * 1024)}})
+    discovery = FileDiscovery.from_config(root, config)
+    assert [os.path.basename(path) for path, _ in discovery] == ["small.py"]
+    assert discovery.skipped == 1
+
+
+def test_select_applies_pruning_and_excludes(tmp_path):
+    root = write_files(tmp_path, {"a.py": "", "b.js": "", "node_modules/c.js": "", "notes.txt": "", "pom.xml": ""})
+    discovery = FileDiscovery(root, exclude=["*.js"])
+    paths = [os.path.join(root, name) for name in ("a.py", "b.js", "node_modules/c.js", "notes.txt", "pom.xml")]
+    assert list(discovery.select(paths)) == [(paths[0], "python")]
+    assert discovery.dependencies == [paths[4]]
+
+
+def test_ignore_rules_patterns():
+    rules = IgnoreRules(["*.py[co]", "a?c", "**/gen/**", "\\!bang", "trailing\\ "])
+    assert rules.excludes("pkg/mod.pyc") and not rules.excludes("pkg/mod.py")
+    assert rules.excludes("abc") and not rules.excludes("a/c")
+    assert rules.excludes("x/gen/y/z.py")
+    assert rules.excludes("!bang") and rules.excludes("trailing ")
@@ -0,0 +1,110 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from config import Config
+from conftest import write_files
+from discovery import FileDiscovery
+from git_changes import _parse_hunks, collect_changes
+
+git = pytest.importorskip("git")
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="needs the git command")
+
+MODULE = "".join(f"def f{i}():\n    return {i}\n\n" for i in range(10))
+
+
+def run_git(cwd, *args):
+    subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True)
+
+
+@pytest.fixture
+def repo(tmp_path):
+    """main has three files; the feature branch edits, adds and deletes, with more left uncommitted."""
+    root = str(tmp_path / "repo")
+    os.makedirs(root)
+    run_git(root, "init", "-q", "-b", "main")
+    run_git(root, "config", "user.email", "test@example.com")
+    run_git(root, "config", "user.name", "Test")
+    write_files(root, {"pkg/edited.py": MODULE, "pkg/same.py": MODULE, "pkg/gone.py": MODULE, "other/x.py": MODULE})
+    run_git(root, "add", "-A")
+    run_git(root, "commit", "-q", "-m", "base")
+    run_git(root, "checkout", "-q", "-b", "feature")
+    write_files(root, {"pkg/edited.py": MODULE.replace("return 3", "return 33"), "pkg/added.js": "let a = 1;\n"})
+    os.remove(os.path.join(root, "pkg/gone.py"))
+    run_git(root, "add", "-A")
+    run_git(root, "commit", "-q", "-m", "feature")
+    # Not committed: an unstaged edit and an untracked file
+    write_files(root, {"pkg/same.py": MODULE.replace("return 8", "return 88"), "pkg/new.py": "x = 1\n"})
+    return root
+
+
+def names(changes, root):
+    return sorted(os.path.relpath(path, os.path.realpath(root)) for path in changes.files)
+
+
+def test_changes_since_a_branch_include_uncommitted_work(repo):
+    changes = collect_changes(repo, "main", with_lines=True)
+    assert names(changes, repo) == ["pkg/added.js", "pkg/edited.py", "pkg/new.py", "pkg/same.py"]
+    real = os.path.realpath(repo)
+    assert changes.files[os.path.join(real, "pkg/edited.py")] == [(11, 11)]
+    assert changes.files[os.path.join(real, "pkg/same.py")] == [(26, 26)]
+    # Whole-file changes have no ranges
+    assert changes.files[os.path.join(real, "pkg/added.js")] is None
+
+
+def test_changes_since_head_are_only_uncommitted(repo):
+    assert names(collect_changes(repo), repo) == ["pkg/new.py", "pkg/same.py"]
+
+
+def test_changes_are_limited_to_the_reviewed_directory(repo):
+    write_files(repo, {"other/x.py": MODULE + "y = 2\n"})
+    assert names(collect_changes(os.path.join(repo, "other"), "main"), repo) == ["other/x.py"]
+
+
+def test_restrict_keeps_issues_on_changed_lines(repo):
+    changes = collect_changes(repo, "main", with_lines=True)
+    edited = os.path.join(repo, "pkg/edited.py")
+    results = {"bugs": [{"line": 11, "message": "kept"}, {"line": 2, "message": "dropped"}, {"message": "no line"}]}
+    assert [issue["message"] for issue in changes.restrict(edited, results)["bugs"]] == ["kept", "no line"]
+    added = os.path.join(repo, "pkg/added.js")
+    assert changes.restrict(added, results) == results
+
+
+def test_discovery_selects_reviewable_changed_files(repo):
+    write_files(repo, {"pkg/notes.txt": "not code\n"})
+    changes = collect_changes(repo, "main")
+    selected = FileDiscovery.from_config(repo, Config.from_dict({})).select(sorted(changes.files))
+    assert [(os.path.basename(path), lang) for path, lang in selected] == [
+        ("added.js", "javascript"), ("edited.py", "python"), ("new.py", "python"), ("same.py", "python")
+    ]
+
+
+def test_parse_hunks():
+    output = (
+        "diff --git a/a.py b/a.py\n--- a/a.py\n+++ b/a.py\n"
+        "@@ -3 +3,2 @@\n-x\n+y\n+z\n@@ -9,2 +10,0 @@\n-gone\n-gone\n"
+        "--- a/b.py\n+++ /dev/null\n"
+    )
+    assert _parse_hunks(output) == {"a.py": [(3, 4)]}
+
+
+def test_parse_hunks_with_quoted_and_spaced_names():
+    output = (
+        '--- "a/caf\\303\\251.py"\n+++ "b/caf\\303\\251.py"\n@@ -2 +2 @@\n-x\n+y\n'
+        "--- a/my mod.py\t\n+++ b/my mod.py\t\n@@ -5 +5 @@\n-x\n+y\n"
+        '--- "a/say \\"hi\\".py"\n+++ "b/say \\"hi\\".py"\n@@ -1 +1 @@\n-x\n+y\n'
+    )
+    assert _parse_hunks(output) == {"café.py": [(2, 2)], "my mod.py": [(5, 5)], 'say "hi".py': [(1, 1)]}
+
+
+def test_changed_lines_of_files_with_unusual_names(repo):
+    write_files(repo, {"pkg/café.py": MODULE, "pkg/my mod.py": MODULE})
+    run_git(repo, "add", "-A")
+    run_git(repo, "commit", "-q", "-m", "names")
+    write_files(repo, {"pkg/café.py": MODULE.replace("return 1", "return 11"), "pkg/my mod.py": MODULE.replace("return 2", "return 22")})
+    changes = collect_changes(repo, with_lines=True)
+    real = os.path.realpath(repo)
+    assert changes.files[os.path.join(real, "pkg/café.py")] == [(5, 5)]
+    assert changes.files[os.path.join(real, "pkg/my mod.py")] == [(8, 8)]
@@ -0,0 +1,116 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from git_source import RemoteCheckout, sparse_patterns
+
+git = pytest.importorskip("git")
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="needs the git command")
+
+
+def run_git(cwd, *args):
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+
+def write(root, path, content):
+    path = os.path.join(root, path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+
+
+@pytest.fixture
+def origin(tmp_path):
+    """A local repository with two commits, served over file:// so fetches use the real protocol."""
+    root = str(tmp_path / "origin")
+    os.makedirs(root)
+    run_git(root, "init", "-q", "-b", "main")
+    run_git(root, "config", "user.email", "test@example.com")
+    run_git(root, "config", "user.name", "Test")
+    # Needed for --filter=blob:none over file://
+    run_git(root, "config", "uploadpack.allowFilter", "true")
+    write(root, "app/main.py", "print('one')\n")
+    run_git(root, "add", "-A")
+    run_git(root, "commit", "-q", "-m", "first")
+    write(root, "app/main.py", "print('two')\n")
+    write(root, "web/app.js", "console.log(1);\n")
+    write(root, ".eslintrc.json", "{}\n")
+    write(root, "pyproject.toml", "[tool.pylint]\n")
+    write(root, "config/checkstyle.xml", "<module/>\n")
+    write(root, "docs/manual.txt", "not reviewed\n")
+    write(root, "node_modules/dep/index.js", "module.exports = 1;\n")
+    run_git(root, "add", "-A")
+    run_git(root, "commit", "-q", "-m", "second")
+    return root
+
+
+def checkout(origin, tmp_path, **settings):
+    settings = {"mirror_dir": str(tmp_path / "mirrors"), **settings}
+    remote = RemoteCheckout("file://" + origin, settings, parent_dir=str(tmp_path))
+    return remote, remote.checkout()
+
+
+def test_sparse_patterns_include_linter_configs():
+    patterns = sparse_patterns()
+    for name in ("*.py", ".eslintrc.json", ".pylintrc", "pyproject.toml", "setup.cfg", "checkstyle*.xml"):
+        assert name in patterns
+    assert "!**/node_modules/**" in patterns
+
+
+@pytest.mark.parametrize("mirror", [True, False])
+def test_shallow_sparse_checkout(origin, tmp_path, mirror):
+    remote, path = checkout(origin, tmp_path, mirror=mirror)
+    try:
+        assert remote.commit == run_git(origin, "rev-parse", "HEAD")
+        # Shallow: only the latest commit is fetched
+        assert run_git(path, "rev-list", "--count", "HEAD") == "1"
+        with open(os.path.join(path, "app", "main.py")) as f:
+            assert f.read() == "print('two')\n"
+        for name in ("web/app.js", ".eslintrc.json", "pyproject.toml", "config/checkstyle.xml"):
+            assert os.path.isfile(os.path.join(path, name)), name
+        # Sparse: neither files discovery ignores nor vendored directories are checked out
+        assert not os.path.exists(os.path.join(path, "docs", "manual.txt"))
+        assert not os.path.exists(os.path.join(path, "node_modules"))
+        # Partial clone: contents of files outside the sparse checkout are never downloaded
+        manual = run_git(origin, "rev-parse", "HEAD:docs/manual.txt")
+        missing = run_git(remote.mirror if mirror else path, "rev-list", "--objects", "--all", "--missing=print")
+        assert "?" + manual in missing.split()
+    finally:
+        remote.cleanup()
+    assert not os.path.exists(remote.temp_dir)
+
+
+def test_mirror_is_reused_and_fetches_new_commits(origin, tmp_path):
+    first, _ = checkout(origin, tmp_path)
+    first.cleanup()
+    write(origin, "app/main.py", "print('three')\n")
+    run_git(origin, "commit", "-q", "-am", "third")
+
+    second, path = checkout(origin, tmp_path)
+    try:
+        assert second.mirror == first.mirror
+        mirrors = [name for name in os.listdir(str(tmp_path / "mirrors")) if name.endswith(".git")]
+        assert mirrors == [os.path.basename(first.mirror)]
+        assert second.commit == run_git(origin, "rev-parse", "HEAD")
+        with open(os.path.join(path, "app", "main.py")) as f:
+            assert f.read() == "print('three')\n"
+    finally:
+        second.cleanup()
+    # The removed checkouts are pruned from the mirror's worktree list
+    assert run_git(second.mirror, "worktree", "list").count("\n") == 0
+
+
+def test_checkout_of_a_branch(origin, tmp_path):
+    run_git(origin, "checkout", "-q", "-b", "feature")
+    write(origin, "app/feature.py", "FEATURE = True\n")
+    run_git(origin, "add", "-A")
+    run_git(origin, "commit", "-q", "-m", "feature")
+    run_git(origin, "checkout", "-q", "main")
+
+    remote, path = checkout(origin, tmp_path, branch="feature")
+    try:
+        assert os.path.isfile(os.path.join(path, "app", "feature.py"))
+    finally:
+        remote.cleanup()
@@ -0,0 +1,85 @@
+import io
+import os
+import zipfile
+from types import SimpleNamespace
+
+import pytest
+
+from ingest import ArchiveRejected, IngestLimits, _copy_limited, _read_limited, ingest_zip
+from workspace import DiskQuotaExceeded, Workspace
+
+
+def make_zip(members, compression=zipfile.ZIP_DEFLATED):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression) as archive:
+        for name, content in members.items():
+            archive.writestr(name, content)
+    buffer.seek(0)
+    return buffer
+
+
+def extracted(dest):
+    return sorted(
+        os.path.relpath(os.path.join(root, name), dest).replace(os.sep, "/")
+        for root, _, files in os.walk(dest) for name in files
+    )
+
+
+def test_only_reviewable_members_are_extracted(tmp_path):
+    archive = make_zip({
+        "proj/app.py": "print('hi')\n",
+        "proj/web/big.js": "x".join("a" * 10 for _ in range(20)),
+        "proj/requirements.txt": "flask\n",
+        "proj/README.md": "docs\n",
+        "proj/node_modules/dep/index.js": "module.exports = 1;\n",
+        "proj/build/skip.py": "x = 1\n",
+        "../escape.py": "x = 1\n",
+    })
+    dest = str(tmp_path / "out")
+    limits = IngestLimits(max_file_bytes=100, in_memory_file_bytes=50)
+    result = ingest_zip(archive, dest, exclude=["build/"], limits=limits)
+
+    assert extracted(dest) == ["proj/app.py", "proj/requirements.txt"]
+    assert result.code_files == [(os.path.join(dest, "proj", "app.py"), "python")]
+    assert result.dependencies == [os.path.join(dest, "proj", "requirements.txt")]
+    # big.js is over the per-file limit, so it is skipped rather than rejected
+    assert result.skipped == 1
+    # Small sources are kept for the pipeline; manifests never are
+    assert result.sources == {os.path.join(dest, "proj", "app.py"): "print('hi')\n"}
+
+
+def test_too_many_entries_are_rejected(tmp_path):
+    archive = make_zip({f"f{i}.txt": "" for i in range(6)})
+    with pytest.raises(ArchiveRejected):
+        ingest_zip(archive, str(tmp_path), limits=IngestLimits(max_entries=5))
+
+
+def test_expanded_size_limit_is_checked_before_writing(tmp_path):
+    archive = make_zip({f"src/m{i}.py": f"value = {i}\n" * 10 for i in range(5)})
+    dest = str(tmp_path / "out")
+    with pytest.raises(ArchiveRejected):
+        ingest_zip(archive, dest, limits=IngestLimits(max_total_bytes=300))
+    assert not os.path.exists(dest) or extracted(dest) == []
+
+
+def test_highly_compressed_member_is_rejected(tmp_path):
+    archive = make_zip({"bomb.py": "\n" * 1024 * 1024})
+    with pytest.raises(ArchiveRejected):
+        ingest_zip(archive, str(tmp_path), limits=IngestLimits(max_ratio=100))
+
+
+def test_reserve_sees_the_total_before_anything_is_written(tmp_path):
+    archive = make_zip({"a.py": "a = 1\n" * 100, "b.py": "b = 2\n" * 100})
+    workspace = Workspace(str(tmp_path), quota_bytes=1000)
+    with pytest.raises(DiskQuotaExceeded):
+        ingest_zip(archive, workspace.subdir("extracted"), reserve=workspace.reserve)
+    assert workspace.usage() == 0
+
+
+def test_members_larger_than_their_header_are_rejected():
+    info = SimpleNamespace(filename="lies.py", file_size=4)
+    with pytest.raises(ArchiveRejected):
+        _read_limited(io.BytesIO(b"12345"), info)
+    with pytest.raises(ArchiveRejected):
+        _copy_limited(io.BytesIO(b"12345"), io.BytesIO(), info)
+    assert _read_limited(io.BytesIO(b"1234"), info) == b"1234"
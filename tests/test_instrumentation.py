@@ -0,0 +1,74 @@
+import sys
+
+from instrumentation import Recorder, activate, prometheus_text, run_tool
+
+BUSY_LOOP = "import time\nend = time.process_time() + 0.05\nwhile time.process_time() < end: pass\n"
+
+
+def test_stage_counts_tool_subprocesses_and_their_cpu():
+    recorder = Recorder()
+    with activate(recorder), recorder.stage("analyze", ["a.py", "b.py"]):
+        result = run_tool("busy", [sys.executable, "-c", BUSY_LOOP], capture_output=True, text=True)
+    assert result.returncode == 0
+
+    stats = recorder.snapshot()["stages"]["analyze"]
+    assert stats["files"] == 2
+    assert stats["subprocesses"] == 1
+    assert stats["cpu_seconds"] >= 0.05
+    assert recorder.snapshot()["tools"]["busy"]["cpu_seconds"] >= 0.05
+
+
+def test_batched_stage_is_split_between_its_files():
+    recorder = Recorder()
+    recorder.record_stage("analyze", 1.0, 0.5, ["a.py", "b.py"], subprocesses=1)
+    recorder.record_stage("improve", 0.25, 0.25, ["a.py"])
+
+    rows = {path: (stages, totals) for path, stages, totals in recorder.file_timings()}
+    stages, totals = rows["a.py"]
+    assert stages["analyze"] == {"wall_seconds": 0.5, "cpu_seconds": 0.25, "subprocesses": 1}
+    assert totals == {"wall_seconds": 0.75, "cpu_seconds": 0.5, "subprocesses": 1}
+    assert recorder.file_timings()[0][0] == "a.py"
+
+
+def test_run_tool_passes_input_and_captures_output():
+    recorder = Recorder()
+    with activate(recorder):
+        result = run_tool("cat", [sys.executable, "-c", "import sys; print(sys.stdin.read().upper())"],
+                          input="hello", capture_output=True, text=True)
+    assert result.stdout.strip() == "HELLO"
+    assert recorder.snapshot()["tools"]["cat"]["count"] == 1
+
+
+def test_timed_records_discovery_as_items_are_pulled():
+    recorder = Recorder()
+    files = [("a.py", "python"), ("b.js", "javascript")]
+    assert list(recorder.timed("discovery", iter(files))) == files
+
+    stats = recorder.snapshot()["stages"]["discovery"]
+    assert (stats["count"], stats["files"]) == (1, 2)
+    assert set(recorder.snapshot()["files"]) == {"a.py", "b.js"}
+
+
+def test_timed_records_a_partly_consumed_iterator_when_closed():
+    recorder = Recorder()
+    timed = recorder.timed("discovery", iter([("a.py", "python"), ("b.py", "python")]))
+    next(timed)
+    timed.close()
+    assert recorder.snapshot()["stages"]["discovery"]["files"] == 1
+
+
+def test_merge_adds_worker_file_stats():
+    worker = Recorder()
+    worker.record_stage("improve", 0.5, 0.5, ["a.py"], subprocesses=2)
+    parent = Recorder()
+    parent.record_stage("improve", 0.5, 0.25, ["a.py"])
+    parent.merge(worker.snapshot())
+
+    assert parent.snapshot()["files"]["a.py"]["improve"] == {"wall_seconds": 1.0, "cpu_seconds": 0.75, "subprocesses": 2}
+    assert parent.snapshot()["stages"]["improve"]["subprocesses"] == 2
+
+
+def test_prometheus_text_has_stage_subprocesses():
+    recorder = Recorder()
+    recorder.record_stage("analyze", 1.0, 0.5, ["a.py"], subprocesses=3)
+    assert 'code_review_stage_subprocesses_total{stage="analyze"} 3' in prometheus_text(recorder)
@@ -0,0 +1,128 @@
+import os
+import threading
+
+import pytest
+
+from conftest import write_files
+from jobs import JobManager, JobQueueFull
+from pipeline import PipelineCancelled
+
+
+def wait(job, timeout=60):
+    # The future completes after the job's cleanup, unlike its status
+    if not job.future.cancelled():
+        job.future.result(timeout)
+    return job
+
+
+class Gate:
+    """Work that blocks until released, so jobs can be held in the running state."""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, job):
+        self.started.set()
+        while not self.release.wait(0.01):
+            if job.cancel_event.is_set():
+                raise PipelineCancelled("cancelled")
+        return "report.md"
+
+
+@pytest.fixture
+def manager():
+    manager = JobManager(max_concurrent=1, max_queued=1, retention_seconds=3600)
+    yield manager
+    manager.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def test_queue_is_bounded(manager):
+    gate = Gate()
+    running = manager.submit(gate)
+    gate.started.wait(5)
+    queued = manager.submit(gate)
+    with pytest.raises(JobQueueFull):
+        manager.submit(gate)
+    gate.release.set()
+    assert wait(running).status == "succeeded" and wait(queued).status == "succeeded"
+    # Finished jobs don't count against the queue
+    wait(manager.submit(gate))
+
+
+def test_cancelling_queued_and_running_jobs_cleans_up(manager):
+    gate = Gate()
+    cleaned = []
+    running = manager.submit(gate, cleanup=lambda: cleaned.append("running"))
+    gate.started.wait(5)
+    queued = manager.submit(gate, cleanup=lambda: cleaned.append("queued"))
+
+    assert manager.cancel(queued.id).status == "cancelled"
+    manager.cancel(running.id)
+    assert wait(running).status == "cancelled"
+    assert sorted(cleaned) == ["queued", "running"]
+    assert manager.cancel("unknown") is None
+
+
+def test_failed_job_records_the_error_and_cleans_up(manager):
+    cleaned = []
+
+    def work(job):
+        raise ValueError("broken input")
+
+    job = wait(manager.submit(work, cleanup=lambda: cleaned.append(True)))
+    assert (job.status, job.error, cleaned) == ("failed", "broken input", [True])
+
+
+def test_finished_jobs_keep_their_files_until_pruned(manager):
+    cleaned = []
+    job = wait(manager.submit(lambda job: "report.md", cleanup=lambda: cleaned.append(job.id)))
+    assert job.status == "succeeded" and cleaned == []
+    job.finished -= manager.retention_seconds + 1
+    wait(manager.submit(lambda job: "report.md"))
+    assert cleaned == [job.id] and manager.get(job.id) is None
+
+
+@pytest.fixture
+def api(monkeypatch, tmp_path, stub_tools):
+    import app as app_module
+
+    monkeypatch.setattr(app_module, "UPLOAD_FOLDER", str(tmp_path / "uploads"))
+    jobs = JobManager(max_concurrent=1, max_queued=1)
+    monkeypatch.setattr(app_module, "job_manager", jobs)
+    client = app_module.app.test_client()
+
+    def post(input_path, quota_bytes=None):
+        monkeypatch.setattr(app_module, "WORKSPACE_QUOTA_BYTES", quota_bytes)
+        config = {"cache": {"enabled": False}, "jobs": 1}
+        return client.post("/api/jobs", json={"input_path": input_path, "config": config})
+
+    post.jobs = jobs
+    post.client = client
+    yield post
+    jobs.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def test_job_over_the_quota_fails_and_removes_its_workspace(api, tmp_path):
+    root = write_files(tmp_path / "src", {"pkg/app.py": "def run():\n    return 1\n" * 50})
+    response = api(root, quota_bytes=512)
+    assert response.status_code == 202
+    job = wait(api.jobs.get(response.get_json()["id"]))
+    assert job.status == "failed" and "quota" in job.error
+    assert api.client.get(f"/api/jobs/{job.id}").get_json()["status"] == "failed"
+    assert os.listdir(tmp_path / "uploads") == []
+
+
+def test_full_queue_returns_429_and_removes_the_workspace(api, tmp_path):
+    root = write_files(tmp_path / "src", {"app.py": "x = 1\n"})
+    gate = Gate()
+    api.jobs.submit(gate)
+    gate.started.wait(5)
+    api.jobs.submit(gate)
+    try:
+        response = api(root)
+        assert response.status_code == 429
+        assert "waiting" in response.get_json()["error"]
+        assert os.listdir(tmp_path / "uploads") == []
+    finally:
+        gate.release.set()
@@ -0,0 +1,47 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import zipfile
+
+import pytest
+
+import main
+from conftest import write_files
+
+
+@pytest.fixture
+def scratch(monkeypatch, tmp_path, stub_tools):
+    """Runs the CLI with a private temp directory, which must be empty again afterwards."""
+    temp = tmp_path / "tmp"
+    temp.mkdir()
+    monkeypatch.setattr(tempfile, "tempdir", str(temp))
+
+    def run(*argv):
+        monkeypatch.setattr(sys, "argv", ["main.py", *argv, "--config", str(tmp_path / "none.json"), "--no-cache"])
+        main.main()
+
+    run.temp = temp
+    return run
+
+
+def test_zip_extraction_is_removed_when_there_is_nothing_to_review(scratch, tmp_path):
+    archive = str(tmp_path / "docs.zip")
+    with zipfile.ZipFile(archive, "w") as zip_ref:
+        zip_ref.writestr("README.md", "no code here\n")
+    with pytest.raises(ValueError):
+        scratch(archive)
+    assert os.listdir(scratch.temp) == []
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="needs the git command")
+def test_git_checkout_is_removed_when_nothing_changed(scratch, tmp_path, capsys):
+    pytest.importorskip("git")
+    origin = write_files(tmp_path / "origin", {"app.py": "print('hi')\n"})
+    for args in (["init", "-q", "-b", "main"], ["add", "-A"],
+                 ["-c", "user.email=t@example.com", "-c", "user.name=T", "commit", "-q", "-m", "one"]):
+        subprocess.run(["git", *args], cwd=origin, check=True, capture_output=True)
+    scratch("file://" + origin, "--changed-only", "--no-git-mirror")
+    assert "nothing to review" in capsys.readouterr().out
+    assert os.listdir(scratch.temp) == []
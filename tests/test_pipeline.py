@@ -0,0 +1,127 @@
+import os
+import re
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import conftest
+import pipeline as pipeline_module
+from config import Config
+from conftest import write_files
+from improver import CodeImprover
+from pipeline import PipelineCancelled
+from project_index import ProjectIndex
+from scheduler import Scheduler
+
+FILE_COUNT = 12
+
+
+class SlowFirstImprover(CodeImprover):
+    """Finishes files in the reverse of the order they were submitted."""
+
+    def improve_code(self, file_path, analysis_results, lang, code=None):
+        index = int(re.search(r"mod(\d+)", file_path).group(1))
+        time.sleep((FILE_COUNT - index) * 0.02)
+        return super().improve_code(file_path, analysis_results, lang, code)
+
+
+def sources():
+    return {f"web/mod{i:02d}.js": f"function f{i}(code) {{ return eval(code) }}\n" for i in range(FILE_COUNT)}
+
+
+def test_parallel_run_saves_in_discovery_order(review, tmp_path, monkeypatch):
+    # Several small waves, so files are discovered while earlier ones are still improved
+    monkeypatch.setattr(pipeline_module, "FILES_PER_WAVE_PER_WORKER", 1)
+    monkeypatch.setattr(conftest, "CodeImprover", SlowFirstImprover)
+    root = write_files(tmp_path / "src", sources())
+    saved = []
+
+    def progress(done, total, file_path):
+        saved.append(file_path)
+
+    pipeline, report_path = review(root, {"jobs": 4}, progress=progress)
+    assert pipeline.jobs == 4
+    assert saved == sorted(saved) and len(saved) == FILE_COUNT
+    with open(report_path) as f:
+        sections = re.findall(r"^## File: (.*)$", f.read(), re.M)
+    assert sections == saved
+
+
+def test_parallel_and_serial_runs_write_the_same_sections(review, tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline_module, "FILES_PER_WAVE_PER_WORKER", 1)
+    root = write_files(tmp_path / "src", sources())
+    reports = []
+    for jobs in (1, 3):
+        _, report_path = review(root, {"jobs": jobs})
+        with open(report_path) as f:
+            reports.append(re.findall(r"^## File: (.*)$", f.read(), re.M))
+    assert reports[0] == reports[1] and len(reports[0]) == FILE_COUNT
+
+
+def python_sources():
+    return {f"pkg/mod{i:02d}.py": f'"""Module {i}."""\n\ndef f{i}():\n    return {i}\n' for i in range(6)}
+
+
+@pytest.mark.parametrize("stop", ["budget", "cancel"])
+def test_only_reviewed_waves_count_towards_the_total(stop, review, tmp_path, monkeypatch):
+    # Waves of two files, and every file saved as soon as it is submitted
+    monkeypatch.setattr(pipeline_module, "FILES_PER_WAVE_PER_WORKER", 1)
+    monkeypatch.setattr(pipeline_module, "PENDING_FILES_PER_WORKER", 0)
+    root = write_files(tmp_path / "src", sources())
+    config = Config.from_dict({"schedule": {"order": "discovery", "time_budget_s": 3600}})
+    scheduler = Scheduler(config, root)
+    cancel_event = threading.Event()
+    totals = []
+
+    def progress(done, total, file_path):
+        totals.append(total)
+        if stop == "budget":
+            scheduler.budget.started -= 3600
+        else:
+            cancel_event.set()
+
+    options = {"scheduler": scheduler, "progress": progress, "cancel_event": cancel_event}
+    if stop == "budget":
+        pipeline, _ = review(root, {"jobs": 2, "schedule": config.get("schedule")}, **options)
+        assert pipeline.coverage()["stop_reason"] == "time budget of 3600s reached"
+    else:
+        with pytest.raises(PipelineCancelled, match=r"after 1 of 2 file"):
+            review(root, {"jobs": 2}, **options)
+    # The next wave was already being analyzed, but was never reviewed
+    assert totals == [2]
+
+
+class RecordingPool(ThreadPoolExecutor):
+    """Stands in for the process pool, recording what each worker would be sent."""
+
+    calls = []
+
+    def __init__(self, max_workers, mp_context=None, initializer=None, initargs=()):
+        super().__init__(max_workers)
+
+    def submit(self, fn, *args):
+        self.calls.append((fn.__name__, args))
+        return super().submit(fn, *args)
+
+
+@pytest.mark.parametrize("index", [True, False])
+def test_process_pool_workers_get_the_sources_read_for_the_index(index, review, tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline_module, "ProcessPoolExecutor", RecordingPool)
+    monkeypatch.setattr(RecordingPool, "calls", [])
+    root = write_files(tmp_path / "src", python_sources())
+    review(root, {"jobs": 2}, project_index=ProjectIndex() if index else None)
+
+    analyzed = [args for name, args in RecordingPool.calls if name == "_analyze_in_worker"]
+    assert sorted(path for _, batch, _, _ in analyzed for path in batch) == sorted(
+        f"{root}/{name}" for name in python_sources()
+    )
+    for _, batch, _, sources in analyzed:
+        if index:
+            assert sorted(sources) == sorted(batch)
+            assert all(sources[path] == python_sources()[os.path.relpath(path, root)] for path in batch)
+        else:
+            assert sources == {}
+    improved = [args for name, args in RecordingPool.calls if name == "_improve_in_worker"]
+    assert len(improved) == len(python_sources()) and all(args[-1] is not None for args in improved)
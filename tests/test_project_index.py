@@ -0,0 +1,130 @@
+import os
+
+from conftest import write_files
+from config import Config
+from project_index import ProjectIndex, strongly_connected
+
+BLOCK = "".join(f"    total += values[{i}] * {i + 1}\n" for i in range(8))
+
+
+def kinds(findings):
+    return sorted(finding["kind"] for finding in findings)
+
+
+def test_python_import_cycle_and_unused_module():
+    index = ProjectIndex()
+    index.add("proj/pkg/a.py", "from pkg import b\n\ndef alpha():\n    return b.beta()\n")
+    index.add("proj/pkg/b.py", "from . import a\n\ndef beta():\n    return 1\n")
+    index.add("proj/pkg/orphan.py", "def unused():\n    return 2\n")
+    index.add("proj/main.py", "import pkg.a\n\nif __name__ == '__main__':\n    pkg.a.alpha()\n")
+
+    findings = index.findings()
+    assert kinds(findings) == ["import_cycle", "unused_module"]
+    cycle = next(finding for finding in findings if finding["kind"] == "import_cycle")
+    assert {location["path"] for location in cycle["locations"]} == {"proj/pkg/a.py", "proj/pkg/b.py"}
+    unused = next(finding for finding in findings if finding["kind"] == "unused_module")
+    assert unused["locations"][0]["path"] == "proj/pkg/orphan.py"
+    # Files skipped by a budget may be the importers
+    assert kinds(index.findings(complete=False)) == ["import_cycle"]
+
+
+def test_javascript_cycle_and_java_same_package_reference():
+    index = ProjectIndex()
+    index.add("web/app.js", "import { helper } from './util';\nexport function main() { helper(); }\n")
+    index.add("web/util.js", "const app = require('./app.js');\nexport function helper() {}\n")
+    index.add("java/com/x/Main.java", "package com.x;\npublic class Main { Helper h; public static void main(String[] a) {} }\n")
+    index.add("java/com/x/Helper.java", "package com.x;\npublic class Helper {}\n")
+
+    assert kinds(index.findings()) == ["import_cycle"]
+
+
+def test_duplicate_block_is_reported_with_both_locations():
+    index = ProjectIndex(duplicate_min_lines=6)
+    index.add("a.py", "def alpha(values):\n    total = 0\n" + BLOCK + "    return total\n")
+    index.add("b.py", "import os\n\ndef beta(values):\n    total = 0\n" + BLOCK + "    return total\n")
+
+    duplicates = [finding for finding in index.findings() if finding["kind"] == "duplicate_block"]
+    assert len(duplicates) == 1
+    assert [(location["path"], location["line"]) for location in duplicates[0]["locations"]] == [("b.py", 4), ("a.py", 2)]
+
+
+def test_similar_but_different_blocks_are_not_duplicates():
+    index = ProjectIndex(duplicate_min_lines=6)
+    index.add("a.py", "def alpha(values):\n    total = 0\n" + BLOCK)
+    index.add("b.py", "def beta(values):\n    total = 0\n" + BLOCK.replace("values", "items"))
+    assert "duplicate_block" not in kinds(index.findings())
+
+
+def test_windows_are_keyed_on_a_digest_of_their_text():
+    index = ProjectIndex(duplicate_min_lines=6)
+    index.add("a.py", "def alpha(values):\n    total = 0\n" + BLOCK)
+    assert index.windows
+    assert all(isinstance(key, bytes) and len(key) == 32 for key in index.windows)
+
+
+def test_identical_copy_is_one_whole_file_finding():
+    code = "def alpha(values):\n    total = 0\n" + BLOCK
+    index = ProjectIndex(duplicate_min_lines=6)
+    index.add("a.py", code)
+    index.add("copy/a.py", code)
+    duplicates = [finding for finding in index.findings() if finding["kind"] == "duplicate_block"]
+    assert len(duplicates) == 1
+
+
+def test_disabled_in_config():
+    assert ProjectIndex.from_config(Config.from_dict({"project_analysis": {"enabled": False}})) is None
+    index = ProjectIndex.from_config(Config.from_dict({"project_analysis": {"duplicate_min_lines": 4}}))
+    assert index.duplicate_min_lines == 4
+
+
+def test_strongly_connected_components():
+    graph = {"a": {"b"}, "b": {"c"}, "c": {"a"}, "d": {"a"}, "e": set()}
+    components = sorted(sorted(component) for component in strongly_connected(graph) if len(component) > 1)
+    assert components == [["a", "b", "c"]]
+
+
+def test_pipeline_builds_the_index_and_the_report_lists_findings(review, tmp_path):
+    root = write_files(tmp_path / "proj", {
+        "pkg/__init__.py": "",
+        "pkg/a.py": "from pkg import b\n\ndef alpha():\n    return b.beta()\n",
+        "pkg/b.py": "from pkg import a\n\ndef beta():\n    return 1\n",
+        "main.py": "import pkg.a\n\nif __name__ == '__main__':\n    pkg.a.alpha()\n",
+    })
+    pipeline, report_path = review(root, project_index=ProjectIndex())
+
+    assert len(pipeline.project_index.files) == 4
+    # Sources loaded for the index are released once each file is saved
+    assert pipeline.loaded == {}
+    with open(report_path) as f:
+        report = f.read()
+    assert "## Project Analysis" in report
+    assert "Circular import: a.py -> b.py -> a.py" in report
+    with open(os.path.splitext(report_path)[0] + ".metrics.json") as f:
+        assert '"import_cycle": 1' in f.read()
+
+
+def test_a_registered_backend_is_indexed_without_changes_here(monkeypatch):
+    import backends
+
+    class ToyBackend(backends.Backend):
+        language = "toy"
+        extensions = (".toy",)
+
+        @classmethod
+        def index_file(cls, entry, code):
+            entry.imports.extend((line[4:], number) for number, line in enumerate(code.splitlines(), 1)
+                                 if line.startswith("use "))
+
+        @classmethod
+        def import_resolver(cls, entries):
+            paths = {os.path.splitext(os.path.basename(entry.path))[0]: entry.path for entry in entries}
+            return lambda entry, name: [paths[name]] if name in paths else []
+
+    monkeypatch.setitem(backends.BACKENDS, "toy", ToyBackend)
+    monkeypatch.setitem(backends.SUPPORTED_EXTENSIONS, ".toy", "toy")
+    index = ProjectIndex()
+    index.add("a.toy", "use b\n")
+    index.add("b.toy", "use a\n")
+    cycle, = index.findings()
+    assert cycle["kind"] == "import_cycle"
+    assert index.summary()["languages"] == {"toy": 2}
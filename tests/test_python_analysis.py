@@ -0,0 +1,103 @@
+import ast
+
+import pytest
+
+import python_analysis
+from backends import PythonBackend
+from config import Config
+from conftest import write_files
+from python_analysis import analyze_source, empty_results
+
+INSECURE = (
+    "import subprocess\n"
+    "password = 'hunter2'\n"
+    "def run(cmd):\n"
+    "    eval(cmd)\n"
+    "    subprocess.call(cmd, shell=True)\n"
+    "    subprocess.call(cmd, shell=True)  # nosec\n"
+    "    eval(cmd)  # nosec B307\n"
+    "    return 1\n"
+)
+BRANCHY = "def branchy(x):\n" + "".join(f"    if x == {i}:\n        return {i}\n" for i in range(12)) + "    return -1\n"
+ISSUE_KEYS = {"line", "column", "severity", "message", "source"}
+
+
+def found(issues):
+    return sorted((issue["line"], issue["source"]) for issue in issues)
+
+
+def test_bandit_findings_and_nosec():
+    results = analyze_source("insecure.py", INSECURE)
+    assert set(results) == set(empty_results())
+    assert found(results["security_issues"]) == [
+        (1, "bandit:B404"), (2, "bandit:B105"), (4, "bandit:B307"), (5, "bandit:B602")
+    ]
+    assert all(set(issue) == ISSUE_KEYS for issue in results["security_issues"])
+    severities = {issue["source"]: issue["severity"] for issue in results["security_issues"]}
+    assert severities["bandit:B602"] == "error" and severities["bandit:B307"] == "warning"
+
+
+def test_bandit_matches_the_bandit_command(tmp_path):
+    from bandit.core import config as bandit_config
+    from bandit.core import manager as bandit_manager
+
+    path = write_files(tmp_path, {"insecure.py": INSECURE}) + "/insecure.py"
+    manager = bandit_manager.BanditManager(bandit_config.BanditConfig(), "file")
+    manager.discover_files([path])
+    manager.run_tests()
+    expected = sorted((item.lineno, f"bandit:{item.test_id}") for item in manager.get_issue_list())
+    assert found(analyze_source(path, INSECURE)["security_issues"]) == expected
+
+
+def test_file_is_parsed_once(monkeypatch):
+    calls = []
+    parse = ast.parse
+
+    def counting_parse(*args, **kwargs):
+        calls.append(args)
+        return parse(*args, **kwargs)
+
+    monkeypatch.setattr(ast, "parse", counting_parse)
+    analyze_source("insecure.py", INSECURE + BRANCHY)
+    assert len(calls) == 1
+
+
+def test_radon_metrics_and_complexity_smell():
+    results = analyze_source("branchy.py", BRANCHY)
+    metrics = results["metrics"]
+    assert metrics["max_complexity"] == 13 and metrics["sloc"] == 26
+    assert metrics["maintainability_rank"] in ("A", "B", "C")
+    smell, = results["code_smells"]
+    assert smell["source"] == "radon:cc" and smell["line"] == 1 and "branchy" in smell["message"]
+    assert set(smell) == ISSUE_KEYS
+
+
+def test_syntax_error_is_left_to_pylint():
+    results = analyze_source("broken.py", "def broken(:\n")
+    assert "parse_error" in results["metrics"]
+    assert results["security_issues"] == results["code_smells"] == []
+
+
+def test_priorities_turn_bandit_and_radon_off(monkeypatch, stub_tools, tmp_path):
+    path = write_files(tmp_path, {"insecure.py": INSECURE}) + "/insecure.py"
+
+    def fail(*args):
+        raise AssertionError("should not run")
+
+    monkeypatch.setattr(python_analysis, "_run_bandit", fail)
+    config = Config.from_dict({"priorities": {"security": 0, "performance": 1, "readability": 1}})
+    result = PythonBackend(config).analyze([path], {})[path]
+    assert not [issue for issue in result["security_issues"] if issue["source"].startswith("bandit")]
+    assert "maintainability_index" in result["metrics"]
+
+    monkeypatch.setattr(python_analysis, "_run_radon", fail)
+    config = Config.from_dict({"priorities": {"security": 0, "performance": 0, "readability": 1}})
+    result = PythonBackend(config).analyze([path], {path: INSECURE})[path]
+    assert "maintainability_index" not in result["metrics"]
+
+
+@pytest.mark.parametrize("security,complexity", [(True, False), (False, True)])
+def test_checks_can_run_alone(security, complexity):
+    results = analyze_source("insecure.py", INSECURE + BRANCHY, security=security, complexity=complexity)
+    assert bool(results["security_issues"]) == security
+    assert bool(results["code_smells"]) == complexity
@@ -0,0 +1,80 @@
+import os
+
+import pytest
+
+from config import Config
+from conftest import write_files
+from scheduler import Budget, Scheduler
+
+
+def budgeted(tmp_path, **schedule):
+    return Config.from_dict({"schedule": schedule, "cache": {"enabled": True, "dir": str(tmp_path / "cache")}})
+
+
+def test_time_budget():
+    budget = Budget(time_seconds=30)
+    assert budget.limited and budget.exceeded() is None
+    budget.started -= 31
+    assert budget.exceeded() == "time budget of 30s reached"
+
+
+def test_cpu_budget_counts_worker_processes():
+    budget = Budget(cpu_seconds=5)
+    assert budget.exceeded() is None
+    budget.add_worker_cpu(5)
+    assert budget.exceeded() == "CPU budget of 5s reached"
+    assert not Budget().limited
+
+
+def test_budget_switches_auto_order_to_risk(tmp_path):
+    assert Scheduler(Config.from_dict({})).order == "discovery"
+    assert Scheduler(budgeted(tmp_path, time_budget_s=60)).order == "risk"
+    with pytest.raises(ValueError):
+        Scheduler(budgeted(tmp_path, order="random"))
+
+
+def test_risk_order_puts_large_files_and_past_issues_first(tmp_path):
+    root = write_files(tmp_path / "src", {"small.py": "x = 1\n", "large.py": "x = 1\n" * 500, "noisy.py": "x = 1\n"})
+    paths = {name: os.path.join(root, name) for name in ("small.py", "large.py", "noisy.py")}
+    files = [(paths[name], "python") for name in ("small.py", "noisy.py", "large.py")]
+    config = budgeted(tmp_path, order="risk")
+
+    first = Scheduler(config, root, project=root)
+    assert [path for path, _ in first.schedule(files)][0] == paths["large.py"]
+    first.record(paths["noisy.py"], {"bugs": [{"line": 1}] * 20})
+    first.record(paths["small.py"], {})
+    first.finish()
+
+    # The next run of the same project remembers which file had the issues
+    order = [path for path, _ in Scheduler(config, root, project=root).schedule(files)]
+    assert order.index(paths["noisy.py"]) < order.index(paths["small.py"])
+
+
+def test_needs_improvement_follows_priorities_and_aggressiveness():
+    issues = {"bugs": [{"line": 1}]}
+    assert Scheduler(Config.from_dict({})).needs_improvement({})
+    low = Scheduler(Config.from_dict({"aggressiveness": "low"}))
+    assert low.needs_improvement(issues) and not low.needs_improvement({"bugs": []})
+    no_readability = Scheduler(Config.from_dict({"priorities": {"security": 1, "performance": 1, "readability": 0}}))
+    assert not no_readability.needs_improvement(issues)
+
+
+def test_run_stops_when_the_budget_runs_out(review, tmp_path):
+    root = write_files(tmp_path / "src", {f"m{i}.py": f"value = {i}\n" for i in range(5)})
+    config = Config.from_dict({"schedule": {"order": "discovery", "time_budget_s": 3600}})
+    scheduler = Scheduler(config, root)
+
+    def progress(done, total, file_path):
+        if done == 2:
+            scheduler.budget.started -= 3600
+
+    pipeline, report_path = review(root, {"schedule": config.get("schedule")}, scheduler=scheduler, progress=progress)
+    coverage = pipeline.coverage()
+    assert coverage["complete"] is False
+    assert coverage["stop_reason"] == "time budget of 3600s reached"
+    assert (coverage["files_reviewed"], coverage["files_total"], coverage["skipped_count"]) == (2, 5, 3)
+    assert coverage["by_language"] == {"python": {"reviewed": 2, "total": 5}}
+    with open(report_path) as f:
+        report = f.read()
+    assert report.count("## File: ") == 2
+    assert "time budget of 3600s reached" in report
@@ -0,0 +1,22 @@
+import os
+import sys
+
+from conftest import STUBS_DIR
+
+sys.path.insert(0, os.path.dirname(STUBS_DIR))
+import startup_budget  # noqa: E402
+
+# Shared test machines are noisy, so only a large regression fails on time here;
+# benchmarks/startup_budget.py holds the entry points to the real budgets
+SLACK = 4
+
+
+def test_entry_points_defer_heavy_imports():
+    budgets = {module: budget * SLACK for module, budget in startup_budget.STARTUP_BUDGETS_MS.items()}
+    results = startup_budget.check(budgets, repeat=3)
+    assert set(results) == {"app", "main"}
+    for module, result in results.items():
+        assert result["eagerly_loaded"] == [], module
+        assert result["ok"], result
+    for heavy in ("black", "bandit", "radon", "git"):
+        assert heavy in startup_budget.LAZY_MODULES["app"] and heavy in startup_budget.LAZY_MODULES["main"]
@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+from conftest import write_files
+from project_index import ProjectIndex
+from structured_output import OUTPUT_FORMATS, UnknownOutputFormat, output_path, parse_formats
+
+BLOCK = "".join(f"    total += values[{i}] * {i + 1}\n" for i in range(8))
+SOURCES = {
+    "proj/a.py": "def alpha(values):\n    total = 0\n" + BLOCK + "    return total\n",
+    "proj/b.py": "import os\n\ndef beta(values):\n    total = 0\n" + BLOCK + "    return total\n",
+    "proj/web/app.js": "let unusedValue = 1\nfunction run(code) { return eval(code); }\n",
+}
+JSONL_TYPES = {"run", "issue", "file", "project_issue", "summary"}
+
+
+@pytest.fixture
+def outputs(review, tmp_path):
+    root = write_files(tmp_path / "src", SOURCES)
+    _, report_path = review(root, {"output_formats": ["sarif", "jsonl"]}, project_index=ProjectIndex())
+    with open(output_path(report_path, "sarif")) as f:
+        sarif = json.load(f)
+    with open(output_path(report_path, "jsonl")) as f:
+        records = [json.loads(line) for line in f]
+    return sarif, records
+
+
+def test_sarif_follows_the_2_1_0_layout(outputs):
+    sarif, _ = outputs
+    assert sarif["version"] == "2.1.0"
+    assert sarif["$schema"].endswith("sarif-2.1.0.json")
+    run, = sarif["runs"]
+    rule_ids = [rule["id"] for rule in run["tool"]["driver"]["rules"]]
+    assert run["tool"]["driver"]["name"] and rule_ids == sorted(set(rule_ids))
+    assert run["invocations"][0]["executionSuccessful"] is True
+    assert run["invocations"][0]["properties"]["files"] == 3
+    assert run["results"]
+    for result in run["results"]:
+        assert result["ruleId"] in rule_ids
+        assert result["level"] in ("error", "warning", "note")
+        assert result["message"]["text"]
+        for location in result["locations"]:
+            physical = location["physicalLocation"]
+            assert physical["artifactLocation"]["uri"]
+            region = physical.get("region", {"startLine": 1})
+            assert region["startLine"] >= 1 and region.get("startColumn", 1) >= 1
+    duplicate = next(result for result in run["results"] if result["ruleId"] == "project:duplicate_block")
+    assert len(duplicate["locations"]) == 2
+
+
+def test_jsonl_records_stream_per_file(outputs):
+    sarif, records = outputs
+    assert records[0]["type"] == "run" and records[-1]["type"] == "summary"
+    assert {record["type"] for record in records} <= JSONL_TYPES
+    files = [record for record in records if record["type"] == "file"]
+    assert len(files) == records[-1]["files"] == 3
+    # Each file's issues come right before its "file" record and add up to its counts
+    pending = []
+    for record in records[1:-1]:
+        if record["type"] == "issue":
+            pending.append(record)
+        elif record["type"] == "file":
+            assert all(issue["path"] == record["path"] for issue in pending)
+            assert len(pending) == sum(record["issues"].values())
+            pending = []
+    assert not pending
+    # The same issues as SARIF, which also carries the project findings
+    issues = sum(record["type"] in ("issue", "project_issue") for record in records)
+    assert issues == len(sarif["runs"][0]["results"])
+
+
+def test_parse_formats():
+    assert parse_formats("SARIF, jsonl,sarif,") == ["sarif", "jsonl"]
+    assert parse_formats(None) == []
+    assert set(OUTPUT_FORMATS) == {"markdown", "sarif", "jsonl"}
+    with pytest.raises(UnknownOutputFormat):
+        parse_formats(["markdown", "xml"])
+    assert output_path("/r/report_1.md", "jsonl") == "/r/report_1.jsonl"
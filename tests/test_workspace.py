@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+from conftest import write_files
+from workspace import DiskQuotaExceeded, Workspace
+
+SOURCES = {
+    "pkg/models.py": "class Model:\n    def save(self):\n        return True\n" * 20,
+    "pkg/views.py": "def index(request):\n    return 'ok'\n" * 20,
+}
+
+
+@pytest.fixture
+def api(monkeypatch, tmp_path, stub_tools):
+    import app as app_module
+
+    monkeypatch.setattr(app_module, "UPLOAD_FOLDER", str(tmp_path / "uploads"))
+    app_module.app.config["TESTING"] = True
+
+    def post(input_path, quota_bytes=None):
+        monkeypatch.setattr(app_module, "WORKSPACE_QUOTA_BYTES", quota_bytes)
+        config = {"cache": {"enabled": False}, "jobs": 1}
+        return app_module.app.test_client().post("/api/analyze", json={"input_path": input_path, "config": config})
+
+    return post
+
+
+def test_reserve_counts_reservations_without_rescanning(tmp_path):
+    workspace = Workspace(str(tmp_path), quota_bytes=100)
+    workspace.reserve(60)
+    # Written without a reservation, so only a rescan notices it
+    with open(workspace.file("upload.bin"), "wb") as f:
+        f.write(b"x" * 30)
+    workspace.reserve(10)
+    with pytest.raises(DiskQuotaExceeded):
+        workspace.reserve(31)
+    # The rescan replaces the reservations with what is actually on disk
+    workspace.check_quota()
+    workspace.reserve(70)
+    with pytest.raises(DiskQuotaExceeded):
+        workspace.reserve(1)
+
+
+def test_analyze_returns_report_without_stale_paths(api, tmp_path):
+    write_files(tmp_path / "src", SOURCES)
+    response = api(str(tmp_path / "src"))
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["report"].startswith("# AI Code Review Agent Report")
+    assert set(body) == {"report"}
+    # The workspace, improved code included, is gone once the response is built
+    assert os.listdir(tmp_path / "uploads") == []
+
+
+def test_analyze_counts_review_output_against_quota(api, tmp_path):
+    write_files(tmp_path / "src", SOURCES)
+    # Nothing is uploaded, so only the improved code and reports can exceed this
+    response = api(str(tmp_path / "src"), quota_bytes=1024)
+    assert response.status_code == 413
+    assert "quota" in response.get_data(as_text=True)
+    assert os.listdir(tmp_path / "uploads") == []
+
+
+def test_analyze_rejects_a_missing_input_path(api, tmp_path):
+    for input_path in (None, "", str(tmp_path / "missing")):
+        response = api(input_path)
+        assert response.status_code == 400
+        assert "input_path" in response.get_json()["error"]